@@ -12,14 +12,15 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import database configuration and models
 from app.db.database import Base, SQLALCHEMY_DATABASE_URL
-from app.db.models import User, XAccount
+from app.db.models import User, XAccount, SocialAccount, Conversation, Message, ConversationSummary, StatRollup, ScheduleEvent
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
 # Set the database URL from our configuration
-config.set_main_option('sqlalchemy.url', SQLALCHEMY_DATABASE_URL)
+# (% مضاعفة لأن ملف ini يستخدم interpolation — كلمات مرور PostgreSQL قد تحتويها)
+config.set_main_option('sqlalchemy.url', SQLALCHEMY_DATABASE_URL.replace('%', '%%'))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
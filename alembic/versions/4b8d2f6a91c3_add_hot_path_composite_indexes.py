@@ -0,0 +1,49 @@
+"""Add composite indexes on hot query paths
+
+Revision ID: 4b8d2f6a91c3
+Revises: e153d985cf12
+Create Date: 2026-10-18 10:40:12.408317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8d2f6a91c3'
+down_revision: Union[str, Sequence[str], None] = 'e153d985cf12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index, table, columns) — نفس Index في app/db/models.py
+INDEXES = [
+    ('ix_messages_conversation_created', 'messages', ['conversation_id', 'created_at']),
+    ('ix_conversations_user_updated', 'conversations', ['user_id', 'updated_at']),
+    ('ix_schedule_events_status_run_at', 'schedule_events', ['status', 'run_at']),
+    ('ix_social_accounts_user_platform_status', 'social_accounts', ['user_id', 'platform', 'status']),
+]
+
+
+def _existing_tables() -> set:
+    # schedule_events و social_accounts تُنشأ من init_db() وقد لا تكون موجودة بعد؛
+    # init_db() ينشئها مع هذه الفهارس من الموديل
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = _existing_tables()
+    for name, table, columns in INDEXES:
+        if table in tables:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    tables = _existing_tables()
+    for name, table, _ in reversed(INDEXES):
+        if table in tables:
+            op.drop_index(name, table_name=table, if_exists=True)
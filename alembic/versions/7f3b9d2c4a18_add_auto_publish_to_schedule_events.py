@@ -0,0 +1,47 @@
+"""Add auto_publish to schedule_events
+
+Revision ID: 7f3b9d2c4a18
+Revises: d2a47c8e6b15
+Create Date: 2026-10-18 14:02:47.318520
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3b9d2c4a18'
+down_revision: Union[str, Sequence[str], None] = 'd2a47c8e6b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_columns() -> Optional[set]:
+    # schedule_events يُنشأ من init_db() (مع الأعمدة الجديدة) إذا لم يكن موجوداً
+    inspector = sa.inspect(op.get_bind())
+    if 'schedule_events' not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns('schedule_events')}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = _existing_columns()
+    if columns is None or 'auto_publish' in columns:
+        return
+    # الأحداث الموجودة (READY_TO_PUBLISH قبل الناشر) تبقى false فلا تُنشر مرة أخرى
+    op.add_column(
+        'schedule_events',
+        sa.Column('auto_publish', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    columns = _existing_columns()
+    if columns is None or 'auto_publish' not in columns:
+        return
+    with op.batch_alter_table('schedule_events') as batch_op:
+        batch_op.drop_column('auto_publish')
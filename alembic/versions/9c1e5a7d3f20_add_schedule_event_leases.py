@@ -0,0 +1,49 @@
+"""Add claimed_by and lease_until to schedule_events
+
+Revision ID: 9c1e5a7d3f20
+Revises: 4b8d2f6a91c3
+Create Date: 2026-10-18 11:02:47.193260
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e5a7d3f20'
+down_revision: Union[str, Sequence[str], None] = '4b8d2f6a91c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_columns() -> Optional[set]:
+    # schedule_events يُنشأ من init_db() (مع الأعمدة الجديدة) إذا لم يكن موجوداً
+    inspector = sa.inspect(op.get_bind())
+    if 'schedule_events' not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns('schedule_events')}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = _existing_columns()
+    if columns is None:
+        return
+    if 'claimed_by' not in columns:
+        op.add_column('schedule_events', sa.Column('claimed_by', sa.String(length=255), nullable=True))
+    if 'lease_until' not in columns:
+        op.add_column('schedule_events', sa.Column('lease_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    columns = _existing_columns()
+    if columns is None:
+        return
+    with op.batch_alter_table('schedule_events') as batch_op:
+        if 'lease_until' in columns:
+            batch_op.drop_column('lease_until')
+        if 'claimed_by' in columns:
+            batch_op.drop_column('claimed_by')
@@ -0,0 +1,38 @@
+"""Add status/published_at index to schedule_events
+
+Revision ID: a5c81e3f7d42
+Revises: 7f3b9d2c4a18
+Create Date: 2026-10-18 14:48:21.905133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c81e3f7d42'
+down_revision: Union[str, Sequence[str], None] = '7f3b9d2c4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table() -> bool:
+    # schedule_events يُنشأ من init_db() (مع الفهرس) إذا لم يكن موجوداً
+    return 'schedule_events' in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _has_table():
+        op.create_index(
+            'ix_schedule_events_status_published_at', 'schedule_events',
+            ['status', 'published_at'], unique=False, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if _has_table():
+        op.drop_index('ix_schedule_events_status_published_at', table_name='schedule_events', if_exists=True)
@@ -0,0 +1,55 @@
+"""Add publish attempt columns to schedule_events
+
+Revision ID: d2a47c8e6b15
+Revises: 9c1e5a7d3f20
+Create Date: 2026-10-18 11:31:05.662914
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a47c8e6b15'
+down_revision: Union[str, Sequence[str], None] = '9c1e5a7d3f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('published_at', sa.DateTime(), nullable=True),
+    sa.Column('post_url', sa.String(length=500), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+]
+
+
+def _existing_columns() -> Optional[set]:
+    # schedule_events يُنشأ من init_db() (مع الأعمدة الجديدة) إذا لم يكن موجوداً
+    inspector = sa.inspect(op.get_bind())
+    if 'schedule_events' not in inspector.get_table_names():
+        return None
+    return {column['name'] for column in inspector.get_columns('schedule_events')}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = _existing_columns()
+    if columns is None:
+        return
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column('schedule_events', column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    columns = _existing_columns()
+    if columns is None:
+        return
+    with op.batch_alter_table('schedule_events') as batch_op:
+        for column in reversed(COLUMNS):
+            if column.name in columns:
+                batch_op.drop_column(column.name)
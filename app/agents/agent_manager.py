@@ -69,6 +69,29 @@ class AgentManager:
         main_agent = self.get_main_agent()
         return main_agent.process_message(message, user_id, session_id, db, metadata=metadata)
     
+    async def process_user_message_async(
+        self, 
+        message: str, 
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        db: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        معالجة رسالة من المستخدم (async) — للاستدعاء من داخل الـ event loop
+        
+        Args:
+            message: رسالة المستخدم
+            user_id: معرف المستخدم
+            session_id: معرف الجلسة
+            db: جلسة قاعدة البيانات
+            
+        Returns:
+            الرد من النظام
+        """
+        main_agent = self.get_main_agent()
+        return await main_agent.process_message_async(message, user_id, session_id, db, metadata=metadata)
+    
     def reset(self):
         """إعادة تعيين نظام الوكلاء"""
         self._main_agent = None
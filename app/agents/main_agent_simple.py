@@ -6,8 +6,9 @@
 
 from typing import Dict, Any, Optional
 from sqlalchemy.orm import Session
-from .tools import detect_user_intent
+from .tools import detect_user_intent, run_tool
 from .x_agent_simple import XAgent
+from .turn_runner import check_cancelled
 from app.services.memory_service import memory_service
 
 
@@ -28,90 +29,174 @@ class MainAgent:
     ) -> Dict[str, Any]:
         """معالجة رسالة من المستخدم"""
         
-        conversation_id = None
-        
-        # إنشاء أو الحصول على المحادثة
-        if db:
-            try:
-                conversation = memory_service.get_or_create_conversation(
-                    db=db, user_id=user_id, session_id=session_id
-                )
-                conversation_id = conversation.id
-                
-                # إضافة رسالة المستخدم
-                memory_service.add_message(
-                    db=db,
-                    conversation_id=conversation_id,
-                    role="user",
-                    content=message,
-                    metadata=metadata
-                )
-            except Exception as e:
-                print(f"Warning: Memory service error: {str(e)}")
+        conversation_id = self._remember_user_message(db, message, user_id, session_id, metadata)
         
         try:
             # تحليل النية
             intent_result = detect_user_intent(message)
-            intent = intent_result.get("intent")
-            platform = intent_result.get("platform")
-            entities = intent_result.get("entities", {})
-            confidence = intent_result.get("confidence", 0)
             
-            if confidence < 0.5:
-                # لا ترجع رد تلقائي - دع الوكيل يتعامل مع الطلب
-                return {
-                    "success": False,
-                    "message": None,
-                    "intent_result": intent_result,
-                    "conversation_id": conversation_id
-                }
+            early = self._check_confidence(intent_result, conversation_id)
+            if early:
+                return early
             
             # توجيه للوكيل المناسب
-            if platform in ["twitter", "x"] or intent in ["add_account", "create_post", "schedule_post"]:
-                context = {
-                    "intent": intent,
-                    "entities": entities,
-                    "platform": platform,
-                    "user_id": user_id
-                }
-                
-                x_response = self.x_agent.process_request(message, context)
-                
-                # إذا لم يرجع X_Agent رد
-                if not x_response:
-                    print(f"[DEBUG] X_Agent returned no response for intent: {intent}")
-                    return {
-                        "success": False,
-                        "message": None,  # لا رد تلقائي
-                        "intent_result": intent_result
-                    }
-                
-                # حفظ الرد
-                if db and conversation_id:
-                    try:
-                        memory_service.add_message(
-                            db=db,
-                            conversation_id=conversation_id,
-                            role="assistant",
-                            content=x_response,
-                            intent=intent,
-                            confidence=confidence,
-                            agent="X_Agent",
-                            metadata={"platform": platform, "entities": entities}
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to save message: {str(e)}")
-                
-                return {
-                    "success": True,
-                    "message": x_response,
-                    "intent_result": intent_result,
-                    "agent": "X_Agent",
-                    "conversation_id": conversation_id
-                }
+            if self._routes_to_x(intent_result):
+                check_cancelled()
+                x_response = self.x_agent.process_request(message, self._x_context(intent_result, user_id))
+                return self._x_result(db, conversation_id, intent_result, x_response)
             
-            elif intent == "help":
-                help_message = """مرحباً! يمكنني مساعدتك في:
+            return self._builtin_result(db, conversation_id, user_id, intent_result)
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def process_message_async(
+        self, 
+        message: str, 
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None,
+        db: Optional[Session] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        معالجة رسالة من المستخدم (async)
+        
+        نفس منطق process_message، لكن عمليات قاعدة البيانات وأدوات X تُنتظر عبر
+        الـ executor المشترك في tools.py فلا يتوقف الـ event loop
+        """
+        
+        conversation_id = await run_tool(self._remember_user_message, db, message, user_id, session_id, metadata)
+        
+        try:
+            # تحليل النية (مخزنة مؤقتاً في intent_cache — سريعة)
+            intent_result = detect_user_intent(message)
+            
+            early = self._check_confidence(intent_result, conversation_id)
+            if early:
+                return early
+            
+            # توجيه للوكيل المناسب
+            if self._routes_to_x(intent_result):
+                check_cancelled()
+                x_response = await self.x_agent.process_request_async(message, self._x_context(intent_result, user_id))
+                return await run_tool(self._x_result, db, conversation_id, intent_result, x_response)
+            
+            return await run_tool(self._builtin_result, db, conversation_id, user_id, intent_result)
+        
+        except Exception as e:
+            return self._error_result(e)
+    
+    def _remember_user_message(
+        self,
+        db: Optional[Session],
+        message: str,
+        user_id: Optional[int],
+        session_id: Optional[str],
+        metadata: Optional[Dict[str, Any]]
+    ) -> Optional[int]:
+        """إنشاء أو الحصول على المحادثة وحفظ رسالة المستخدم"""
+        if not db:
+            return None
+        
+        try:
+            conversation = memory_service.get_or_create_conversation(
+                db=db, user_id=user_id, session_id=session_id
+            )
+            
+            # إضافة رسالة المستخدم
+            memory_service.add_message(
+                db=db,
+                conversation_id=conversation.id,
+                role="user",
+                content=message,
+                metadata=metadata
+            )
+            return conversation.id
+        except Exception as e:
+            print(f"Warning: Memory service error: {str(e)}")
+            return None
+    
+    def _check_confidence(self, intent_result: Dict[str, Any], conversation_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        if intent_result.get("confidence", 0) < 0.5:
+            # لا ترجع رد تلقائي - دع الوكيل يتعامل مع الطلب
+            return {
+                "success": False,
+                "message": None,
+                "intent_result": intent_result,
+                "conversation_id": conversation_id
+            }
+        return None
+    
+    def _routes_to_x(self, intent_result: Dict[str, Any]) -> bool:
+        return (
+            intent_result.get("platform") in ["twitter", "x"]
+            or intent_result.get("intent") in ["add_account", "create_post", "schedule_post"]
+        )
+    
+    def _x_context(self, intent_result: Dict[str, Any], user_id: Optional[int]) -> Dict[str, Any]:
+        return {
+            "intent": intent_result.get("intent"),
+            "entities": intent_result.get("entities", {}),
+            "platform": intent_result.get("platform"),
+            "user_id": user_id
+        }
+    
+    def _x_result(
+        self,
+        db: Optional[Session],
+        conversation_id: Optional[int],
+        intent_result: Dict[str, Any],
+        x_response: Optional[str]
+    ) -> Dict[str, Any]:
+        """حفظ رد X_Agent وصياغة النتيجة"""
+        intent = intent_result.get("intent")
+        
+        # إذا لم يرجع X_Agent رد
+        if not x_response:
+            print(f"[DEBUG] X_Agent returned no response for intent: {intent}")
+            return {
+                "success": False,
+                "message": None,  # لا رد تلقائي
+                "intent_result": intent_result
+            }
+        
+        # حفظ الرد
+        if db and conversation_id:
+            try:
+                memory_service.add_message(
+                    db=db,
+                    conversation_id=conversation_id,
+                    role="assistant",
+                    content=x_response,
+                    intent=intent,
+                    confidence=intent_result.get("confidence", 0),
+                    agent="X_Agent",
+                    metadata={"platform": intent_result.get("platform"), "entities": intent_result.get("entities", {})}
+                )
+            except Exception as e:
+                print(f"Warning: Failed to save message: {str(e)}")
+        
+        return {
+            "success": True,
+            "message": x_response,
+            "intent_result": intent_result,
+            "agent": "X_Agent",
+            "conversation_id": conversation_id
+        }
+    
+    def _builtin_result(
+        self,
+        db: Optional[Session],
+        conversation_id: Optional[int],
+        user_id: Optional[int],
+        intent_result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """النوايا التي يرد عليها الوكيل الرئيسي مباشرة (مساعدة، ترحيب، عرض الحسابات)"""
+        intent = intent_result.get("intent")
+        confidence = intent_result.get("confidence", 0)
+        
+        if intent == "help":
+            help_message = """مرحباً! يمكنني مساعدتك في:
 
 📱 إدارة الحسابات:
 - إضافة حساب جديد على X
@@ -127,135 +212,135 @@ class MainAgent:
 - "انشر تغريدة 'مرحباً بالجميع!'"
 
 كيف يمكنني مساعدتك؟"""
-                
-                if db and conversation_id:
-                    try:
-                        memory_service.add_message(
-                            db=db, conversation_id=conversation_id,
-                            role="assistant", content=help_message,
-                            intent=intent, confidence=confidence, agent="Main_Agent"
-                        )
-                    except: pass
-                
-                return {
-                    "success": True,
-                    "message": help_message,
-                    "intent_result": intent_result,
-                    "agent": "Main_Agent",
-                    "conversation_id": conversation_id
-                }
             
-            elif intent == "greeting":
-                greeting_msg = "مرحباً! 👋 أنا هنا لمساعدتك في إدارة حساباتك على منصات التواصل الاجتماعي. كيف يمكنني مساعدتك اليوم؟"
-                
-                if db and conversation_id:
-                    try:
-                        memory_service.add_message(
-                            db=db, conversation_id=conversation_id,
-                            role="assistant", content=greeting_msg,
-                            intent=intent, confidence=confidence, agent="Main_Agent"
-                        )
-                    except: pass
-                
-                return {
-                    "success": True,
-                    "message": greeting_msg,
-                    "intent_result": intent_result,
-                    "agent": "Main_Agent",
-                    "conversation_id": conversation_id
-                }
+            if db and conversation_id:
+                try:
+                    memory_service.add_message(
+                        db=db, conversation_id=conversation_id,
+                        role="assistant", content=help_message,
+                        intent=intent, confidence=confidence, agent="Main_Agent"
+                    )
+                except: pass
             
-            elif intent == "list_accounts":
-                # عرض حسابات المستخدم النشطة من قاعدة البيانات
-                accounts_msg = ""
-                
-                if db and user_id:
-                    try:
-                        from app.services.account_service import account_service
-                        
-                        # الحصول على الحسابات النشطة فقط
-                        accounts = account_service.get_user_accounts(
-                            db=db,
-                            user_id=user_id,
-                            status="active"
-                        )
+            return {
+                "success": True,
+                "message": help_message,
+                "intent_result": intent_result,
+                "agent": "Main_Agent",
+                "conversation_id": conversation_id
+            }
+        
+        elif intent == "greeting":
+            greeting_msg = "مرحباً! 👋 أنا هنا لمساعدتك في إدارة حساباتك على منصات التواصل الاجتماعي. كيف يمكنني مساعدتك اليوم؟"
+            
+            if db and conversation_id:
+                try:
+                    memory_service.add_message(
+                        db=db, conversation_id=conversation_id,
+                        role="assistant", content=greeting_msg,
+                        intent=intent, confidence=confidence, agent="Main_Agent"
+                    )
+                except: pass
+            
+            return {
+                "success": True,
+                "message": greeting_msg,
+                "intent_result": intent_result,
+                "agent": "Main_Agent",
+                "conversation_id": conversation_id
+            }
+        
+        elif intent == "list_accounts":
+            # عرض حسابات المستخدم النشطة من قاعدة البيانات
+            accounts_msg = ""
+            
+            if db and user_id:
+                try:
+                    from app.services.account_service import account_service
+                    
+                    # الحصول على الحسابات النشطة فقط
+                    accounts = account_service.get_user_accounts(
+                        db=db,
+                        user_id=user_id,
+                        status="active"
+                    )
+                    
+                    if accounts:
+                        accounts_msg = f"📋 **حساباتك النشطة:**\n\n"
                         
-                        if accounts:
-                            accounts_msg = f"📋 **حساباتك النشطة:**\n\n"
-                            
-                            # تجميع الحسابات حسب المنصة
-                            platforms = {}
-                            for account in accounts:
-                                platform_name = account.platform
-                                if platform_name == "x":
-                                    platform_name = "X (Twitter)"
-                                elif platform_name == "instagram":
-                                    platform_name = "Instagram"
-                                elif platform_name == "facebook":
-                                    platform_name = "Facebook"
-                                elif platform_name == "linkedin":
-                                    platform_name = "LinkedIn"
-                                elif platform_name == "tiktok":
-                                    platform_name = "TikTok"
-                                
-                                if platform_name not in platforms:
-                                    platforms[platform_name] = []
-                                platforms[platform_name].append(account)
-                            
-                            # عرض الحسابات مجمعة حسب المنصة
-                            for platform_name, platform_accounts in platforms.items():
-                                accounts_msg += f"\n🌐 **{platform_name}:**\n"
-                                for account in platform_accounts:
-                                    accounts_msg += f"  • 👤 {account.username}"
-                                    if account.last_used:
-                                        from datetime import datetime
-                                        last_used = account.last_used.strftime("%Y-%m-%d")
-                                        accounts_msg += f" (آخر استخدام: {last_used})"
-                                    accounts_msg += "\n"
+                        # تجميع الحسابات حسب المنصة
+                        platforms = {}
+                        for account in accounts:
+                            platform_name = account.platform
+                            if platform_name == "x":
+                                platform_name = "X (Twitter)"
+                            elif platform_name == "instagram":
+                                platform_name = "Instagram"
+                            elif platform_name == "facebook":
+                                platform_name = "Facebook"
+                            elif platform_name == "linkedin":
+                                platform_name = "LinkedIn"
+                            elif platform_name == "tiktok":
+                                platform_name = "TikTok"
                             
-                            accounts_msg += f"\n✅ لديك {len(accounts)} حساب نشط"
-                        else:
-                            accounts_msg = "⚠️ لا توجد حسابات نشطة حالياً.\n\nيمكنك إضافة حساب بقول: سجل دخول اليوزر [username] الباسورد [password]"
-                    
-                    except Exception as e:
-                        print(f"Error fetching accounts: {e}")
-                        accounts_msg = "⚠️ حدث خطأ في جلب الحسابات. يرجى المحاولة مرة أخرى."
-                else:
-                    accounts_msg = "⚠️ لا توجد حسابات محفوظة حالياً.\n\nيمكنك إضافة حساب بقول: سجل دخول اليوزر [username] الباسورد [password]"
-                
-                if db and conversation_id:
-                    try:
-                        memory_service.add_message(
-                            db=db, conversation_id=conversation_id,
-                            role="assistant", content=accounts_msg,
-                            intent=intent, confidence=confidence, agent="Main_Agent"
-                        )
-                    except: pass
+                            if platform_name not in platforms:
+                                platforms[platform_name] = []
+                            platforms[platform_name].append(account)
+                        
+                        # عرض الحسابات مجمعة حسب المنصة
+                        for platform_name, platform_accounts in platforms.items():
+                            accounts_msg += f"\n🌐 **{platform_name}:**\n"
+                            for account in platform_accounts:
+                                accounts_msg += f"  • 👤 {account.username}"
+                                if account.last_used:
+                                    from datetime import datetime
+                                    last_used = account.last_used.strftime("%Y-%m-%d")
+                                    accounts_msg += f" (آخر استخدام: {last_used})"
+                                accounts_msg += "\n"
+                        
+                        accounts_msg += f"\n✅ لديك {len(accounts)} حساب نشط"
+                    else:
+                        accounts_msg = "⚠️ لا توجد حسابات نشطة حالياً.\n\nيمكنك إضافة حساب بقول: سجل دخول اليوزر [username] الباسورد [password]"
                 
-                return {
-                    "success": True,
-                    "message": accounts_msg,
-                    "intent_result": intent_result,
-                    "agent": "Main_Agent",
-                    "conversation_id": conversation_id
-                }
-            
+                except Exception as e:
+                    print(f"Error fetching accounts: {e}")
+                    accounts_msg = "⚠️ حدث خطأ في جلب الحسابات. يرجى المحاولة مرة أخرى."
             else:
-                # ميزة غير متاحة
-                print(f"[DEBUG] Feature not available: {intent}")
-                return {
-                    "success": False,
-                    "message": None,  # لا رد تلقائي
-                    "intent_result": intent_result
-                }
+                accounts_msg = "⚠️ لا توجد حسابات محفوظة حالياً.\n\nيمكنك إضافة حساب بقول: سجل دخول اليوزر [username] الباسورد [password]"
+            
+            if db and conversation_id:
+                try:
+                    memory_service.add_message(
+                        db=db, conversation_id=conversation_id,
+                        role="assistant", content=accounts_msg,
+                        intent=intent, confidence=confidence, agent="Main_Agent"
+                    )
+                except: pass
+            
+            return {
+                "success": True,
+                "message": accounts_msg,
+                "intent_result": intent_result,
+                "agent": "Main_Agent",
+                "conversation_id": conversation_id
+            }
         
-        except Exception as e:
-            # في حالة الخطأ، سجل الخطأ
-            print(f"[ERROR] Main Agent error: {str(e)}")
-            import traceback
-            print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        else:
+            # ميزة غير متاحة
+            print(f"[DEBUG] Feature not available: {intent}")
             return {
                 "success": False,
                 "message": None,  # لا رد تلقائي
-                "error": str(e)
+                "intent_result": intent_result
             }
+    
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        # في حالة الخطأ، سجل الخطأ
+        print(f"[ERROR] Main Agent error: {str(e)}")
+        import traceback
+        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        return {
+            "success": False,
+            "message": None,  # لا رد تلقائي
+            "error": str(e)
+        }
@@ -10,7 +10,10 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 import tempfile
 import asyncio
+import contextvars
+import functools
 from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
 from app.utils.secure_logger import get_secure_logger
 
 logger = get_secure_logger(__name__)
@@ -19,7 +22,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from app.services.intent_service import intent_service
 from app.x.modules.x_login import TwitterLoginAdvanced
-from app.x.modules.x_post import post_to_x
+from app.x.modules.x_engine import post_to_x
 from app.x.modules.x_profile import update_profile_on_x
 from app.x.modules.utils import safe_label, download_to_temp, is_url
 
@@ -28,8 +31,30 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 COOKIES_DIR = BASE_DIR / "x" / "cookies"
 COOKIES_DIR.mkdir(exist_ok=True, parents=True)
 
-# Thread pool للعمليات المتزامنة
-executor = ThreadPoolExecutor(max_workers=3)
+# Thread pool واحد لكل العمليات المتزامنة (تسجيل دخول، نشر، قاعدة البيانات) في النسخ async
+executor = ThreadPoolExecutor(max_workers=settings.AGENT_TOOL_WORKERS, thread_name_prefix="agent-tool")
+
+
+async def run_tool(fn, *args, timeout: Optional[float] = None, **kwargs):
+    """
+    تشغيل دالة متزامنة في executor المشترك وانتظارها بدون حجز الـ event loop.
+    الـ contextvars تنتقل معها (report_progress / check_cancelled تعمل داخلها).
+    إلغاء المنتظر لا يوقف الـ thread، فيبقى الانتظار حتى تتوقف الدالة (عند check_cancelled)
+    كي لا تتداخل مع الدور التالي لنفس الجلسة.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    future = loop.run_in_executor(executor, call)
+    try:
+        if timeout:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        if not future.done():
+            await asyncio.wait({future})
+        if not future.cancelled():
+            future.exception()
+        raise
 
 
 def detect_user_intent(text: str) -> Dict[str, Any]:
@@ -243,22 +268,7 @@ def x_login(username: str, password: str, label: str, headless: bool = True, use
         نتيجة عملية تسجيل الدخول
     """
     try:
-        # تشغيل في thread منفصل لتجنب تعارض asyncio
-        loop = None
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            pass
-        
-        if loop and loop.is_running():
-            # نحن داخل asyncio loop، استخدم thread pool
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                future = pool.submit(_x_login_sync, username, password, label, headless, user_id)
-                return future.result(timeout=300)  # 5 دقائق timeout
-        else:
-            # لا يوجد asyncio loop، نفذ مباشرة
-            return _x_login_sync(username, password, label, headless, user_id)
+        return _x_login_sync(username, password, label, headless, user_id)
     
     except Exception as e:
         return {
@@ -362,22 +372,7 @@ def x_post(label: str, text: str, media_url: Optional[str] = None, headless: boo
         نتيجة عملية النشر
     """
     try:
-        # تشغيل في thread منفصل لتجنب تعارض asyncio
-        loop = None
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            pass
-        
-        if loop and loop.is_running():
-            # نحن داخل asyncio loop، استخدم thread pool
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                future = pool.submit(_x_post_sync, label, text, media_url, headless)
-                return future.result(timeout=300)
-        else:
-            # لا يوجد asyncio loop، نفذ مباشرة
-            return _x_post_sync(label, text, media_url, headless)
+        return _x_post_sync(label, text, media_url, headless)
     
     except Exception as e:
         return {
@@ -482,25 +477,60 @@ def x_update_profile(
         نتيجة عملية التحديث
     """
     try:
-        # تشغيل في thread منفصل لتجنب تعارض asyncio
-        loop = None
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            pass
-        
-        if loop and loop.is_running():
-            # نحن داخل asyncio loop، استخدم thread pool
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                future = pool.submit(_x_update_profile_sync, label, name, bio, location, website, avatar_url, banner_url, headless)
-                return future.result(timeout=300)
-        else:
-            # لا يوجد asyncio loop، نفذ مباشرة
-            return _x_update_profile_sync(label, name, bio, location, website, avatar_url, banner_url, headless)
+        return _x_update_profile_sync(label, name, bio, location, website, avatar_url, banner_url, headless)
     
     except Exception as e:
         return {
             "success": False,
             "message": f"خطأ في التحديث: {str(e)}"
         }
+
+
+# ============ Async tools ============
+# نفس الأدوات لكن قابلة للانتظار (await) من FastAPI / WebSocket بدون حجز الـ event loop
+
+async def _run_tool_safely(error_prefix: str, fn, *args, **kwargs) -> Dict[str, Any]:
+    try:
+        return await run_tool(fn, *args, timeout=settings.AGENT_TOOL_TIMEOUT or None, **kwargs)
+    except asyncio.TimeoutError:
+        return {
+            "success": False,
+            "message": f"{error_prefix}: انتهت المهلة"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"{error_prefix}: {str(e)}"
+        }
+
+
+async def x_login_async(username: str, password: str, label: str, headless: bool = True, user_id: Optional[int] = None) -> Dict[str, Any]:
+    """نسخة async من x_login"""
+    return await _run_tool_safely("خطأ في تسجيل الدخول", _x_login_sync, username, password, label, headless, user_id)
+
+
+async def x_post_async(label: str, text: str, media_url: Optional[str] = None, headless: bool = True) -> Dict[str, Any]:
+    """نسخة async من x_post"""
+    return await _run_tool_safely("خطأ في النشر", _x_post_sync, label, text, media_url, headless)
+
+
+async def x_update_profile_async(
+    label: str,
+    name: Optional[str] = None,
+    bio: Optional[str] = None,
+    location: Optional[str] = None,
+    website: Optional[str] = None,
+    avatar_url: Optional[str] = None,
+    banner_url: Optional[str] = None,
+    headless: bool = True
+) -> Dict[str, Any]:
+    """نسخة async من x_update_profile"""
+    return await _run_tool_safely(
+        "خطأ في التحديث", _x_update_profile_sync,
+        label, name, bio, location, website, avatar_url, banner_url, headless
+    )
+
+
+async def x_delete_account_async(account_name: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+    """نسخة async من x_delete_account"""
+    return await _run_tool_safely("❌ فشل حذف الحساب", x_delete_account, account_name, user_id)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+منفذ أدوار المحادثة
+Agent Turn Runner
+
+معالجة رسالة المستخدم قد تستغرق عدة دقائق (x_login / x_post). هذا المنفذ يشغّل كل
+دور (turn) إما كـ coroutine (المسار async: MainAgent.process_message_async) أو،
+للدوال المتزامنة، في thread pool محدود حتى لا يتجمد الـ event loop:
+- أدوار نفس الجلسة تُنفذ بالترتيب (واحد تلو الآخر)، والجلسات المختلفة بالتوازي
+- أثناء التنفيذ تُرسل أحداث typing دورية وأحداث progress التي يبلغ عنها الوكيل
+- إلغاء الدور (انقطاع العميل) يوقفه عند أول نقطة فحص (check_cancelled)،
+  والدور التالي لنفس الجلسة ينتظر حتى يتوقف فعلياً
+
+داخل كود الوكيل:
+    report_progress("x_login", "جاري تسجيل الدخول إلى X...")
+    check_cancelled()
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+
+
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class TurnCancelled(BaseException):
+    """
+    الدور أُلغي (انقطاع العميل أو تجاوز المهلة).
+    BaseException مثل asyncio.CancelledError حتى لا تبتلعه كتل except Exception في الوكلاء.
+    """
+
+
+class TurnContext:
+    """حالة الدور الحالي — متاحة لكود الوكيل عبر current_turn()"""
+
+    def __init__(self, session_key: str, loop: asyncio.AbstractEventLoop, events: asyncio.Queue):
+        self.session_key = session_key
+        self.cancelled = threading.Event()
+        self._loop = loop
+        self._events = events
+
+    def report(self, stage: str, message: Optional[str] = None):
+        """إرسال حدث progress للعميل (آمن من أي thread)"""
+        self.emit({
+            "type": "progress",
+            "stage": stage,
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    def emit(self, event: Dict[str, Any]):
+        """إرسال أي حدث للعميل بالترتيب مع باقي أحداث الدور (آمن من أي thread)"""
+        try:
+            self._loop.call_soon_threadsafe(self._events.put_nowait, event)
+        except RuntimeError:
+            # الـ loop أُغلق — لا يوجد من يستقبل الحدث
+            pass
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise TurnCancelled(f"تم إلغاء الدور للجلسة {self.session_key}")
+
+
+_current_turn: contextvars.ContextVar[Optional[TurnContext]] = contextvars.ContextVar("agent_turn", default=None)
+
+
+def current_turn() -> Optional[TurnContext]:
+    return _current_turn.get()
+
+
+def report_progress(stage: str, message: Optional[str] = None):
+    """إبلاغ العميل بمرحلة التنفيذ الحالية (لا يفعل شيئاً خارج TurnRunner)"""
+    turn = current_turn()
+    if turn is not None:
+        turn.report(stage, message)
+
+
+def emit_event(event: Dict[str, Any]):
+    """إرسال حدث للعميل أثناء الدور (مثل assistant_delta) — لا يفعل شيئاً خارج TurnRunner"""
+    turn = current_turn()
+    if turn is not None:
+        turn.emit(event)
+
+
+def check_cancelled():
+    """نقطة فحص: ترفع TurnCancelled إذا أُلغي الدور الحالي"""
+    turn = current_turn()
+    if turn is not None:
+        turn.check_cancelled()
+
+
+class TurnRunner:
+    """تشغيل أدوار الوكلاء خارج الـ event loop مع ترتيب لكل جلسة"""
+
+    _DONE = object()
+
+    def __init__(self, max_workers: int = 4, typing_interval: float = 5.0, timeout: Optional[float] = None):
+        self.max_workers = max_workers
+        self.typing_interval = typing_interval
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-turn")
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._session_users: Dict[str, int] = {}
+        self._active = 0
+        self._waiting = 0
+        self._completed = 0
+        self._cancelled = 0
+
+    async def run(
+        self,
+        session_key: str,
+        fn: Callable[..., Any],
+        *args,
+        on_event: Optional[EventCallback] = None,
+        **kwargs
+    ) -> Any:
+        """
+        تنفيذ fn(*args, **kwargs) في thread pool بعد انتهاء الأدوار السابقة لنفس الجلسة
+
+        Args:
+            session_key: مفتاح الترتيب (session_id أو معرف الاتصال)
+            fn: coroutine function (تُنفذ كمهمة على نفس الـ loop) أو دالة متزامنة (تُنفذ في thread pool)
+            on_event: coroutine تستقبل أحداث typing / progress أثناء التنفيذ
+
+        Raises:
+            asyncio.CancelledError: إذا أُلغيت المهمة المنتظرة (يُلغى الدور معها)
+            asyncio.TimeoutError: إذا تجاوز الدور AGENT_TURN_TIMEOUT
+        """
+        lock = self._acquire_lock_ref(session_key)
+        self._waiting += 1
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._waiting -= 1
+            self._release_lock_ref(session_key)
+            raise
+        self._waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        turn = TurnContext(session_key, loop, events)
+
+        self._active += 1
+        if asyncio.iscoroutinefunction(fn):
+            async def _call_async():
+                _current_turn.set(turn)  # المهمة لها نسخة context خاصة بها
+                turn.check_cancelled()
+                return await fn(*args, **kwargs)
+
+            future = asyncio.ensure_future(_call_async())
+        else:
+            def _call():
+                token = _current_turn.set(turn)
+                try:
+                    turn.check_cancelled()
+                    return fn(*args, **kwargs)
+                finally:
+                    _current_turn.reset(token)
+
+            future = loop.run_in_executor(self._executor, _call)
+        future.add_done_callback(lambda _: events.put_nowait(self._DONE))
+        released = False
+        try:
+            await self._pump(future, events, on_event, loop.time() + self.timeout if self.timeout else None)
+            result = await future
+            self._completed += 1
+            return result
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            turn.cancelled.set()
+            self._cancelled += 1
+            if not future.done():
+                # الـ thread (أو أداة في tools.executor) ما زال يعمل —
+                # الجلسة تبقى مقفلة حتى يتوقف فعلياً
+                if isinstance(future, asyncio.Task):
+                    future.cancel()
+                released = True
+                asyncio.ensure_future(self._release_when_done(future, lock, session_key))
+            raise
+        finally:
+            if not released:
+                self._active -= 1
+                lock.release()
+                self._release_lock_ref(session_key)
+
+    async def _pump(self, future: asyncio.Future, events: asyncio.Queue,
+                    on_event: Optional[EventCallback], deadline: Optional[float]):
+        """تمرير الأحداث للعميل حتى ينتهي الدور، مع typing دوري"""
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = self.typing_interval
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                wait = min(wait, remaining)
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=wait)
+            except asyncio.TimeoutError:
+                if deadline is not None and loop.time() >= deadline:
+                    raise
+                event = {"type": "typing", "status": True}
+            if event is self._DONE:
+                return
+            if on_event is not None:
+                try:
+                    await on_event(event)
+                except Exception as e:
+                    print(f"Warning: Failed to send turn event: {str(e)}")
+
+    async def _release_when_done(self, future: asyncio.Future, lock: asyncio.Lock, session_key: str):
+        try:
+            await asyncio.wait({future})
+            if not future.cancelled():
+                future.exception()  # TurnCancelled المتوقع — لا داعي لتحذير "never retrieved"
+        finally:
+            self._active -= 1
+            lock.release()
+            self._release_lock_ref(session_key)
+
+    def _acquire_lock_ref(self, session_key: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_key)
+        if lock is None:
+            lock = self._session_locks[session_key] = asyncio.Lock()
+        self._session_users[session_key] = self._session_users.get(session_key, 0) + 1
+        return lock
+
+    def _release_lock_ref(self, session_key: str):
+        users = self._session_users.get(session_key, 0) - 1
+        if users <= 0:
+            self._session_users.pop(session_key, None)
+            self._session_locks.pop(session_key, None)
+        else:
+            self._session_users[session_key] = users
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "active": self._active,
+            "waiting": self._waiting,
+            "sessions": len(self._session_locks),
+            "completed": self._completed,
+            "cancelled": self._cancelled
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+turn_runner = TurnRunner(
+    max_workers=settings.AGENT_TURN_WORKERS,
+    typing_interval=settings.AGENT_TYPING_INTERVAL,
+    timeout=settings.AGENT_TURN_TIMEOUT or None
+)
@@ -4,12 +4,42 @@
 وكيل X - نسخة مبسطة بدون autogen
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, Union
 import re
-from .tools import x_login, x_post, x_update_profile, x_delete_account
+from .tools import (
+    run_tool,
+    x_login, x_post, x_update_profile, x_delete_account,
+    x_login_async, x_post_async, x_update_profile_async, x_delete_account_async
+)
+from .turn_runner import check_cancelled, report_progress
 from app.utils.validators import sanitize_text, sanitize_username, sanitize_account_name
 
 
+class ToolCall:
+    """أداة مطلوب تنفيذها لإكمال الطلب، مع طريقة صياغة الرد من نتيجتها"""
+    
+    def __init__(
+        self,
+        sync_tool: Callable[..., Dict[str, Any]],
+        async_tool: Callable[..., Awaitable[Dict[str, Any]]],
+        kwargs: Dict[str, Any],
+        format_result: Callable[[Dict[str, Any]], str],
+        stage: Optional[str] = None,
+        progress: Optional[str] = None
+    ):
+        self.sync_tool = sync_tool
+        self.async_tool = async_tool
+        self.kwargs = kwargs
+        self.format_result = format_result
+        self.stage = stage
+        self.progress = progress
+    
+    def before(self):
+        check_cancelled()
+        if self.stage:
+            report_progress(self.stage, self.progress)
+
+
 class XAgent:
     """وكيل X المبسط"""
     
@@ -100,6 +130,25 @@ class XAgent:
     
     def process_request(self, message: str, context: Dict[str, Any] = None) -> str:
         """معالجة طلب"""
+        step = self._plan(message, context)
+        if not isinstance(step, ToolCall):
+            return step
+        
+        step.before()
+        return step.format_result(step.sync_tool(**step.kwargs))
+    
+    async def process_request_async(self, message: str, context: Dict[str, Any] = None) -> str:
+        """معالجة طلب (async) — الأدوات تُنتظر عبر الـ executor المشترك بدون حجز الـ event loop"""
+        # _plan قد يقرأ قاعدة البيانات (حسابي)
+        step = await run_tool(self._plan, message, context)
+        if not isinstance(step, ToolCall):
+            return step
+        
+        step.before()
+        return step.format_result(await step.async_tool(**step.kwargs))
+    
+    def _plan(self, message: str, context: Dict[str, Any] = None) -> Union[ToolCall, str, None]:
+        """تحديد الأداة المطلوبة، أو رد مباشر إذا كانت البيانات ناقصة"""
         
         # تنظيف الرسالة من المحتوى الخبيث
         message = sanitize_text(message, max_length=1000, allow_arabic=True)
@@ -123,12 +172,18 @@ class XAgent:
                 label = sanitize_account_name(label)
             
             if username and password:
-                result = x_login(username, password, label, user_id=user_id)
+                def format_login(result: Dict[str, Any]) -> str:
+                    if result.get("success"):
+                        return f"✅ تم تسجيل الدخول بنجاح!\n\n📝 الحساب: {label}\n👤 اسم المستخدم: {username}\n\nيمكنك الآن استخدام هذا الحساب للنشر وإدارة المحتوى."
+                    else:
+                        return f"❌ فشل تسجيل الدخول\n\n{result.get('message', 'حدث خطأ غير متوقع')}"
                 
-                if result.get("success"):
-                    return f"✅ تم تسجيل الدخول بنجاح!\n\n📝 الحساب: {label}\n👤 اسم المستخدم: {username}\n\nيمكنك الآن استخدام هذا الحساب للنشر وإدارة المحتوى."
-                else:
-                    return f"❌ فشل تسجيل الدخول\n\n{result.get('message', 'حدث خطأ غير متوقع')}"
+                return ToolCall(
+                    x_login, x_login_async,
+                    {"username": username, "password": password, "label": label, "user_id": user_id},
+                    format_login,
+                    stage="x_login", progress=f"جاري تسجيل الدخول إلى حساب {username}..."
+                )
             else:
                 missing = []
                 if not username:
@@ -148,11 +203,10 @@ class XAgent:
                 account = sanitize_account_name(account)
             
             if content:
-                result = x_post(account, content)
-                
-                if result.get("success"):
-                    return f"✅ تم نشر التغريدة بنجاح على حساب '{account}'\n\n📝 المحتوى: {content}"
-                else:
+                def format_post(result: Dict[str, Any]) -> str:
+                    if result.get("success"):
+                        return f"✅ تم نشر التغريدة بنجاح على حساب '{account}'\n\n📝 المحتوى: {content}"
+                    
                     error_msg = result.get('message', 'حدث خطأ غير متوقع')
                     
                     # رسالة خطأ ديناميكية تعرض الحساب الفعلي المستخدم
@@ -171,6 +225,13 @@ class XAgent:
                         response += f"💡 **اقتراح:** تأكد من أن الحساب '{account}' مسجل دخول ونشط"
                     
                     return response
+                
+                return ToolCall(
+                    x_post, x_post_async,
+                    {"label": account, "text": content},
+                    format_post,
+                    stage="x_post", progress=f"جاري نشر التغريدة على حساب {account}..."
+                )
             else:
                 return "⚠️ يرجى تقديم محتوى التغريدة\n\nمثال: انشر \"سبحان الله\""
         
@@ -185,10 +246,17 @@ class XAgent:
             
             if account and account != "default_account":
                 print(f"[DEBUG] X_Agent: Deleting account '{account}' for user_id={user_id}")
-                result = x_delete_account(account, user_id=user_id)
-                response_message = result.get("message", "تم محاولة حذف الحساب")
-                print(f"[DEBUG] X_Agent: Delete result - success={result.get('success')}, message={response_message[:100] if response_message else 'None'}")
-                return response_message
+                
+                def format_delete(result: Dict[str, Any]) -> str:
+                    response_message = result.get("message", "تم محاولة حذف الحساب")
+                    print(f"[DEBUG] X_Agent: Delete result - success={result.get('success')}, message={response_message[:100] if response_message else 'None'}")
+                    return response_message
+                
+                return ToolCall(
+                    x_delete_account, x_delete_account_async,
+                    {"account_name": account, "user_id": user_id},
+                    format_delete
+                )
             else:
                 return "⚠️ يرجى تحديد اسم الحساب المراد حذفه\n\nمثال: احذف حساب test_user"
         
@@ -197,8 +265,12 @@ class XAgent:
             name = entities.get("name")
             bio = entities.get("bio")
             
-            result = x_update_profile(account, name=name, bio=bio)
-            return result.get("message", "تم محاولة تحديث الملف الشخصي")
+            return ToolCall(
+                x_update_profile, x_update_profile_async,
+                {"label": account, "name": name, "bio": bio},
+                lambda result: result.get("message", "تم محاولة تحديث الملف الشخصي"),
+                stage="x_update_profile", progress=f"جاري تحديث الملف الشخصي لحساب {account}..."
+            )
         
         # إذا لم يتم التعرف على النية، لا ترجع شيء (دع الوكيل الرئيسي يتعامل معها)
         return None
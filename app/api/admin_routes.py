@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
 from app.db.database import get_db
-from app.db.models import User, XAccount, Conversation, Message, SocialAccount
+from app.db.models import User, Conversation, SocialAccount
 from app.auth.admin_dependencies import require_admin
+from app.services.memory_service import memory_service
+from app.services.rollup_service import (
+    rollup_service, user_metrics, users_created_on,
+    USERS_TOTAL, USERS_ACTIVE, USERS_ADMIN, X_ACCOUNTS_TOTAL,
+    CONVERSATIONS_TOTAL, MESSAGES_TOTAL, ACCOUNTS_TOTAL
+)
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -68,6 +73,9 @@ class DashboardStats(BaseModel):
     admin_users: int
     total_x_accounts: int
     users_created_today: int
+    total_conversations: int = 0
+    total_messages: int = 0
+    total_social_accounts: int = 0
 
 
 class UpdateUserRequest(BaseModel):
@@ -86,24 +94,19 @@ async def get_dashboard_stats(
     admin_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    inactive_users = db.query(User).filter(User.is_active == False).count()
-    admin_users = db.query(User).filter(User.is_admin == True).count()
-    total_x_accounts = db.query(XAccount).count()
-    
-    today = datetime.utcnow().date()
-    users_created_today = db.query(User).filter(
-        func.date(User.created_at) == today
-    ).count()
+    # عدادات stat_rollups المحسوبة مسبقاً — استعلام واحد بدل COUNT على كل جدول
+    rollups = rollup_service.get(db)
     
     return DashboardStats(
-        total_users=total_users,
-        active_users=active_users,
-        inactive_users=inactive_users,
-        admin_users=admin_users,
-        total_x_accounts=total_x_accounts,
-        users_created_today=users_created_today
+        total_users=rollups[USERS_TOTAL],
+        active_users=rollups[USERS_ACTIVE],
+        inactive_users=rollups[USERS_TOTAL] - rollups[USERS_ACTIVE],
+        admin_users=rollups[USERS_ADMIN],
+        total_x_accounts=rollups[X_ACCOUNTS_TOTAL],
+        users_created_today=rollups[users_created_on(datetime.utcnow().date())],
+        total_conversations=rollups[CONVERSATIONS_TOTAL],
+        total_messages=rollups[MESSAGES_TOTAL],
+        total_social_accounts=rollups[ACCOUNTS_TOTAL]
     )
 
 
@@ -116,18 +119,13 @@ async def get_all_users(
 ):
     users = db.query(User).offset(skip).limit(limit).all()
     
+    # عدادات كل المستخدمين في استعلام واحد
+    rollups = rollup_service.get_many(
+        db, [user.id for user in users], [CONVERSATIONS_TOTAL, ACCOUNTS_TOTAL]
+    )
+    
     result = []
     for user in users:
-        # عدد المحادثات
-        conversations_count = db.query(Conversation).filter(
-            Conversation.user_id == user.id
-        ).count()
-        
-        # عدد الحسابات الاجتماعية
-        social_accounts_count = db.query(SocialAccount).filter(
-            SocialAccount.user_id == user.id
-        ).count()
-        
         result.append(UserListResponse(
             id=user.id,
             email=user.email,
@@ -137,8 +135,8 @@ async def get_all_users(
             is_active=user.is_active,
             created_at=user.created_at.isoformat(),
             x_accounts_count=len(user.x_accounts),
-            conversations_count=conversations_count,
-            social_accounts_count=social_accounts_count
+            conversations_count=rollups[user.id][CONVERSATIONS_TOTAL],
+            social_accounts_count=rollups[user.id][ACCOUNTS_TOTAL]
         ))
     
     return result
@@ -164,6 +162,8 @@ async def update_user(
             detail="Cannot deactivate your own account"
         )
     
+    before = user_metrics(user, sign=-1)
+    
     if request.is_admin is not None:
         user.is_admin = request.is_admin
     if request.is_active is not None:
@@ -171,9 +171,16 @@ async def update_user(
     if request.name is not None:
         user.name = request.name
     
+    deltas = dict(before)
+    for metric, delta in user_metrics(user).items():
+        deltas[metric] = deltas.get(metric, 0) + delta
+    rollup_service.add(db, deltas)
+    
     db.commit()
     db.refresh(user)
     
+    rollups = rollup_service.get(db, user_id=user.id)
+    
     return UserListResponse(
         id=user.id,
         email=user.email,
@@ -182,7 +189,9 @@ async def update_user(
         is_admin=user.is_admin,
         is_active=user.is_active,
         created_at=user.created_at.isoformat(),
-        x_accounts_count=len(user.x_accounts)
+        x_accounts_count=len(user.x_accounts),
+        conversations_count=rollups[CONVERSATIONS_TOTAL],
+        social_accounts_count=rollups[ACCOUNTS_TOTAL]
     )
 
 
@@ -224,11 +233,10 @@ async def get_user_details(
     
     conversations_info = []
     total_messages = 0
+    message_counts = memory_service.get_message_counts(db, [conv.id for conv in conversations])
     
     for conv in conversations:
-        messages_count = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).count()
+        messages_count = message_counts.get(conv.id, 0)
         total_messages += messages_count
         
         conversations_info.append(ConversationInfo(
@@ -272,6 +280,10 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
     
+    deltas = user_metrics(user, sign=-1)
+    deltas[X_ACCOUNTS_TOTAL] = -len(user.x_accounts)  # تُحذف معه (cascade)
+    rollup_service.add(db, deltas)
+    
     db.delete(user)
     db.commit()
     
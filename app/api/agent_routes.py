@@ -61,7 +61,7 @@ async def send_message_to_agent(
         if current_user:
             user_id = current_user.id
         
-        result = agent_manager.process_user_message(
+        result = await agent_manager.process_user_message_async(
             message=request.message,
             user_id=user_id
         )
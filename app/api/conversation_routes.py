@@ -88,6 +88,7 @@ async def get_user_conversations(
             raise HTTPException(status_code=400, detail="user_id مطلوب")
         
         conversations = memory_service.get_user_conversations(db, user_id, limit)
+        message_counts = memory_service.get_message_counts(db, [conv.id for conv in conversations])
         
         return [
             ConversationResponse(
@@ -97,7 +98,7 @@ async def get_user_conversations(
                 title=conv.title or "محادثة",
                 created_at=conv.created_at.isoformat(),
                 updated_at=conv.updated_at.isoformat(),
-                message_count=len(conv.messages)
+                message_count=message_counts.get(conv.id, 0)
             )
             for conv in conversations
         ]
@@ -311,24 +312,10 @@ async def get_conversations_summary(
         if not user_id:
             raise HTTPException(status_code=400, detail="user_id مطلوب")
         
-        conversations = memory_service.get_user_conversations(db, user_id, limit=100)
-        
-        total_messages = sum(len(conv.messages) for conv in conversations)
-        
-        # حساب النوايا الأكثر استخداماً
-        intent_counts = {}
-        for conv in conversations:
-            for msg in conv.messages:
-                if msg.intent:
-                    intent_counts[msg.intent] = intent_counts.get(msg.intent, 0) + 1
-        
-        top_intents = sorted(intent_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        stats = memory_service.get_conversation_stats(db, user_id, limit=100)
         
         return {
-            "total_conversations": len(conversations),
-            "total_messages": total_messages,
-            "top_intents": [{"intent": intent, "count": count} for intent, count in top_intents],
-            "last_conversation": conversations[0].updated_at.isoformat() if conversations else None,
+            **stats,
             "timestamp": datetime.now().isoformat()
         }
     
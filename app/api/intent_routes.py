@@ -5,12 +5,18 @@ Intent API Routes
 API endpoints لنظام التعرف على النوايا
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import json
 
-from app.services.intent_service import intent_service, IntentType, Platform
+from app.core.config import settings
+from app.services.intent_service import intent_service, detect_intents_chunk, IntentType, Platform
+from app.services.intent_cache import intent_cache
 from app.auth.dependencies import get_current_user
 from app.db.models import User
 
@@ -33,6 +39,7 @@ class IntentResponse(BaseModel):
     raw_text: str = Field(..., description="النص الأصلي")
     timestamp: str = Field(..., description="وقت المعالجة")
     suggestions: Optional[List[str]] = Field(None, description="اقتراحات للإجراءات")
+    elapsed_ms: Optional[float] = Field(None, description="زمن التحليل بالمللي ثانية (batch)")
 
 
 class IntentSuggestionRequest(BaseModel):
@@ -132,32 +139,57 @@ async def list_supported_intents():
     )
 
 
+@router.get("/cache/stats")
+async def get_intent_cache_stats():
+    """
+    إحصائيات التخزين المؤقت لنتائج النوايا في هذه العملية
+    
+    hits (من الذاكرة)، redis_hits (من Redis المشترك)، misses، evictions، hit_rate
+    """
+    return intent_cache.stats()
+
+
 @router.post("/batch", response_model=List[IntentResponse])
 async def detect_batch_intents(
     requests: List[IntentRequest],
+    stream: bool = Query(False, description="إرجاع النتائج كـ NDJSON أول بأول"),
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """
     التعرف على نوايا متعددة دفعة واحدة
     
-    مفيد لمعالجة عدة رسائل أو أوامر في وقت واحد
+    مفيد لمعالجة عدة رسائل أو أوامر في وقت واحد:
+    - النصوص المكررة داخل الدفعة تُحلل مرة واحدة
+    - التحليل يتم خارج الـ event loop (threads للدفعات الصغيرة،
+      وعمليات منفصلة عند تجاوز INTENT_BATCH_PROCESS_THRESHOLD نص مختلف)
+    - كل نتيجة فيها elapsed_ms
+    - stream=true: النتائج تُرسل سطراً سطراً (application/x-ndjson) مع index
+      الخاص بكل رسالة وبترتيب الانتهاء
     """
+    positions: Dict[str, List[int]] = {}
+    for index, req in enumerate(requests):
+        positions.setdefault(req.text, []).append(index)
+
+    if stream:
+        async def ndjson() -> AsyncIterator[str]:
+            try:
+                async for chunk in _detect_unique_texts(list(positions)):
+                    for data in chunk:
+                        item = _batch_response(data).model_dump()
+                        for index in positions[data["raw_text"]]:
+                            yield json.dumps({"index": index, **item}, ensure_ascii=False) + "\n"
+            except Exception as e:
+                yield json.dumps({"error": f"Error detecting batch intents: {str(e)}"}, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
     try:
-        results = []
-        
-        for req in requests:
-            result = intent_service.detect_intent(req.text)
-            suggestions = _generate_action_suggestions(result.intent, result.entities)
-            
-            results.append(IntentResponse(
-                intent=result.intent.value,
-                confidence=result.confidence,
-                entities=result.entities,
-                platform=result.platform.value if result.platform else None,
-                raw_text=result.raw_text,
-                timestamp=result.timestamp.isoformat(),
-                suggestions=suggestions
-            ))
+        results: List[Optional[IntentResponse]] = [None] * len(requests)
+        async for chunk in _detect_unique_texts(list(positions)):
+            for data in chunk:
+                response = _batch_response(data)
+                for index in positions[data["raw_text"]]:
+                    results[index] = response
         
         return results
     
@@ -168,6 +200,61 @@ async def detect_batch_intents(
         )
 
 
+_batch_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_batch_pool() -> ProcessPoolExecutor:
+    """ProcessPoolExecutor مشترك — يُنشأ عند أول دفعة كبيرة"""
+    global _batch_pool
+    if _batch_pool is None:
+        _batch_pool = ProcessPoolExecutor(max_workers=settings.INTENT_BATCH_WORKERS or None)
+    return _batch_pool
+
+
+def shutdown_batch_pool():
+    """إيقاف عمليات الدفعات عند إيقاف التطبيق"""
+    global _batch_pool
+    if _batch_pool is not None:
+        _batch_pool.shutdown(wait=False, cancel_futures=True)
+        _batch_pool = None
+
+
+async def _detect_unique_texts(texts: List[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """تقسيم النصوص إلى مجموعات وتحليلها خارج الـ event loop، وإرجاع كل مجموعة عند انتهائها"""
+    if not texts:
+        return
+
+    loop = asyncio.get_running_loop()
+    # None = thread pool الافتراضي (يكفي للدفعات الصغيرة بدون تكلفة إرسال البيانات لعملية أخرى)
+    executor = _get_batch_pool() if len(texts) >= settings.INTENT_BATCH_PROCESS_THRESHOLD else None
+    size = max(1, settings.INTENT_BATCH_CHUNK_SIZE)
+    futures = [
+        loop.run_in_executor(executor, detect_intents_chunk, texts[i:i + size])
+        for i in range(0, len(texts), size)
+    ]
+    try:
+        for future in asyncio.as_completed(futures):
+            yield await future
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _batch_response(data: Dict[str, Any]) -> IntentResponse:
+    """تحويل نتيجة detect_intents_chunk إلى IntentResponse"""
+    intent = IntentType(data["intent"])
+    return IntentResponse(
+        intent=intent.value,
+        confidence=data["confidence"],
+        entities=data["entities"],
+        platform=data["platform"],
+        raw_text=data["raw_text"],
+        timestamp=data["timestamp"],
+        suggestions=_generate_action_suggestions(intent, data["entities"]),
+        elapsed_ms=data["elapsed_ms"]
+    )
+
+
 def _generate_action_suggestions(intent: IntentType, entities: Dict[str, Any]) -> List[str]:
     """إنشاء اقتراحات للإجراءات بناءً على النية"""
     suggestions = []
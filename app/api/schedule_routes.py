@@ -1,13 +1,21 @@
+from typing import List
+
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
-from app.services.schedule_service import create_schedule_event
+from app.scheduler.publisher import publisher
+from app.scheduler.schedule_queue import schedule_queue
+from app.scheduler.tick import tick_metrics, output_writer
+from app.services.schedule_service import create_schedule_event, create_schedule_events
+from app.services.slot_allocator import slot_allocator
 
 router = APIRouter(prefix="/api", tags=["schedule"])
 
 ALLOWED_PLATFORMS = {"x", "instagram", "facebook", "linkedin", "tiktok"}
+# أقصى منشورات في طلب جدولة واحد
+MAX_BULK_EVENTS = 5000
 
 
 class ScheduleEventInput(BaseModel):
@@ -50,3 +58,39 @@ async def schedule_event(
         return event.to_dict()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+class ScheduleEventsBulkInput(BaseModel):
+    events: List[ScheduleEventInput] = Field(..., min_length=1, max_length=MAX_BULK_EVENTS)
+
+
+@router.post("/schedule-events/bulk")
+def schedule_events_bulk(
+    payload: ScheduleEventsBulkInput,
+    db: Session = Depends(get_db),
+):
+    """
+    جدولة دفعة منشورات في commit واحد؛ slot_allocator يوزعها على دقائق نوافذها
+    مع فاصل لكل حساب وحد أقصى لكل دقيقة.
+    دالة عادية (def): FastAPI ينفذها في threadpool لأن الدفعة تستغرق ثواني.
+    """
+    try:
+        events = create_schedule_events(db, [item.model_dump() for item in payload.events])
+        return {"count": len(events), "events": [event.to_dict() for event in events]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/schedule-events/metrics")
+async def schedule_metrics():
+    """
+    مقاييس المجدول: الأحداث القادمة، التحويل إلى READY_TO_PUBLISH (ومرات اللحاق بتراكم)، كتابة المخرجات،
+    والنشر (PUBLISHED / FAILED وزمن run_at → النشر).
+    """
+    return {
+        "queue": schedule_queue.stats(),
+        "transitions": tick_metrics.stats(),
+        "outputs": output_writer.stats(),
+        "publisher": publisher.stats(),
+        "slots": slot_allocator.stats(),
+    }
@@ -14,7 +14,7 @@ import tempfile
 import os
 
 from app.x.modules.x_login import TwitterLoginAdvanced
-from app.x.modules.x_post import post_to_x
+from app.x.modules.x_engine import post_to_x_async
 from app.x.modules.x_profile import update_profile_on_x
 from app.x.modules.utils import download_to_temp, is_url, safe_label
 from app.auth.dependencies import get_current_user
@@ -162,7 +162,7 @@ async def x_post(
                     )
             
             # النشر
-            post_to_x(
+            await post_to_x_async(
                 storage_state_path=storage_state_path,
                 text=request.text,
                 media_path=media_path,
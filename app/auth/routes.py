@@ -7,6 +7,7 @@ from typing import Optional
 
 from app.db.database import get_db
 from app.db.models import User
+from app.services.rollup_service import rollup_service, user_metrics
 from app.db.redis_client import RedisClient
 from app.auth.security import (
     verify_password, 
@@ -90,6 +91,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
+    rollup_service.add(db, user_metrics(new_user))
     db.commit()
     db.refresh(new_user)
     
@@ -20,6 +20,17 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4"
     OPENAI_MAX_TOKENS: int = 2000
     OPENAI_TEMPERATURE: float = 0.7
+    OPENAI_BASE_URL: Optional[str] = None  # خادم متوافق مع OpenAI (فارغ = api.openai.com)
+    OPENAI_STREAM: bool = True  # بث رد الذكاء الاصطناعي في /ws/chat كـ assistant_delta
+    AI_HISTORY_TOKEN_BUDGET: int = 3000  # توكنز سجل المحادثة في كل طلب (بدون system prompt)
+    AI_HISTORY_MAX_SESSIONS: int = 1000  # جلسات نشطة في الذاكرة (LRU)
+    AI_HISTORY_LOAD_LIMIT: int = 50  # رسائل تُحمَّل من قاعدة البيانات للجلسة غير الموجودة في الذاكرة
+    MEMORY_CONTEXT_TOKEN_BUDGET: int = 1500  # حجم سياق المحادثة للوكيل (ملخص + آخر الرسائل)
+    MEMORY_SUMMARY_EVERY: int = 10  # تحديث الملخص كلما تجمعت هذه الرسائل خارج آخر الرسائل
+    MEMORY_SUMMARY_TOKEN_BUDGET: int = 500
+    MEMORY_WRITE_BUFFER: bool = True  # تجميع كتابات الرسائل في transaction واحدة
+    MEMORY_WRITE_FLUSH_MS: int = 50
+    MEMORY_WRITE_BATCH_SIZE: int = 100
 
     JWT_SECRET_KEY: Optional[str] = None  # اجعلها str لو تبي تفرض وجوده
     JWT_ALGORITHM: str = "HS256"
@@ -27,6 +38,19 @@ class Settings(BaseSettings):
 
     ENCRYPTION_KEY: Optional[str] = None
 
+    # قاعدة البيانات: sqlite (data/app.db) أو postgresql (إعدادات POSTGRES_*، يحتاج psycopg2)
+    DATABASE_URL: Optional[str] = None  # رابط كامل يتجاوز DB_BACKEND
+    DB_BACKEND: str = "sqlite"
+    DB_POOL_SIZE: int = 10  # اتصالات دائمة في الـ pool
+    DB_MAX_OVERFLOW: int = 20  # اتصالات إضافية مؤقتة عند الضغط
+    DB_POOL_TIMEOUT: int = 30  # ثواني انتظار اتصال متاح
+    DB_POOL_RECYCLE: int = 1800  # إعادة فتح الاتصال بعد هذه الثواني (PostgreSQL)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 15000  # انتظار قفل الكتابة قبل "database is locked"
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE_MB: int = 256
+
     POSTGRES_HOST: Optional[str] = "localhost"
     POSTGRES_PORT: int = 5432
     POSTGRES_USER: Optional[str] = None
@@ -44,5 +68,44 @@ class Settings(BaseSettings):
     N8N_WEBHOOK_URL: Optional[str] = None
     N8N_WEBHOOK_ENABLED: bool = False
 
+    # Intent batch (/api/intent/batch)
+    INTENT_BATCH_PROCESS_THRESHOLD: int = 500  # عدد النصوص المختلفة الذي يبدأ عنده استخدام عمليات منفصلة
+    INTENT_BATCH_CHUNK_SIZE: int = 200
+    INTENT_BATCH_WORKERS: int = 0  # 0 = عدد أنوية المعالج
+
+    # Intent cache (LRU + TTL، و Redis اختياري لمشاركة النتائج بين العمال)
+    INTENT_CACHE_ENABLED: bool = True
+    INTENT_CACHE_MAX_SIZE: int = 5000
+    INTENT_CACHE_TTL: int = 3600
+    INTENT_CACHE_REDIS: bool = False
+
+    # Agent turns (معالجة رسائل الشات خارج الـ event loop)
+    AGENT_TURN_WORKERS: int = 4
+    AGENT_TURN_TIMEOUT: int = 600  # ثواني، 0 = بدون حد
+    AGENT_TYPING_INTERVAL: float = 5.0
+    AGENT_TOOL_WORKERS: int = 4  # executor مشترك لأدوات الوكلاء (x_login / x_post ...)
+    AGENT_TOOL_TIMEOUT: int = 300  # ثواني لكل أداة في النسخ async، 0 = بدون حد
+
+    # Scheduler (schedule_events)
+    SCHEDULER_RECONCILE_INTERVAL: int = 300  # ثواني بين إعادة تحميل الأحداث من الجدول (أحداث عمليات أخرى)
+    SCHEDULER_CLAIM_BATCH: int = 500  # أحداث مستحقة تُحوَّل في UPDATE واحد
+    SCHEDULER_OUTPUT_MODE: str = "files"  # files = JSON لكل حدث، ndjson = سطر في events.ndjson
+    SCHEDULER_LEASE_SECONDS: int = 60  # مدة حجز دفعة لعامل واحد قبل أن يأخذها غيره
+    SCHEDULER_WORKER_ID: Optional[str] = None  # فارغ = hostname-pid
+    SCHEDULE_SLOT_ALLOCATOR: bool = True  # توزيع run_at على الدقائق حسب الحمل، False = offset عشوائي في النافذة
+    SCHEDULE_ACCOUNT_SPACING: int = 300  # أقل فاصل (ثواني) بين منشورين مجدولين لنفس الحساب
+    SCHEDULE_MAX_PER_MINUTE: int = 10  # أقصى أحداث في نفس الدقيقة لكل الحسابات
+    SCHEDULE_MAX_DAYS_AHEAD: int = 7  # أيام تالية تُجرب عند امتلاء النافذة
+
+    # Publisher (نشر أحداث READY_TO_PUBLISH على X)
+    PUBLISHER_ENABLED: bool = False  # ينشر فقط الأحداث التي أصبحت جاهزة بعد تفعيله (auto_publish)
+    PUBLISHER_CONCURRENCY: int = 4  # منشورات في نفس الوقت
+    PUBLISHER_ACCOUNT_INTERVAL: int = 60  # أقل فاصل (ثواني) بين منشورين من نفس الحساب
+    PUBLISHER_MAX_ATTEMPTS: int = 3
+    PUBLISHER_RETRY_BACKOFF: int = 60  # ثواني قبل أول إعادة محاولة، تتضاعف بعدها
+    PUBLISHER_LEASE_SECONDS: int = 300  # مدة حجز الحدث، تُمدد كل ثلثها أثناء النشر
+    PUBLISHER_POLL_INTERVAL: int = 30  # فحص الجدول (أحداث عمليات أخرى وإعادة المحاولات)
+    PUBLISHER_MAX_LATENCY: int = 0  # ثواني بعد run_at يُعتبر بعدها الحدث منتهياً (FAILED)، 0 = بدون حد
+
 
 settings = Settings()
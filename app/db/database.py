@@ -1,18 +1,97 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
 
+from app.core.config import settings
+
 # SQLite database path
 DB_PATH = Path(__file__).parent.parent.parent / "data" / "app.db"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+def database_url() -> str:
+    """
+    رابط قاعدة البيانات حسب الإعدادات:
+    DATABASE_URL إن وُجد، وإلا DB_BACKEND (sqlite أو postgresql من إعدادات POSTGRES_*)
+    """
+    if settings.DATABASE_URL:
+        return settings.DATABASE_URL
+    if settings.DB_BACKEND == "postgresql":
+        return URL.create(
+            "postgresql+psycopg2",
+            username=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            database=settings.POSTGRES_DB
+        ).render_as_string(hide_password=False)
+    return f"sqlite:///{DB_PATH}"
+
+
+def sqlite_pragmas() -> dict:
+    """PRAGMAs تُطبق على كل اتصال SQLite جديد"""
+    return {
+        # WAL: القراءات لا تنتظر الكتابة والكتابة لا تنتظر القراءات
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        # NORMAL آمن مع WAL (لا fsync لكل commit، فقط عند checkpoint)
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        # انتظار القفل بدل "database is locked" فوراً
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        # قيمة سالبة = KiB
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+
+def create_db_engine(url: str) -> Engine:
+    """
+    إنشاء engine حسب نوع قاعدة البيانات:
+    - SQLite: pool بحجم DB_POOL_SIZE + PRAGMAs (WAL / synchronous / busy_timeout / cache / mmap)
+    - PostgreSQL وغيره: pool اتصالات (DB_POOL_SIZE + DB_MAX_OVERFLOW) مع pre_ping و recycle
+    """
+    pool_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_pre_ping=True,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            **pool_options
+        )
+
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            # مهلة sqlite3 نفسها (بالثواني) — مثل busy_timeout
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000
+        },
+        **pool_options
+    )
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+SQLALCHEMY_DATABASE_URL = database_url()
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -30,6 +109,6 @@ def get_db():
 
 def init_db():
     """Initialize database tables"""
-    from app.db.models import User, XAccount, SocialAccount, Conversation, Message, ScheduleEvent
+    from app.db.models import User, XAccount, SocialAccount, Conversation, Message, ConversationSummary, StatRollup, ScheduleEvent
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully")
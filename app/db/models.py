@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -45,6 +45,10 @@ class XAccount(Base):
 class SocialAccount(Base):
     """حسابات وسائل التواصل الاجتماعي - دعم منصات متعددة"""
     __tablename__ = "social_accounts"
+    __table_args__ = (
+        # AccountService.get_user_accounts (user_id + platform/status اختياريان)
+        Index("ix_social_accounts_user_platform_status", "user_id", "platform", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -68,6 +72,10 @@ class SocialAccount(Base):
 class Conversation(Base):
     """محادثة مع المستخدم"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        # آخر محادثة للمستخدم (get_or_create_conversation / get_user_conversations)
+        Index("ix_conversations_user_updated", "user_id", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -78,6 +86,7 @@ class Conversation(Base):
     
     # Relationship with messages
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", order_by="Message.created_at")
+    summary = relationship("ConversationSummary", back_populates="conversation", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Conversation(id={self.id}, user_id={self.user_id}, title={self.title})>"
@@ -86,6 +95,10 @@ class Conversation(Base):
 class Message(Base):
     """رسالة في المحادثة"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # رسائل المحادثة مرتبة (get_conversation_history / ContextBuilder)
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
@@ -104,9 +117,53 @@ class Message(Base):
         return f"<Message(id={self.id}, role={self.role}, content={self.content[:50]}...)>"
 
 
+class ConversationSummary(Base):
+    """ملخص تراكمي للرسائل القديمة في المحادثة (يُحدَّث كل عدة رسائل)"""
+    __tablename__ = "conversation_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False, unique=True, index=True)
+    summary = Column(Text, nullable=False, default="")
+    last_message_id = Column(Integer, nullable=False, default=0)  # آخر رسالة داخلة في الملخص
+    message_count = Column(Integer, nullable=False, default=0)  # عدد الرسائل التي مرت على الملخص
+    token_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    conversation = relationship("Conversation", back_populates="summary")
+    
+    def __repr__(self):
+        return f"<ConversationSummary(conversation_id={self.conversation_id}, last_message_id={self.last_message_id})>"
+
+
+class StatRollup(Base):
+    """
+    عداد إحصائي محسوب مسبقاً (يُحدَّث مع كل كتابة بدل COUNT عند كل عرض)
+    user_id = 0 للإحصائيات العامة، metric مثل "messages.total" أو "intent:create_post"
+    """
+    __tablename__ = "stat_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "metric", name="uq_stat_rollups_user_metric"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, default=0)
+    metric = Column(String(150), nullable=False)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<StatRollup(user_id={self.user_id}, metric={self.metric}, value={self.value})>"
+
+
 class ScheduleEvent(Base):
     """حدث مجدول للنشر على وسائل التواصل الاجتماعي"""
     __tablename__ = "schedule_events"
+    __table_args__ = (
+        # الأحداث المستحقة (get_due_events)
+        Index("ix_schedule_events_status_run_at", "status", "run_at"),
+        # آخر نشر لكل حساب (فاصل الناشر بين منشورات الحساب)
+        Index("ix_schedule_events_status_published_at", "status", "published_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     schedule_event_id = Column(String(64), unique=True, index=True, nullable=False)
@@ -118,6 +175,14 @@ class ScheduleEvent(Base):
     intent_time = Column(String(50), nullable=False)
     mood = Column(String(50), nullable=False)
     status = Column(String(50), default="SCHEDULED", nullable=False)
+    claimed_by = Column(String(255), nullable=True)  # العامل (hostname-pid) الذي حجز الحدث
+    lease_until = Column(DateTime, nullable=True)  # بعدها يمكن لعامل آخر حجزه
+    attempts = Column(Integer, default=0, nullable=False)  # محاولات النشر
+    published_at = Column(DateTime, nullable=True)
+    post_url = Column(String(500), nullable=True)
+    last_error = Column(Text, nullable=True)
+    # أصبح جاهزاً والناشر مفعّل — الأحداث الأقدم (يقرؤها مستهلك خارجي من المخرجات) لا تُنشر
+    auto_publish = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -135,6 +200,9 @@ class ScheduleEvent(Base):
             "intent_time": self.intent_time,
             "mood": self.mood,
             "status": self.status,
+            "attempts": self.attempts,
+            "published_at": self.published_at.isoformat() if self.published_at else None,
+            "post_url": self.post_url,
         }
 
     def __repr__(self):
@@ -3,7 +3,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set
 import uvicorn
 import json
 from datetime import datetime
@@ -11,6 +11,7 @@ from typing import List
 import asyncio
 from pathlib import Path
 import uuid
+import time
 from io import BytesIO
 
 try:
@@ -23,7 +24,7 @@ from app.services.webhook_service import WebhookService
 from app.core.config import settings
 from app.db.database import init_db, get_db
 from app.auth.routes import router as auth_router
-from app.api.intent_routes import router as intent_router
+from app.api.intent_routes import router as intent_router, shutdown_batch_pool
 from app.api.admin_routes import router as admin_router
 from app.api.agent_routes import router as agent_router
 from app.api.conversation_routes import router as conversation_router
@@ -32,8 +33,13 @@ from app.api.admin_accounts_routes import router as admin_accounts_router
 from app.api.user_accounts_routes import router as user_accounts_router
 from app.api.schedule_routes import router as schedule_router
 from app.agents.agent_manager import agent_manager
+from app.agents.turn_runner import turn_runner, emit_event
+from app.agents.tools import run_tool, executor as tool_executor
 from app.services.memory_service import memory_service
-from app.scheduler.tick import scheduler_tick
+from app.services.message_buffer import message_buffer
+from app.scheduler.tick import scheduler_tick, output_writer as schedule_output_writer
+from app.scheduler.schedule_queue import schedule_queue
+from app.scheduler.publisher import publisher
 
 app = FastAPI(title="كنق الاتمته - Chatbot API", version="1.0.0")
 
@@ -63,7 +69,20 @@ async def startup_event():
         print("Check .env.agents file for LLM configuration")
 
     asyncio.create_task(scheduler_tick())
-    print("Scheduler tick started (every 30s)")
+    print("Scheduler tick started")
+    if settings.PUBLISHER_ENABLED:
+        publisher.start()
+        print("Publisher started")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_batch_pool()
+    turn_runner.shutdown()
+    tool_executor.shutdown(wait=False, cancel_futures=True)
+    message_buffer.close()
+    schedule_output_writer.close()
+    await publisher.stop()
 
 # Include auth routes
 app.include_router(auth_router)
@@ -143,9 +162,242 @@ async def get_chat_interface():
         return FileResponse(html_file)
     return HTMLResponse(content="<h1>Chat interface not found</h1>", status_code=404)
 
+def _remember_attachment(
+    db,
+    user_id: Optional[Any],
+    session_id: Optional[str],
+    attachment: Dict[str, Any]
+):
+    """حفظ رسالة مرفق بدون نص"""
+    try:
+        conversation = memory_service.get_or_create_conversation(
+            db=db,
+            user_id=user_id,
+            session_id=session_id
+        )
+        memory_service.add_message(
+            db=db,
+            conversation_id=conversation.id,
+            role="user",
+            content="",
+            metadata={"attachment": attachment}
+        )
+    except Exception as e:
+        print(f"Warning: Failed to persist attachment-only message: {str(e)}")
+
+
+async def _run_chat_turn(
+    user_message: str,
+    user_id: Optional[Any],
+    session_id: Optional[str],
+    attachment: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """دور محادثة كامل — الوكيل async وعمليات قاعدة البيانات والأدوات تعمل في tools.executor"""
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        if (not user_message or not str(user_message).strip()) and attachment:
+            await run_tool(_remember_attachment, db, user_id, session_id, attachment)
+            return None
+
+        # استخدام نظام الوكلاء الذكية مع الذاكرة
+        agent_result = await agent_manager.process_user_message_async(
+            message=user_message,
+            user_id=user_id,
+            session_id=session_id,
+            metadata={"attachment": attachment} if attachment else None,
+            db=db
+        )
+
+        # لم يرد أي وكيل (نية غير واضحة) — الرد من نموذج الذكاء الاصطناعي
+        if (
+            ai_service.client
+            and agent_result
+            and not agent_result.get("success")
+            and not agent_result.get("message")
+            and not agent_result.get("error")
+        ):
+            return await _run_ai_reply(db, user_message, user_id, session_id, agent_result)
+        return agent_result
+    finally:
+        db_gen.close()
+
+
+def _remember_ai_reply(
+    db,
+    conversation_id: Optional[int],
+    user_id: Optional[Any],
+    session_id: Optional[str],
+    content: str,
+    intent_result: Optional[Dict[str, Any]]
+):
+    """حفظ رد الذكاء الاصطناعي كاملاً (مرة واحدة بعد انتهاء البث)"""
+    try:
+        if conversation_id is None:
+            conversation_id = memory_service.get_or_create_conversation(
+                db=db,
+                user_id=user_id,
+                session_id=session_id
+            ).id
+        memory_service.add_message(
+            db=db,
+            conversation_id=conversation_id,
+            role="assistant",
+            content=content,
+            intent=(intent_result or {}).get("intent"),
+            confidence=(intent_result or {}).get("confidence"),
+            agent="AI_Service"
+        )
+    except Exception as e:
+        print(f"Warning: Failed to save AI reply: {str(e)}")
+    return conversation_id
+
+
+async def _run_ai_reply(
+    db,
+    user_message: str,
+    user_id: Optional[Any],
+    session_id: Optional[str],
+    agent_result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    رد AIService — مع OPENAI_STREAM تُرسل الأجزاء للعميل كـ assistant_delta فور وصولها
+    (عبر أحداث الدور، بنفس ترتيب typing / progress)، والرسالة النهائية تحمل stream_id نفسه
+    """
+    stream_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    first_token_ms = None
+
+    # سجل الجلسة يُحمَّل من جدول messages فقط إذا لم يكن في الذاكرة
+    conversation_id = agent_result.get("conversation_id")
+    history_key = session_id or (f"conversation-{conversation_id}" if conversation_id else None)
+    history_loader = None
+    if conversation_id:
+        history_loader = lambda: run_tool(
+            memory_service.get_chat_messages, db, conversation_id, settings.AI_HISTORY_LOAD_LIMIT
+        )
+
+    if settings.OPENAI_STREAM:
+        parts = []
+        async for delta in ai_service.stream_response(user_message, history_key, history_loader):
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+            parts.append(delta)
+            emit_event({
+                "type": "assistant_delta",
+                "stream_id": stream_id,
+                "delta": delta
+            })
+        response_message = "".join(parts)
+    else:
+        response_message = await ai_service.get_response(user_message, history_key, history_loader)
+
+    conversation_id = await run_tool(
+        _remember_ai_reply, db, conversation_id, user_id, session_id,
+        response_message, agent_result.get("intent_result")
+    )
+
+    return {
+        "success": True,
+        "message": response_message,
+        "intent_result": agent_result.get("intent_result"),
+        "agent": "AI_Service",
+        "conversation_id": conversation_id,
+        "stream_id": stream_id if settings.OPENAI_STREAM else None,
+        "first_token_ms": first_token_ms,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+async def _handle_chat_turn(
+    websocket: WebSocket,
+    session_key: str,
+    user_message: str,
+    user_id: Optional[Any],
+    session_id: Optional[str],
+    attachment: Optional[Dict[str, Any]]
+):
+    """تنفيذ دور في turn_runner وإرسال أحداث التقدم والرد للعميل"""
+    try:
+        agent_result = await turn_runner.run(
+            session_key,
+            _run_chat_turn,
+            user_message,
+            user_id,
+            session_id,
+            attachment,
+            on_event=lambda event: manager.send_message(event, websocket)
+        )
+        
+        await manager.send_message({
+            "type": "typing",
+            "status": False
+        }, websocket)
+        
+        if agent_result is None:
+            await manager.send_message({
+                "type": "assistant_message",
+                "message": "تم استلام المرفق. أرسل نصًا مع المرفق إذا كنت تريد مني معالجته.",
+                "timestamp": datetime.now().isoformat()
+            }, websocket)
+            return
+        
+        # إرسال رد الوكيل
+        if agent_result.get("success"):
+            response_message = agent_result.get("message", "")
+            
+            # إضافة معلومات إضافية إذا كانت متاحة
+            metadata = {}
+            if agent_result.get("intent_result"):
+                metadata["intent"] = agent_result["intent_result"].get("intent")
+                metadata["confidence"] = agent_result["intent_result"].get("confidence")
+            if agent_result.get("agent"):
+                metadata["agent"] = agent_result["agent"]
+            if agent_result.get("first_token_ms") is not None:
+                metadata["first_token_ms"] = agent_result["first_token_ms"]
+                metadata["elapsed_ms"] = agent_result["elapsed_ms"]
+            
+            # مع البث: الإطار النهائي يحمل stream_id نفسه فيستبدل العميل الأجزاء بالرسالة الكاملة
+            await manager.send_message({
+                "type": "assistant_message",
+                "message": response_message,
+                "metadata": metadata,
+                "stream_id": agent_result.get("stream_id"),
+                "attachment": attachment,
+                "timestamp": datetime.now().isoformat()
+            }, websocket)
+        else:
+            # في حالة الفشل
+            await manager.send_message({
+                "type": "assistant_message",
+                "message": agent_result.get("message", "عذراً، لم أتمكن من معالجة طلبك."),
+                "attachment": attachment,
+                "timestamp": datetime.now().isoformat()
+            }, websocket)
+    
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        message = "انتهت مهلة معالجة الطلب" if isinstance(e, asyncio.TimeoutError) else f"حدث خطأ: {str(e)}"
+        try:
+            await manager.send_message({
+                "type": "typing",
+                "status": False
+            }, websocket)
+            await manager.send_message({
+                "type": "error",
+                "message": message,
+                "timestamp": datetime.now().isoformat()
+            }, websocket)
+        except Exception:
+            pass
+
+
 @app.websocket("/ws/chat")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
+    # الأدوار الجارية لهذا الاتصال — تُلغى عند انقطاعه
+    turns: Set[asyncio.Task] = set()
     try:
         while True:
             data = await websocket.receive_text()
@@ -169,94 +421,18 @@ async def websocket_endpoint(websocket: WebSocket):
                 "status": True
             }, websocket)
             
-            try:
-                if (not user_message or not str(user_message).strip()) and attachment:
-                    try:
-                        db = next(get_db())
-                        conversation = memory_service.get_or_create_conversation(
-                            db=db,
-                            user_id=user_id,
-                            session_id=session_id
-                        )
-                        memory_service.add_message(
-                            db=db,
-                            conversation_id=conversation.id,
-                            role="user",
-                            content="",
-                            metadata={"attachment": attachment}
-                        )
-                    except Exception as e:
-                        print(f"Warning: Failed to persist attachment-only message: {str(e)}")
-
-                    await manager.send_message({
-                        "type": "typing",
-                        "status": False
-                    }, websocket)
-                    await manager.send_message({
-                        "type": "assistant_message",
-                        "message": "تم استلام المرفق. أرسل نصًا مع المرفق إذا كنت تريد مني معالجته.",
-                        "timestamp": datetime.now().isoformat()
-                    }, websocket)
-                    continue
-
-                # الحصول على جلسة قاعدة البيانات
-                db = next(get_db())
-                
-                # استخدام نظام الوكلاء الذكية مع الذاكرة
-                agent_result = agent_manager.process_user_message(
-                    message=user_message,
-                    user_id=user_id,
-                    session_id=session_id,
-                    metadata={"attachment": attachment} if attachment else None,
-                    db=db
-                )
-                
-                await manager.send_message({
-                    "type": "typing",
-                    "status": False
-                }, websocket)
-                
-                # إرسال رد الوكيل
-                if agent_result.get("success"):
-                    response_message = agent_result.get("message", "")
-                    
-                    # إضافة معلومات إضافية إذا كانت متاحة
-                    metadata = {}
-                    if agent_result.get("intent_result"):
-                        metadata["intent"] = agent_result["intent_result"].get("intent")
-                        metadata["confidence"] = agent_result["intent_result"].get("confidence")
-                    if agent_result.get("agent"):
-                        metadata["agent"] = agent_result["agent"]
-                    
-                    await manager.send_message({
-                        "type": "assistant_message",
-                        "message": response_message,
-                        "metadata": metadata,
-                        "attachment": attachment,
-                        "timestamp": datetime.now().isoformat()
-                    }, websocket)
-                else:
-                    # في حالة الفشل
-                    await manager.send_message({
-                        "type": "assistant_message",
-                        "message": agent_result.get("message", "عذراً، لم أتمكن من معالجة طلبك."),
-                        "attachment": attachment,
-                        "timestamp": datetime.now().isoformat()
-                    }, websocket)
-                    
-            except Exception as e:
-                await manager.send_message({
-                    "type": "typing",
-                    "status": False
-                }, websocket)
-                await manager.send_message({
-                    "type": "error",
-                    "message": f"حدث خطأ: {str(e)}",
-                    "timestamp": datetime.now().isoformat()
-                }, websocket)
+            # نفس الجلسة = نفس الترتيب، حتى لو أُرسلت الرسائل بسرعة
+            session_key = session_id or f"ws-{id(websocket)}"
+            task = asyncio.create_task(_handle_chat_turn(
+                websocket, session_key, user_message, user_id, session_id, attachment
+            ))
+            turns.add(task)
+            task.add_done_callback(turns.discard)
     
     except WebSocketDisconnect:
         manager.disconnect(websocket)
+        for task in turns:
+            task.cancel()
 
 
 @app.post("/api/uploads")
@@ -349,7 +525,7 @@ async def send_message_to_n8n(request: MessageRequest):
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "agent_turns": turn_runner.stats(), "ai_history": ai_service.histories.stats(), "message_writes": message_buffer.stats(), "scheduler": schedule_queue.stats()}
 
 if __name__ == "__main__":
     uvicorn.run(
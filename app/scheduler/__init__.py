@@ -0,0 +1,7 @@
+import os
+import socket
+
+from app.core.config import settings
+
+# معرف هذه العملية في schedule_events.claimed_by (كل uvicorn worker له معرف مختلف)
+WORKER_ID = settings.SCHEDULER_WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
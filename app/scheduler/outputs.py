@@ -0,0 +1,81 @@
+import json
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+NDJSON_FILE = "events.ndjson"
+
+
+class OutputWriter:
+    """
+    كتابة مخرجات الأحداث الجاهزة (to_dict) في thread منفصل بدل الكتابة على الـ event loop.
+
+    mode="files": ملف JSON لكل حدث ({schedule_event_id}.json) كما كان.
+    mode="ndjson": سطر لكل حدث في events.ndjson — كتابة واحدة (append) لكل دفعة.
+    """
+
+    def __init__(self, directory: Path, mode: str = "files"):
+        self.directory = directory
+        self.mode = mode
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._written = 0
+        self._errors = 0
+
+    def submit(self, outputs: List[Dict[str, Any]]):
+        """إضافة دفعة مخرجات للطابور (لا تنتظر الكتابة)"""
+        if not outputs:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="schedule-outputs", daemon=True)
+                self._thread.start()
+        self._queue.put(outputs)
+
+    def close(self, timeout: float = 10.0):
+        """كتابة ما تبقى في الطابور ثم إيقاف الـ thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "queued": self._queue.qsize(),
+            "written": self._written,
+            "errors": self._errors,
+        }
+
+    def _run(self):
+        while True:
+            outputs = self._queue.get()
+            if outputs is None:
+                return
+            try:
+                self._write(outputs)
+                self._written += len(outputs)
+            except Exception as e:
+                self._errors += len(outputs)
+                logger.error(f"[Scheduler] failed to write {len(outputs)} outputs: {e}")
+
+    def _write(self, outputs: List[Dict[str, Any]]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.mode == "ndjson":
+            lines = "".join(json.dumps(output, ensure_ascii=False) + "\n" for output in outputs)
+            with open(self.directory / NDJSON_FILE, "a", encoding="utf-8") as f:
+                f.write(lines)
+            return
+        for output in outputs:
+            out_file = self.directory / f"{output['schedule_event_id']}.json"
+            out_file.write_text(
+                json.dumps(output, ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import statistics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ScheduleEvent, SocialAccount
+from app.scheduler import WORKER_ID
+from app.services.schedule_service import (
+    claim_ready_events,
+    last_published,
+    record_publish_attempt,
+    release_events,
+    renew_leases,
+)
+from app.x.modules.utils import safe_label
+from app.x.modules.x_engine import post_to_x
+
+logger = logging.getLogger(__name__)
+
+COOKIES_DIR = Path(__file__).parent.parent / "x" / "cookies"
+X_PLATFORMS = ("x", "twitter")
+# عينات زمن النشر المحفوظة لحساب p50 / p95
+LATENCY_SAMPLES = 1000
+
+
+def account_key(username: str) -> str:
+    """نفس مقارنة account_key_expr في SQL"""
+    return (username or "").lstrip("@").lower()
+
+
+def account_label(db, username: str) -> str:
+    """
+    اسم ملف كوكيز الحساب (بدون .json): cookie_filename من social_accounts إن وُجد،
+    وإلا safe_label(username) كما يحفظها تسجيل الدخول
+    """
+    name = (username or "").strip().lstrip("@")
+    row = (
+        db.query(SocialAccount.cookie_filename)
+        .filter(
+            SocialAccount.platform.in_(X_PLATFORMS),
+            func.lower(SocialAccount.username) == name.lower(),
+            SocialAccount.cookie_filename.isnot(None),
+        )
+        .first()
+    )
+    return Path(row.cookie_filename).stem if row else safe_label(name)
+
+
+class PublisherMetrics:
+    """نتائج النشر وزمن الجدولة → النشر (published_at - run_at)"""
+
+    def __init__(self):
+        self.published = 0
+        self.failed = 0
+        self.retried = 0
+        self.deferred = 0
+        self.latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "published": self.published,
+            "failed": self.failed,
+            "retried": self.retried,
+            "deferred": self.deferred,
+            "latency_sec": {
+                "p50": round(statistics.median(latencies), 3),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                "max": round(latencies[-1], 3),
+            } if latencies else None,
+        }
+
+
+class Publisher:
+    """
+    نشر أحداث READY_TO_PUBLISH لمنصة X عبر x_engine.post_to_x (HTTP مباشر ثم المتصفح).
+
+    - concurrency: أقصى عدد منشورات في نفس الوقت (thread pool خاص)
+    - account_interval: أقل فاصل (ثواني) بين منشورين من نفس الحساب لكل العمال: حساب لديه
+      حدث قيد النشر لا يُحجز له غيره (claim_ready_events)، والحدث الذي يسبق
+      published_at + account_interval يُعاد للجدول مع lease_until = ذلك الوقت
+    - max_attempts / retry_backoff: إعادة المحاولة بعد retry_backoff × 2^(المحاولة-1) ثانية،
+      ثم FAILED. فشل بعد إرسال الطلب (e.sent) لا يُعاد تجنباً لتكرار التغريدة
+    - max_latency: حدث تأخر أكثر من هذه الثواني عن run_at يُسجل FAILED (0 = بدون حد)
+    - lease_seconds: مدة حجز الحدث؛ تُمدد كل ثلث مدة ما دام النشر جارياً (النشر عبر المتصفح
+      قد يتجاوزها) حتى لا يحجزه عامل آخر وينشره مرة ثانية
+
+    scheduler_tick يوقظه (wake) فور تحويل أحداث إلى READY_TO_PUBLISH، وكل poll_interval
+    يفحص الجدول (أحداث عمليات أخرى وإعادة المحاولات).
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        account_interval: float = 60,
+        max_attempts: int = 3,
+        retry_backoff: float = 60,
+        lease_seconds: int = 300,
+        poll_interval: float = 30,
+        max_latency: float = 0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.account_interval = account_interval
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_latency = max_latency
+        self.metrics = PublisherMetrics()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._renewer: Optional[asyncio.Task] = None
+        # أحداث قيد النشر (حجزها يُمدد)
+        self._publishing: Set[int] = set()
+        # أقرب حدث مؤجل (حد الحساب / إعادة محاولة) — الحلقة تستيقظ عنده
+        self._next_retry: Optional[datetime] = None
+
+    def start(self):
+        """تشغيل حلقة النشر في الـ event loop الحالي"""
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="publisher")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        self._renewer = asyncio.create_task(self._renew_loop())
+
+    def wake(self):
+        """أحداث جديدة جاهزة (يُستدعى من الـ event loop)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = 30):
+        """إيقاف الحلقة وانتظار المنشورات الجارية (حتى لا تُنشر مرة أخرى بعد انتهاء الحجز)"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        if self._inflight:
+            await asyncio.wait(self._inflight, timeout=timeout)
+        self._renewer.cancel()
+        self._executor.shutdown(wait=False)
+        self._task = None
+        self._renewer = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._task is not None,
+            "worker_id": WORKER_ID,
+            "inflight": len(self._inflight),
+            **self.metrics.stats(),
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        logger.info("Publisher started")
+        while True:
+            try:
+                free = self.concurrency - len(self._inflight)
+                if free > 0:
+                    for event, label in await asyncio.to_thread(self._claim, free):
+                        task = asyncio.create_task(self._publish(loop, event, label))
+                        self._inflight.add(task)
+                        task.add_done_callback(self._done)
+            except Exception as e:
+                logger.error(f"[Publisher] claim error: {e}")
+
+            timeout = self.poll_interval
+            if self._next_retry is not None:
+                timeout = min(timeout, (self._next_retry - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._next_retry is not None and self._next_retry <= datetime.utcnow():
+                self._next_retry = None
+
+    async def _renew_loop(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if not self._publishing:
+                continue
+            try:
+                await asyncio.to_thread(self._renew, list(self._publishing))
+            except Exception as e:
+                logger.error(f"[Publisher] lease renewal error: {e}")
+
+    def _renew(self, event_ids: List[int]):
+        db = SessionLocal()
+        try:
+            renewed = renew_leases(db, WORKER_ID, event_ids, self.lease_seconds)
+        finally:
+            db.close()
+        if renewed < len(event_ids):
+            logger.warning(f"[Publisher] {len(event_ids) - renewed} publishing event(s) no longer claimed by this worker")
+
+    def _done(self, task: asyncio.Task):
+        self._inflight.discard(task)
+        # مكان متاح لحدث جديد
+        self.wake()
+
+    def _retry_at(self, at: datetime):
+        if self._next_retry is None or at < self._next_retry:
+            self._next_retry = at
+
+    def _claim(self, limit: int) -> List[tuple]:
+        """حجز أحداث جاهزة وتأجيل ما يتجاوز حد الحساب. يُرجع [(event, label)]"""
+        db = SessionLocal()
+        try:
+            events = claim_ready_events(
+                db, WORKER_ID, lease_seconds=self.lease_seconds, limit=limit, platforms=X_PLATFORMS
+            )
+            if not events:
+                return []
+            now = datetime.utcnow()
+            interval = timedelta(seconds=self.account_interval)
+            accounts = {account_key(event.username) for event in events}
+            # آخر نشر لكل حساب من الجدول (كل العمال)
+            next_slot = {
+                account: published_at + interval
+                for account, published_at in last_published(db, accounts, now - interval).items()
+            }
+            labels: Dict[str, str] = {}
+            ready = []
+            deferred: Dict[datetime, List[int]] = {}
+            for event in events:
+                account = account_key(event.username)
+                slot = next_slot.get(account)
+                if slot and slot > now:
+                    deferred.setdefault(slot, []).append(event.id)
+                    continue
+                # حدث آخر لنفس الحساب في نفس الدفعة ينتظر الفاصل
+                next_slot[account] = now + interval
+                if event.username not in labels:
+                    labels[event.username] = account_label(db, event.username)
+                ready.append((event, labels[event.username]))
+
+            for until, event_ids in deferred.items():
+                release_events(db, WORKER_ID, event_ids, until)
+                self.metrics.deferred += len(event_ids)
+                self._retry_at(until)
+            return ready
+        finally:
+            db.close()
+
+    async def _publish(self, loop: asyncio.AbstractEventLoop, event: ScheduleEvent, label: str):
+        self._publishing.add(event.id)
+        try:
+            await loop.run_in_executor(self._executor, self._publish_sync, event, label)
+        except Exception as e:
+            logger.error(f"[Publisher] {event.schedule_event_id}: {e}")
+        finally:
+            self._publishing.discard(event.id)
+
+    def _publish_sync(self, event: ScheduleEvent, label: str):
+        """النشر وتسجيل النتيجة (في thread)"""
+        cookie_file = COOKIES_DIR / f"{label}.json"
+        lag = (datetime.utcnow() - event.run_at).total_seconds()
+        post_url = None
+        error = None
+        retry = False
+
+        if self.max_latency and lag > self.max_latency:
+            error = f"expired: {lag:.0f}s after run_at (PUBLISHER_MAX_LATENCY={self.max_latency:.0f})"
+        elif not cookie_file.exists():
+            error = f"cookies not found for account '{label}'"
+        else:
+            try:
+                post_url = post_to_x(str(cookie_file), event.content, None, True)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                retry = not getattr(e, "sent", False) and (event.attempts or 0) + 1 < self.max_attempts
+
+        db = SessionLocal()
+        try:
+            if error is None:
+                status, retry_at = "PUBLISHED", None
+            elif retry:
+                status = "READY_TO_PUBLISH"
+                retry_at = datetime.utcnow() + timedelta(
+                    seconds=self.retry_backoff * 2 ** (event.attempts or 0)
+                )
+            else:
+                status, retry_at = "FAILED", None
+            recorded = record_publish_attempt(
+                db, WORKER_ID, event.id, status, post_url=post_url, error=error, retry_at=retry_at
+            )
+        finally:
+            db.close()
+
+        if not recorded:
+            logger.warning(f"[Publisher] {event.schedule_event_id}: lease lost before recording {status}")
+        if status == "PUBLISHED":
+            self.metrics.published += 1
+            self.metrics.latencies.append((datetime.utcnow() - event.run_at).total_seconds())
+            logger.info(f"[Publisher] {event.schedule_event_id} → PUBLISHED @{label} ({lag:.1f}s after run_at)")
+        elif retry:
+            self.metrics.retried += 1
+            self._retry_at(retry_at)
+            logger.warning(f"[Publisher] {event.schedule_event_id} retry at {retry_at.isoformat()}: {error}")
+        else:
+            self.metrics.failed += 1
+            logger.error(f"[Publisher] {event.schedule_event_id} → FAILED: {error}")
+
+
+# مثيل واحد لكل عملية
+publisher = Publisher(
+    concurrency=settings.PUBLISHER_CONCURRENCY,
+    account_interval=settings.PUBLISHER_ACCOUNT_INTERVAL,
+    max_attempts=settings.PUBLISHER_MAX_ATTEMPTS,
+    retry_backoff=settings.PUBLISHER_RETRY_BACKOFF,
+    lease_seconds=settings.PUBLISHER_LEASE_SECONDS,
+    poll_interval=settings.PUBLISHER_POLL_INTERVAL,
+    max_latency=settings.PUBLISHER_MAX_LATENCY,
+)
@@ -0,0 +1,81 @@
+import asyncio
+import heapq
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+class ScheduleQueue:
+    """
+    min-heap لأوقات run_at القادمة (UTC) حتى ينام scheduler_tick حتى أقرب حدث بالضبط
+    بدل فحص الجدول كل 30 ثانية.
+
+    push() آمن من أي thread: إذا أصبح الحدث الجديد هو الأقرب يوقظ الـ loop فوراً.
+    الجدول يبقى المرجع (get_due_events) — الـ heap يحدد متى نسأل فقط.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._scheduled: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """ربط الطابور بالـ loop الذي يعمل فيه scheduler_tick"""
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def push(self, event_id: str, run_at: datetime):
+        """إضافة حدث (أو تحديث وقته)"""
+        with self._lock:
+            if self._scheduled.get(event_id) == run_at:
+                return
+            self._scheduled[event_id] = run_at
+            heapq.heappush(self._heap, (run_at, event_id))
+            earliest = self._heap[0] == (run_at, event_id)
+        if earliest:
+            self._notify()
+
+    def pop_due(self, now: datetime) -> List[str]:
+        """إزالة وإرجاع الأحداث التي حان وقتها"""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                run_at, event_id = heapq.heappop(self._heap)
+                # مدخل قديم لحدث تغير وقته
+                if self._scheduled.get(event_id) == run_at:
+                    del self._scheduled[event_id]
+                    due.append(event_id)
+        return due
+
+    def next_run_at(self) -> Optional[datetime]:
+        with self._lock:
+            while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    async def wait(self, timeout: float):
+        """النوم حتى timeout ثانية أو حتى يُضاف حدث أقرب"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def stats(self) -> Dict[str, Optional[str]]:
+        next_run_at = self.next_run_at()
+        with self._lock:
+            pending = len(self._scheduled)
+        return {
+            "pending": pending,
+            "next_run_at": next_run_at.isoformat() if next_run_at else None,
+        }
+
+    def _notify(self):
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+
+schedule_queue = ScheduleQueue()
@@ -1,46 +1,162 @@
 import asyncio
 import logging
+import time
 from pathlib import Path
-import json
 from datetime import datetime
+from typing import Any, Dict, Optional
 
+from app.core.config import settings
 from app.db.database import SessionLocal
-from app.services.schedule_service import get_due_events, mark_ready_to_publish
+from app.db.models import ScheduleEvent
+from app.scheduler import WORKER_ID
+from app.scheduler.outputs import OutputWriter
+from app.scheduler.publisher import publisher
+from app.scheduler.schedule_queue import schedule_queue
+from app.services.schedule_service import claim_due_events, complete_claimed_events
 
 logger = logging.getLogger(__name__)
 
 OUTPUTS_DIR = Path(__file__).parent.parent.parent / "data" / "schedule_outputs"
-TICK_INTERVAL = 30
+# إعادة المحاولة بعد خطأ (إعادة تحميل كاملة — تستعيد الأحداث التي أُخرجت من الطابور)
+ERROR_RETRY_DELAY = 30
+
+
+def _reconcile():
+    """تحميل كل الأحداث المجدولة في الطابور (عند البدء ولأحداث كتبتها عمليات أخرى)"""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(ScheduleEvent.schedule_event_id, ScheduleEvent.run_at)
+            .filter(ScheduleEvent.status == "SCHEDULED")
+            .all()
+        )
+    finally:
+        db.close()
+    for event_id, run_at in rows:
+        schedule_queue.push(event_id, run_at)
+
+
+class TickMetrics:
+    """عدد الأحداث المحولة وسرعة التحويل (خاصة عند اللحاق بتراكم بعد توقف)"""
+
+    def __init__(self):
+        self.transitioned = 0
+        self.batches = 0
+        self.catchups = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.last_catchup: Optional[Dict[str, Any]] = None
+
+    def record(self, events: int, batches: int, elapsed: float, lag: Optional[float]):
+        run = {
+            "events": events,
+            "batches": batches,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "events_per_sec": round(events / elapsed, 1) if elapsed > 0 else None,
+            # تأخر أقدم حدث في الدفعة عن run_at
+            "max_lag_sec": round(lag, 3) if lag is not None else None,
+            "at": datetime.utcnow().isoformat(),
+        }
+        self.transitioned += events
+        self.batches += batches
+        self.last_run = run
+        if batches > 1:
+            self.catchups += 1
+            self.last_catchup = run
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": WORKER_ID,
+            "transitioned": self.transitioned,
+            "batches": self.batches,
+            "catchups": self.catchups,
+            "last_run": self.last_run,
+            "last_catchup": self.last_catchup,
+        }
+
+
+tick_metrics = TickMetrics()
+output_writer = OutputWriter(OUTPUTS_DIR, mode=settings.SCHEDULER_OUTPUT_MODE)
+
+
+def _publish_due():
+    """
+    تحويل كل الأحداث المستحقة إلى READY_TO_PUBLISH بدفعات SCHEDULER_CLAIM_BATCH:
+    حجز الدفعة لهذا العامل (UPDATE ... RETURNING)، إرسال مخرجاتها لـ output_writer، ثم تحويلها.
+    عدة عمليات تتقاسم الأحداث المستحقة بدون تكرار.
+    دفعة ممتلئة تعني تراكماً (catch-up): تُسحب الدفعة التالية فوراً.
+    """
+    # حد run_at ثابت للدورة؛ الحجز (lease_until) يُحسب من وقت كل دفعة حتى لا ينتهي قبل معالجتها
+    now = datetime.utcnow()
+    batch_size = max(1, settings.SCHEDULER_CLAIM_BATCH)
+    start = time.perf_counter()
+    total = batches = 0
+    lag = None
+    while True:
+        db = SessionLocal()
+        try:
+            events = claim_due_events(
+                db, WORKER_ID, lease_seconds=settings.SCHEDULER_LEASE_SECONDS, limit=batch_size, due_before=now
+            )
+            if not events:
+                break
+            completed = complete_claimed_events(
+                db, WORKER_ID, [event.id for event in events], auto_publish=settings.PUBLISHER_ENABLED
+            )
+        finally:
+            db.close()
+        ready = [event for event in events if event.id in completed]
+        for event in ready:
+            event.status = "READY_TO_PUBLISH"
+        if len(ready) < len(events):
+            # انتهى الحجز قبل التحويل وأخذ عامل آخر بعضها
+            logger.warning(f"[Scheduler] lease expired: {len(events) - len(ready)} events taken by another worker")
+        total += len(ready)
+        batches += 1
+        if ready:
+            oldest = min(event.run_at for event in ready)
+            lag = max(lag or 0.0, (now - oldest).total_seconds())
+            output_writer.submit([event.to_dict() for event in ready])
+        logger.info(f"[Scheduler] {len(ready)} events → READY_TO_PUBLISH")
+        if len(events) < batch_size:
+            break
+
+    if total:
+        elapsed = time.perf_counter() - start
+        tick_metrics.record(total, batches, elapsed, lag)
+        if batches > 1:
+            logger.info(
+                f"[Scheduler] catch-up: {total} events in {batches} batches, "
+                f"{elapsed:.2f}s ({total / elapsed:.0f}/s), max lag {lag:.0f}s"
+            )
 
 
 async def scheduler_tick():
     """
-    يعمل كل TICK_INTERVAL ثانية، يفحص الأحداث المجدولة التي حان وقتها
-    ويغير حالتها إلى READY_TO_PUBLISH ويحفظ JSON في مجلد outputs.
+    ينام حتى أقرب run_at في schedule_queue (أو حتى يُضاف حدث أقرب عبر create_schedule_event)،
+    ثم يحول الأحداث المستحقة إلى READY_TO_PUBLISH بدفعات ويرسل مخرجاتها لـ output_writer.
+    كل SCHEDULER_RECONCILE_INTERVAL ثانية يعيد تحميل الأحداث من الجدول.
     """
     OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
+    schedule_queue.bind(asyncio.get_running_loop())
     logger.info("Scheduler tick started")
 
+    next_reconcile = 0.0
     while True:
         try:
-            db = SessionLocal()
-            try:
-                due = get_due_events(db)
-                for event in due:
-                    mark_ready_to_publish(db, event)
-                    output = event.to_dict()
-                    out_file = OUTPUTS_DIR / f"{event.schedule_event_id}.json"
-                    out_file.write_text(
-                        json.dumps(output, ensure_ascii=False, indent=2),
-                        encoding="utf-8",
-                    )
-                    logger.info(
-                        f"[Scheduler] {event.schedule_event_id} → READY_TO_PUBLISH "
-                        f"| saved to {out_file}"
-                    )
-            finally:
-                db.close()
+            # قاعدة البيانات في thread حتى لا يتوقف الـ event loop (دفعات كبيرة بعد توقف)
+            if time.monotonic() >= next_reconcile:
+                await asyncio.to_thread(_reconcile)
+                next_reconcile = time.monotonic() + settings.SCHEDULER_RECONCILE_INTERVAL
+            if schedule_queue.pop_due(datetime.utcnow()):
+                await asyncio.to_thread(_publish_due)
+                # الأحداث الجاهزة تُنشر فوراً
+                publisher.wake()
         except Exception as e:
             logger.error(f"[Scheduler] tick error: {e}")
+            next_reconcile = time.monotonic() + ERROR_RETRY_DELAY
 
-        await asyncio.sleep(TICK_INTERVAL)
+        delay = next_reconcile - time.monotonic()
+        next_run_at = schedule_queue.next_run_at()
+        if next_run_at is not None:
+            delay = min(delay, (next_run_at - datetime.utcnow()).total_seconds())
+        await schedule_queue.wait(delay)
@@ -14,6 +14,13 @@ import json
 
 from app.db.models import SocialAccount, User
 from app.db.database import get_db
+from app.services.rollup_service import (
+    rollup_service, account_metrics, account_status_metric, account_platform_metric,
+    ACCOUNTS_TOTAL
+)
+
+# المنصات المعروضة في إحصائيات الحسابات
+STATS_PLATFORMS = ["x", "instagram", "facebook", "linkedin", "tiktok"]
 
 
 class AccountService:
@@ -59,6 +66,7 @@ class AccountService:
         )
         
         db.add(account)
+        rollup_service.add(db, account_metrics(account), user_id=user_id)
         db.commit()
         db.refresh(account)
         
@@ -134,10 +142,19 @@ class AccountService:
         if not account:
             return None
         
+        before = account_metrics(account, sign=-1)
+        
         for key, value in kwargs.items():
             if hasattr(account, key):
                 setattr(account, key, value)
         
+        # تغيير الحالة أو المنصة ينقل الحساب بين العدادات (التغييرات الصفرية تُتجاهل)
+        if "status" in kwargs or "platform" in kwargs:
+            deltas = dict(before)
+            for metric, delta in account_metrics(account).items():
+                deltas[metric] = deltas.get(metric, 0) + delta
+            rollup_service.add(db, deltas, user_id=account.user_id)
+        
         account.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(account)
@@ -207,6 +224,7 @@ class AccountService:
         
         # حذف من قاعدة البيانات
         print(f"[DEBUG] Deleting account from database...")
+        rollup_service.add(db, account_metrics(account, sign=-1), user_id=account.user_id)
         db.delete(account)
         db.commit()
         print(f"[DEBUG] Account deleted and committed successfully")
@@ -277,21 +295,19 @@ class AccountService:
         Returns:
             إحصائيات الحسابات
         """
-        query = db.query(SocialAccount)
-        
-        if user_id:
-            query = query.filter(SocialAccount.user_id == user_id)
+        # عدادات stat_rollups المحسوبة مسبقاً — استعلام واحد بدل COUNT لكل حالة ومنصة
+        rollups = rollup_service.get(db, user_id=user_id)
         
-        total = query.count()
-        active = query.filter(SocialAccount.status == "active").count()
-        inactive = query.filter(SocialAccount.status == "inactive").count()
-        expired = query.filter(SocialAccount.status == "expired").count()
-        error = query.filter(SocialAccount.status == "error").count()
+        total = rollups[ACCOUNTS_TOTAL]
+        active = rollups[account_status_metric("active")]
+        inactive = rollups[account_status_metric("inactive")]
+        expired = rollups[account_status_metric("expired")]
+        error = rollups[account_status_metric("error")]
         
         # إحصائيات حسب المنصة
         platforms = {}
-        for platform in ["x", "instagram", "facebook", "linkedin", "tiktok"]:
-            count = query.filter(SocialAccount.platform == platform).count()
+        for platform in STATS_PLATFORMS:
+            count = rollups[account_platform_metric(platform)]
             if count > 0:
                 platforms[platform] = count
         
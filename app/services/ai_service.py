@@ -1,51 +1,121 @@
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.conversation_history import conversation_histories
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
 import asyncio
 
+SYSTEM_PROMPT = "أنت مساعد ذكي متخصص في إدارة وسائل التواصل الاجتماعي والأتمتة. تتحدث العربية بطلاقة وتساعد المستخدمين في مهامهم."
+
+# الجلسة المستخدمة عندما لا يُمرَّر session_key (السلوك القديم: سجل واحد مشترك)
+DEFAULT_SESSION = "default"
+
+# تُرجع رسائل المحادثة المحفوظة {"role", "content"} من الأقدم للأحدث
+HistoryLoader = Callable[[], Awaitable[List[Dict[str, str]]]]
+
 class AIService:
     def __init__(self):
         self.client = None
         if settings.OPENAI_API_KEY:
-            self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        self.conversation_history = []
-    
-    async def get_response(self, user_message: str) -> str:
+            # OPENAI_BASE_URL لأي خادم متوافق مع OpenAI (مثلاً خادم محلي للاختبار)
+            self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+        # سجل لكل جلسة (LRU + ميزانية توكنز) — انظر conversation_history.py
+        self.histories = conversation_histories
+
+    async def _build_messages(
+        self,
+        user_message: str,
+        session_key: Optional[str],
+        history_loader: Optional[HistoryLoader]
+    ) -> List[Dict[str, str]]:
+        session_key = session_key or DEFAULT_SESSION
+
+        if session_key not in self.histories:
+            saved = []
+            if history_loader:
+                try:
+                    saved = await history_loader()
+                except Exception as e:
+                    print(f"Warning: Failed to load conversation history: {str(e)}")
+            self.histories.hydrate(session_key, saved)
+
+        # رسالة المستخدم قد تكون محفوظة مسبقاً (MainAgent يحفظها قبل الرد) فتأتي مع التحميل
+        if self.histories.last(session_key) != {"role": "user", "content": user_message}:
+            self.histories.append(session_key, "user", user_message)
+
+        return self.histories.prompt(session_key, SYSTEM_PROMPT)
+
+    def _remember_reply(self, session_key: Optional[str], assistant_message: str):
+        self.histories.append(session_key or DEFAULT_SESSION, "assistant", assistant_message)
+
+    async def get_response(
+        self,
+        user_message: str,
+        session_key: Optional[str] = None,
+        history_loader: Optional[HistoryLoader] = None
+    ) -> str:
         if not self.client:
             return "مرحباً! أنا مساعد AI. لتفعيل الذكاء الاصطناعي، يرجى إضافة OPENAI_API_KEY في ملف .env"
-        
+
         try:
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message
-            })
-            
-            if len(self.conversation_history) > 20:
-                self.conversation_history = self.conversation_history[-20:]
-            
             response = await self.client.chat.completions.create(
                 model=settings.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "أنت مساعد ذكي متخصص في إدارة وسائل التواصل الاجتماعي والأتمتة. تتحدث العربية بطلاقة وتساعد المستخدمين في مهامهم."
-                    },
-                    *self.conversation_history
-                ],
+                messages=await self._build_messages(user_message, session_key, history_loader),
                 max_tokens=settings.OPENAI_MAX_TOKENS,
                 temperature=settings.OPENAI_TEMPERATURE
             )
-            
+
             assistant_message = response.choices[0].message.content
-            
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message
-            })
-            
+            self._remember_reply(session_key, assistant_message)
+
             return assistant_message
-            
+
         except Exception as e:
             return f"عذراً، حدث خطأ في الاتصال بخدمة الذكاء الاصطناعي: {str(e)}"
-    
-    def clear_history(self):
-        self.conversation_history = []
+
+    async def stream_response(
+        self,
+        user_message: str,
+        session_key: Optional[str] = None,
+        history_loader: Optional[HistoryLoader] = None
+    ) -> AsyncIterator[str]:
+        """
+        نفس get_response لكن مع stream=True: يُرجع أجزاء الرد (deltas) فور وصولها
+        بدل انتظار الرد كاملاً. الرد الكامل يُضاف لسجل الجلسة عند انتهاء البث.
+        """
+        if not self.client:
+            yield "مرحباً! أنا مساعد AI. لتفعيل الذكاء الاصطناعي، يرجى إضافة OPENAI_API_KEY في ملف .env"
+            return
+
+        parts = []
+        try:
+            stream = await self.client.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=await self._build_messages(user_message, session_key, history_loader),
+                max_tokens=settings.OPENAI_MAX_TOKENS,
+                temperature=settings.OPENAI_TEMPERATURE,
+                stream=True
+            )
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not parts:
+                yield f"عذراً، حدث خطأ في الاتصال بخدمة الذكاء الاصطناعي: {str(e)}"
+                return
+            print(f"Warning: AI stream interrupted: {str(e)}")
+
+        self._remember_reply(session_key, "".join(parts))
+
+    def clear_history(self, session_key: Optional[str] = None):
+        if session_key:
+            self.histories.discard(session_key)
+        else:
+            self.histories.clear()
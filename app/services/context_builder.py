@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Conversation Context Builder
+بناء سياق المحادثة للوكيل بحجم ثابت مهما طالت المحادثة
+
+السياق = ملخص تراكمي للرسائل القديمة (جدول conversation_summaries) + آخر K رسائل كما هي،
+والمجموع ضمن ميزانية توكنز (MEMORY_CONTEXT_TOKEN_BUDGET).
+
+الملخص استخراجي (بدون استدعاء LLM): كل رسالة تُختصر لسطر واحد (أول جملة)، ويُحدَّث
+تدريجياً كلما تجمعت MEMORY_SUMMARY_EVERY رسالة خارج آخر K — فلا تُقرأ المحادثة كاملة أبداً،
+وعند تجاوز MEMORY_SUMMARY_TOKEN_BUDGET تُحذف أقدم الأسطر.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import ConversationSummary, Message
+from app.utils.tokens import count_tokens, truncate_tokens
+
+SUMMARY_HEADER = "ملخص المحادثة السابقة:"
+SUMMARY_LINE_CHARS = 160
+# أقصى عدد رسائل قديمة تُلخص دفعة واحدة (أول مرة لمحادثة طويلة موجودة مسبقاً)
+MAX_FOLD_MESSAGES = 200
+# أحدث رسالة (الطلب الحالي) تبقى دائماً بهذا الحد الأدنى حتى لو استهلك الملخص الميزانية
+LATEST_MIN_TOKENS = 200
+
+SENTENCE_END = re.compile(r"(?<=[.!?؟])\s|\n")
+
+
+def role_label(role: str) -> str:
+    return "المستخدم" if role == "user" else "المساعد"
+
+
+def summarize_message(message: Message) -> Optional[str]:
+    """سطر واحد يمثل الرسالة: أول جملة مختصرة"""
+    content = (message.content or "").strip()
+    if not content:
+        return None
+    first = SENTENCE_END.split(content, 1)[0].strip() or content
+    first = " ".join(first.split())
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 1].rstrip() + "…"
+    return f"- {role_label(message.role)}: {first}"
+
+
+def trim_lines(lines: List[str], token_budget: int, model: Optional[str] = None) -> Tuple[List[str], int]:
+    """إبقاء أحدث الأسطر ضمن الميزانية. يُرجع (الأسطر، عدد التوكنز)"""
+    kept: List[str] = []
+    tokens = 0
+    for line in reversed(lines):
+        line_tokens = count_tokens(line, model) + 1
+        if tokens + line_tokens > token_budget:
+            break
+        kept.append(line)
+        tokens += line_tokens
+    kept.reverse()
+    return kept, tokens
+
+
+class ContextBuilder:
+    """ملخص تراكمي + آخر الرسائل ضمن ميزانية توكنز"""
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        summary_every: int = 10,
+        summary_token_budget: int = 500,
+        model: Optional[str] = None
+    ):
+        self.token_budget = token_budget
+        self.summary_every = max(1, summary_every)
+        self.summary_token_budget = summary_token_budget
+        self.model = model
+
+    def build(self, db: Session, conversation_id: int, recent_turns: int = 10) -> str:
+        """
+        سياق المحادثة للوكيل
+
+        Args:
+            db: جلسة قاعدة البيانات
+            conversation_id: معرف المحادثة
+            recent_turns: عدد الرسائل الأخيرة التي تُرسل كما هي (K)
+
+        Returns:
+            نص السياق (الملخص أولاً إن وجد ثم آخر الرسائل)
+        """
+        summary = db.query(ConversationSummary).filter(
+            ConversationSummary.conversation_id == conversation_id
+        ).first()
+        summarized_id = summary.last_message_id if summary else 0
+
+        # آخر K + N رسالة تكفي: الرسائل غير الملخصة خارج آخر K أقل من N دائماً (وإلا تُلخص الآن)
+        window = db.query(Message).filter(
+            Message.conversation_id == conversation_id,
+            Message.id > summarized_id
+        ).order_by(Message.id.desc()).limit(recent_turns + self.summary_every).all()
+        window.reverse()
+
+        older = window[:-recent_turns] if recent_turns else window
+        if len(older) >= self.summary_every:
+            if len(window) == recent_turns + self.summary_every:
+                older = self._backlog(db, conversation_id, summarized_id, window[0].id) + older
+            summary = self._fold(db, conversation_id, summary, older)
+            window = window[len(window) - recent_turns:] if recent_turns else []
+
+        return self._assemble(summary.summary if summary else "", window)
+
+    def _backlog(self, db: Session, conversation_id: int, after_id: int, before_id: int) -> List[Message]:
+        """رسائل غير ملخصة أقدم من النافذة (محادثة طويلة قبل تفعيل الملخص)"""
+        backlog = db.query(Message).filter(
+            Message.conversation_id == conversation_id,
+            Message.id > after_id,
+            Message.id < before_id
+        ).order_by(Message.id.desc()).limit(MAX_FOLD_MESSAGES).all()
+        backlog.reverse()
+        return backlog
+
+    def _fold(
+        self,
+        db: Session,
+        conversation_id: int,
+        summary: Optional[ConversationSummary],
+        messages: List[Message]
+    ) -> ConversationSummary:
+        """إضافة رسائل جديدة للملخص وحفظه"""
+        lines = summary.summary.splitlines()[1:] if summary and summary.summary else []
+        lines.extend(line for line in map(summarize_message, messages) if line)
+        lines, tokens = trim_lines(lines, self.summary_token_budget, self.model)
+
+        if summary is None:
+            summary = ConversationSummary(conversation_id=conversation_id, message_count=0)
+            db.add(summary)
+        summary.summary = "\n".join([SUMMARY_HEADER, *lines]) if lines else ""
+        summary.last_message_id = messages[-1].id
+        summary.message_count = (summary.message_count or 0) + len(messages)
+        summary.token_count = tokens
+        try:
+            db.commit()
+        except IntegrityError:
+            # طلب آخر أنشأ الملخص في نفس اللحظة — نستخدم ملخصنا لهذا الطلب فقط
+            db.rollback()
+        return summary
+
+    def _assemble(self, summary_text: str, messages: List[Message]) -> str:
+        budget = self.token_budget - (count_tokens(summary_text, self.model) if summary_text else 0)
+        recent_lines = [
+            f"{role_label(msg.role)}: {msg.content}"
+            for msg in messages
+        ]
+        if recent_lines:
+            # أحدث رسالة أولاً (مقصوصة إن لزم) ثم الأقدم فالأقدم بما تبقى
+            latest = truncate_tokens(recent_lines[-1], max(budget, LATEST_MIN_TOKENS) - 1, self.model)
+            budget -= count_tokens(latest, self.model) + 1
+            older, _ = trim_lines(recent_lines[:-1], max(budget, 0), self.model)
+            recent_lines = older + [latest]
+
+        parts = []
+        if summary_text:
+            parts.append(summary_text)
+        if recent_lines:
+            parts.append("\n".join(recent_lines))
+        return "\n\n".join(parts)
+
+
+# مثيل واحد لكل عملية
+context_builder = ContextBuilder(
+    token_budget=settings.MEMORY_CONTEXT_TOKEN_BUDGET,
+    summary_every=settings.MEMORY_SUMMARY_EVERY,
+    summary_token_budget=settings.MEMORY_SUMMARY_TOKEN_BUDGET,
+    model=settings.OPENAI_MODEL
+)
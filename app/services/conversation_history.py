@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Conversation History Store
+سجل محادثة AIService لكل جلسة (بدل قائمة واحدة مشتركة بين كل المستخدمين)
+
+- LRU محدود لعدد الجلسات النشطة في الذاكرة (AI_HISTORY_MAX_SESSIONS)
+- التقليم حسب ميزانية توكنز (AI_HISTORY_TOKEN_BUDGET) بدل عدد الرسائل:
+  كل رسالة تُحسب توكنزها مرة واحدة عند إضافتها، والمجموع يُحدَّث تدريجياً
+- الجلسة غير الموجودة في الذاكرة تُحمَّل من جدول messages (عبر MemoryService)
+  عند أول استخدام فقط
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.tokens import message_tokens
+
+
+class SessionHistory:
+    """رسائل جلسة واحدة مع عدد توكنز كل رسالة"""
+
+    def __init__(self):
+        self.entries: Deque[Tuple[Dict[str, str], int]] = deque()
+        self.tokens = 0
+
+    def last(self) -> Optional[Dict[str, str]]:
+        return self.entries[-1][0] if self.entries else None
+
+
+class ConversationHistoryStore:
+    """LRU لسجلات الجلسات مع تقليم حسب التوكنز"""
+
+    def __init__(self, max_sessions: int = 1000, token_budget: int = 3000, model: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.model = model
+        self._sessions: "OrderedDict[str, SessionHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hydrations = 0
+        self._evictions = 0
+
+    def __contains__(self, session_key: str) -> bool:
+        with self._lock:
+            return session_key in self._sessions
+
+    def hydrate(self, session_key: str, messages: List[Dict[str, str]]):
+        """
+        إنشاء سجل الجلسة من رسائل محفوظة (الأقدم أولاً). لا يفعل شيئاً إذا كانت الجلسة موجودة.
+        """
+        with self._lock:
+            if session_key in self._sessions:
+                return
+            history = self._session(session_key)
+            self._hydrations += 1
+            for message in messages:
+                self._append(history, message)
+
+    def append(self, session_key: str, role: str, content: str):
+        with self._lock:
+            self._append(self._session(session_key), {"role": role, "content": content})
+
+    def last(self, session_key: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            history = self._sessions.get(session_key)
+            return history.last() if history else None
+
+    def prompt(self, session_key: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """رسائل الطلب: system prompt ثم سجل الجلسة (ضمن الميزانية مسبقاً)"""
+        with self._lock:
+            history = self._session(session_key)
+            messages = [message for message, _ in history.entries]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return messages
+
+    def discard(self, session_key: str):
+        with self._lock:
+            self._sessions.pop(session_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "token_budget": self.token_budget,
+                "tokens": sum(history.tokens for history in self._sessions.values()),
+                "hydrations": self._hydrations,
+                "evictions": self._evictions
+            }
+
+    def _session(self, session_key: str) -> SessionHistory:
+        history = self._sessions.get(session_key)
+        if history is None:
+            history = self._sessions[session_key] = SessionHistory()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+        else:
+            self._sessions.move_to_end(session_key)
+        return history
+
+    def _append(self, history: SessionHistory, message: Dict[str, str]):
+        tokens = message_tokens(message, self.model)
+        history.entries.append((message, tokens))
+        history.tokens += tokens
+        # حذف الأقدم حتى تعود ضمن الميزانية — آخر رسالة تبقى دائماً
+        while history.tokens > self.token_budget and len(history.entries) > 1:
+            _, dropped = history.entries.popleft()
+            history.tokens -= dropped
+
+
+# مثيل واحد لكل عملية
+conversation_histories = ConversationHistoryStore(
+    max_sessions=settings.AI_HISTORY_MAX_SESSIONS,
+    token_budget=settings.AI_HISTORY_TOKEN_BUDGET,
+    model=settings.OPENAI_MODEL
+)
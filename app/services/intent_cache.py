@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Intent Result Cache
+تخزين مؤقت لنتائج التعرف على النوايا (LRU + TTL) مع Redis اختياري
+
+المفتاح هو النص بعد التوحيد (normalize_arabic)، فـ "سجل دخول" و "سجّل  دخول"
+تستخدم نفس النتيجة. مع INTENT_CACHE_REDIS=true تُشارك النتائج بين كل
+العمليات/العمال عبر RedisClient، والذاكرة المحلية تبقى المستوى الأول.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class IntentCache:
+    """LRU محدود الحجم مع مدة صلاحية لكل عنصر"""
+
+    def __init__(
+        self,
+        max_size: int = 5000,
+        ttl: int = 3600,
+        enabled: bool = True,
+        use_redis: bool = False,
+        redis_prefix: str = "intent_cache"
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled and max_size > 0
+        self.use_redis = use_redis
+        self.redis_prefix = redis_prefix
+        self._items: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        إرجاع القيمة المخزنة لـ (namespace, key) أو حسابها وتخزينها
+
+        Args:
+            namespace: نوع النتيجة (detect / suggest)
+            key: النص بعد التوحيد
+            compute: دالة الحساب عند عدم وجود القيمة (يجب أن ترجع قيمة قابلة لـ JSON)
+        """
+        if not self.enabled:
+            return compute()
+
+        cache_key = (namespace, key)
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(cache_key)
+            if item is not None:
+                if item[0] > now:
+                    self._items.move_to_end(cache_key)
+                    self._hits += 1
+                    return item[1]
+                del self._items[cache_key]
+
+        value = self._redis_get(namespace, key)
+        if value is not None:
+            with self._lock:
+                self._redis_hits += 1
+            self._store(cache_key, value)
+            return value
+
+        value = compute()
+        with self._lock:
+            self._misses += 1
+        self._store(cache_key, value)
+        self._redis_set(namespace, key, value)
+        return value
+
+    def clear(self):
+        """مسح الذاكرة المحلية وتصفير الإحصائيات"""
+        with self._lock:
+            self._items.clear()
+            self._hits = self._redis_hits = self._misses = self._evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات الاستخدام"""
+        with self._lock:
+            lookups = self._hits + self._redis_hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "backend": "memory+redis" if self._redis_client() else "memory",
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "redis_hits": self._redis_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round((self._hits + self._redis_hits) / lookups, 4) if lookups else 0.0
+            }
+
+    def _store(self, cache_key: Tuple[str, str], value: Any):
+        with self._lock:
+            self._items[cache_key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(cache_key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self._evictions += 1
+
+    # ---------- Redis ----------
+    def _redis_client(self):
+        if not self.use_redis:
+            return None
+        from app.db.redis_client import RedisClient
+        return RedisClient.get_client()
+
+    def _redis_key(self, namespace: str, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"{self.redis_prefix}:{namespace}:{digest}"
+
+    def _redis_get(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            client = self._redis_client()
+            if client:
+                raw = client.get(self._redis_key(namespace, key))
+                return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"Redis error reading intent cache: {e}")
+        return None
+
+    def _redis_set(self, namespace: str, key: str, value: Any):
+        try:
+            client = self._redis_client()
+            if client:
+                client.setex(self._redis_key(namespace, key), self.ttl, json.dumps(value, ensure_ascii=False))
+        except Exception as e:
+            print(f"Redis error writing intent cache: {e}")
+
+
+# مثيل واحد لكل عملية
+intent_cache = IntentCache(
+    max_size=settings.INTENT_CACHE_MAX_SIZE,
+    ttl=settings.INTENT_CACHE_TTL,
+    enabled=settings.INTENT_CACHE_ENABLED,
+    use_redis=settings.INTENT_CACHE_REDIS
+)
@@ -5,14 +5,50 @@ Intent Recognition Service
 نظام التعرف على نوايا المستخدم في إدارة حساباته على منصات التواصل الاجتماعي
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Pattern, Tuple
 from enum import Enum
 import re
+import time
 from datetime import datetime
 import logging
 
+from app.services.intent_cache import intent_cache
+from app.utils.arabic_normalizer import normalize_arabic
+
 logger = logging.getLogger(__name__)
 
+# مستويات الثقة: النمط ككلمة كاملة / النمط داخل كلمة
+EXACT_CONFIDENCE = 0.95
+PARTIAL_CONFIDENCE = 0.75
+
+# أنماط النوايا بدون هذه الرموز تُعامل كنص حرفي (بحث substring بدل regex)
+REGEX_SYNTAX = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+# الأحرف الوحيدة التي يطابقها re.IGNORECASE مع حروف الأنماط اللاتينية رغم أن lower() لا يحولها
+IGNORECASE_FOLD = str.maketrans({"ı": "i", "ſ": "s"})
+
+# أنماط استخراج الكيانات (تُترجم مرة واحدة)
+TIME_PATTERNS = [
+    (re.compile(r"غداً|tomorrow", re.IGNORECASE), "tomorrow"),
+    (re.compile(r"بعد (\d+) ساعة|in (\d+) hour", re.IGNORECASE), "hours"),
+    (re.compile(r"في الساعة (\d+)", re.IGNORECASE), "time"),
+    (re.compile(r"(\d{1,2}):(\d{2})", re.IGNORECASE), "time")
+]
+
+ACCOUNT_PATTERNS = [
+    re.compile(r"من حساب\s+(\w+)", re.IGNORECASE),
+    re.compile(r"حساب\s+(\w+)", re.IGNORECASE),
+    re.compile(r"@(\w+)", re.IGNORECASE),
+    re.compile(r"account\s+(\w+)", re.IGNORECASE),
+    re.compile(r"في حساب\s+(\w+)", re.IGNORECASE),
+    re.compile(r"على حساب\s+(\w+)", re.IGNORECASE)
+]
+
+QUOTED_CONTENT_PATTERN = re.compile(r'["\'](.+?)["\']|"(.+?)"|«(.+?)»')
+CONTENT_PREFIX_PATTERN = re.compile(r'^(في الحساب|بالنص التالي|النص التالي|بالنص|:)\s*', re.IGNORECASE)
+CONTENT_KEYWORDS = ["غرد", "انشر", "تغريدة", "نص التغريدة", "tweet", "post"]
+NUMBER_PATTERN = re.compile(r'\d+')
+
 
 class IntentType(str, Enum):
     """أنواع النوايا المدعومة"""
@@ -93,6 +129,31 @@ class IntentService:
     def __init__(self):
         self.intent_patterns = self._initialize_patterns()
         self.platform_keywords = self._initialize_platform_keywords()
+        self._compile_patterns()
+
+    def _compile_patterns(self):
+        """
+        تجهيز الأنماط مرة واحدة: الكلمات الحرفية (أغلب الأنماط) تُبحث كنص عادي داخل
+        النص بعد lower()، والأنماط التي فيها رموز regex تُترجم. نمط حدود الكلمات
+        \\b...\\b يُترجم لكل نمط ولا يُستخدم إلا إذا وُجد النمط في النص.
+        الأنماط والكلمات المفتاحية تُوحَّد بـ normalize_arabic مثل النص المدخل.
+        يجب استدعاؤها من جديد إذا تم تعديل intent_patterns أو platform_keywords.
+        """
+        self._matchers: List[Tuple[IntentType, List[Tuple[Optional[str], Optional[Pattern], Pattern]]]] = []
+        for intent_type, patterns in self.intent_patterns.items():
+            entries = []
+            for pattern in map(normalize_arabic, patterns):
+                exact = re.compile(f"\\b{pattern}\\b", re.IGNORECASE)
+                if REGEX_SYNTAX.search(pattern):
+                    entries.append((None, re.compile(pattern, re.IGNORECASE), exact))
+                else:
+                    entries.append((pattern.lower(), None, exact))
+            self._matchers.append((intent_type, entries))
+
+        self._platform_matchers: List[Tuple[Platform, List[str]]] = [
+            (platform, [normalize_arabic(keyword.lower()) for keyword in keywords])
+            for platform, keywords in self.platform_keywords.items()
+        ]
     
     def _initialize_patterns(self) -> Dict[IntentType, List[str]]:
         """تهيئة أنماط التعرف على النوايا"""
@@ -335,24 +396,14 @@ class IntentService:
         Returns:
             IntentResult: نتيجة التعرف على النية
         """
-        text_lower = text.lower()
-        
-        # البحث عن النية
-        detected_intent = IntentType.UNKNOWN
-        max_confidence = 0.0
-        
-        for intent_type, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text_lower, re.IGNORECASE):
-                    confidence = self._calculate_confidence(text_lower, pattern)
-                    if confidence > max_confidence:
-                        max_confidence = confidence
-                        detected_intent = intent_type
-        
-        # استخراج المنصة
-        platform = self._detect_platform(text_lower)
+        # النية والمنصة تعتمدان فقط على النص بعد التوحيد، فتُحفظ في intent_cache
+        normalized = normalize_arabic(text.lower())
+        match = intent_cache.get_or_compute("detect", normalized, lambda: self._analyze(normalized))
+        detected_intent = IntentType(match["intent"])
+        max_confidence = match["confidence"]
+        platform = Platform(match["platform"]) if match["platform"] else None
         
-        # استخراج الكيانات
+        # استخراج الكيانات (من النص الأصلي)
         entities = self._extract_entities(text, detected_intent)
         
         logger.info(f"Intent detected: {detected_intent.value} (confidence: {max_confidence:.2f})")
@@ -365,19 +416,41 @@ class IntentService:
             raw_text=text
         )
     
-    def _calculate_confidence(self, text: str, pattern: str) -> float:
-        """حساب مستوى الثقة في التعرف على النية"""
-        # إذا كان النمط موجود بالضبط، ثقة عالية
-        if re.search(f"\\b{pattern}\\b", text, re.IGNORECASE):
-            return 0.95
-        # إذا كان موجود كجزء من الكلمة
-        elif re.search(pattern, text, re.IGNORECASE):
-            return 0.75
-        return 0.5
+    def _analyze(self, normalized: str) -> Dict[str, Any]:
+        """النية والثقة والمنصة لنص موحد (قيمة قابلة لـ JSON لأجل intent_cache)"""
+        intent, confidence = self._match_intent(normalized)
+        platform = self._detect_platform(normalized)
+        return {
+            "intent": intent.value,
+            "confidence": confidence,
+            "platform": platform.value if platform else None
+        }
+    
+    def _match_intent(self, text: str) -> Tuple[IntentType, float]:
+        """
+        أول نية (بترتيب intent_patterns) فيها نمط موجود ككلمة كاملة تأخذ 0.95،
+        وإلا أول نية فيها نمط موجود كجزء من كلمة تأخذ 0.75
+        """
+        folded = text.translate(IGNORECASE_FOLD)
+        partial_intent = None
+
+        for intent_type, entries in self._matchers:
+            for literal, pattern, exact in entries:
+                found = literal in folded if literal is not None else pattern.search(text)
+                if not found:
+                    continue
+                if exact.search(text):
+                    return intent_type, EXACT_CONFIDENCE
+                if partial_intent is None:
+                    partial_intent = intent_type
+
+        if partial_intent is not None:
+            return partial_intent, PARTIAL_CONFIDENCE
+        return IntentType.UNKNOWN, 0.0
     
     def _detect_platform(self, text: str) -> Optional[Platform]:
         """التعرف على المنصة من النص"""
-        for platform, keywords in self.platform_keywords.items():
+        for platform, keywords in self._platform_matchers:
             for keyword in keywords:
                 if keyword in text:
                     return platform
@@ -388,15 +461,8 @@ class IntentService:
         entities = {}
         
         # استخراج الوقت/التاريخ
-        time_patterns = [
-            (r"غداً|tomorrow", "tomorrow"),
-            (r"بعد (\d+) ساعة|in (\d+) hour", "hours"),
-            (r"في الساعة (\d+)", "time"),
-            (r"(\d{1,2}):(\d{2})", "time")
-        ]
-        
-        for pattern, entity_type in time_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern, entity_type in TIME_PATTERNS:
+            match = pattern.search(text)
             if match:
                 entities["schedule_time"] = {
                     "type": entity_type,
@@ -404,17 +470,8 @@ class IntentService:
                 }
         
         # استخراج اسم الحساب
-        account_patterns = [
-            r"من حساب\s+(\w+)",
-            r"حساب\s+(\w+)",
-            r"@(\w+)",
-            r"account\s+(\w+)",
-            r"في حساب\s+(\w+)",
-            r"على حساب\s+(\w+)"
-        ]
-        
-        for pattern in account_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in ACCOUNT_PATTERNS:
+            match = pattern.search(text)
             if match:
                 entities["account_name"] = match.group(1)
                 break
@@ -422,7 +479,7 @@ class IntentService:
         # استخراج محتوى المنشور
         if intent in [IntentType.CREATE_POST, IntentType.SCHEDULE_POST]:
             # البحث عن محتوى بين علامات اقتباس
-            content_match = re.search(r'["\'](.+?)["\']|"(.+?)"|«(.+?)»', text)
+            content_match = QUOTED_CONTENT_PATTERN.search(text)
             if content_match:
                 entities["content"] = (
                     content_match.group(1) or 
@@ -431,19 +488,20 @@ class IntentService:
                 )
             else:
                 # إذا لم يكن هناك علامات اقتباس، استخرج النص بعد الكلمات المفتاحية
-                for keyword in ["غرد", "انشر", "تغريدة", "نص التغريدة", "tweet", "post"]:
-                    if keyword in text.lower():
-                        parts = text.lower().split(keyword, 1)
+                text_lower = text.lower()
+                for keyword in CONTENT_KEYWORDS:
+                    if keyword in text_lower:
+                        parts = text_lower.split(keyword, 1)
                         if len(parts) > 1:
                             content = parts[1].strip()
                             # إزالة كلمات مثل "في الحساب", "بالنص التالي", إلخ
-                            content = re.sub(r'^(في الحساب|بالنص التالي|النص التالي|بالنص|:)\s*', '', content, flags=re.IGNORECASE)
+                            content = CONTENT_PREFIX_PATTERN.sub('', content)
                             if content:
                                 entities["content"] = content
                                 break
         
         # استخراج الأرقام
-        numbers = re.findall(r'\d+', text)
+        numbers = NUMBER_PATTERN.findall(text)
         if numbers:
             entities["numbers"] = [int(n) for n in numbers]
         
@@ -459,12 +517,16 @@ class IntentService:
         Returns:
             قائمة بالاقتراحات
         """
+        normalized = normalize_arabic(partial_text.lower())
+        return intent_cache.get_or_compute("suggest", normalized, lambda: self._suggest(normalized))
+    
+    def _suggest(self, normalized: str) -> List[Dict[str, str]]:
         suggestions = []
-        text_lower = partial_text.lower()
         
         for intent_type, patterns in self.intent_patterns.items():
             for pattern in patterns:
-                if pattern in text_lower or text_lower in pattern:
+                normalized_pattern = normalize_arabic(pattern)
+                if normalized_pattern in normalized or normalized in normalized_pattern:
                     suggestions.append({
                         "intent": intent_type.value,
                         "example": pattern,
@@ -488,3 +550,17 @@ class IntentService:
 
 # مثيل واحد من الخدمة
 intent_service = IntentService()
+
+
+def detect_intents_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    تحليل مجموعة نصوص دفعة واحدة مع زمن كل نص بالمللي ثانية.
+    دالة على مستوى الموديول حتى يمكن تشغيلها داخل ProcessPoolExecutor (/api/intent/batch).
+    """
+    results = []
+    for text in texts:
+        start = time.perf_counter()
+        data = intent_service.detect_intent(text).to_dict()
+        data["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        results.append(data)
+    return results
@@ -4,13 +4,17 @@
 Memory Service - خدمة إدارة ذاكرة المحادثات
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 import json
 
 from app.db.database import get_db
 from app.db.models import Conversation, Message, User
+from app.services.context_builder import context_builder
+from app.services.rollup_service import rollup_service, CONVERSATIONS_TOTAL, MESSAGES_TOTAL, intent_metric
+from app.services.message_buffer import message_buffer, write_messages
 
 
 class MemoryService:
@@ -64,6 +68,7 @@ class MemoryService:
                 title="محادثة جديدة"
             )
             db.add(conversation)
+            rollup_service.add(db, {CONVERSATIONS_TOTAL: 1}, user_id=user_id)
             db.commit()
             db.refresh(conversation)
         
@@ -78,11 +83,15 @@ class MemoryService:
         intent: Optional[str] = None,
         confidence: Optional[float] = None,
         agent: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        durable: bool = False
     ) -> Message:
         """
         إضافة رسالة للمحادثة
         
+        مع MEMORY_WRITE_BUFFER تُضاف الرسالة لطابور message_buffer وتُكتب مع غيرها
+        في transaction واحدة خلال MEMORY_WRITE_FLUSH_MS — الرسالة المُرجعة بدون id.
+        
         Args:
             db: جلسة قاعدة البيانات
             conversation_id: معرف المحادثة
@@ -92,32 +101,32 @@ class MemoryService:
             confidence: مستوى الثقة
             agent: الوكيل الذي عالج الرسالة
             metadata: بيانات إضافية
+            durable: الكتابة فوراً (لمن يقرأ الرسالة مباشرة بعد إضافتها)
             
         Returns:
             الرسالة المضافة
         """
-        message = Message(
-            conversation_id=conversation_id,
-            role=role,
-            content=content,
-            intent=intent,
-            confidence=str(confidence) if confidence else None,
-            agent=agent,
-            extra_data=json.dumps(metadata) if metadata else None
-        )
-        
-        db.add(message)
+        values = {
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "intent": intent,
+            "confidence": str(confidence) if confidence else None,
+            "agent": agent,
+            "extra_data": json.dumps(metadata) if metadata else None,
+            "created_at": datetime.utcnow()
+        }
         
-        # تحديث عنوان المحادثة من أول رسالة مستخدم
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id
-        ).first()
+        if message_buffer.enabled and not durable:
+            message_buffer.add(values)
+            return Message(**values)
         
-        if conversation and role == "user" and conversation.title == "محادثة جديدة":
-            # استخدم أول 50 حرف من الرسالة كعنوان
-            conversation.title = content[:50] + ("..." if len(content) > 50 else "")
+        # الرسائل المعلقة أولاً حتى لا تسبقها هذه الرسالة
+        message_buffer.flush()
         
-        conversation.updated_at = datetime.utcnow()
+        message = Message(**values)
+        db.add(message)
+        write_messages(db, [values], insert_rows=False)
         
         db.commit()
         db.refresh(message)
@@ -141,12 +150,38 @@ class MemoryService:
         Returns:
             قائمة الرسائل
         """
+        # الرسائل المعلقة في message_buffer أولاً (قراءة ما كُتب للتو)
+        message_buffer.flush()
+        
         messages = db.query(Message).filter(
             Message.conversation_id == conversation_id
         ).order_by(Message.created_at.desc()).limit(limit).all()
         
         return list(reversed(messages))
     
+    def get_chat_messages(
+        self,
+        db: Session,
+        conversation_id: int,
+        limit: Optional[int] = 50
+    ) -> List[Dict[str, str]]:
+        """
+        آخر رسائل المحادثة بصيغة chat.completions (لتحميل سجل AIService)
+        
+        Args:
+            db: جلسة قاعدة البيانات
+            conversation_id: معرف المحادثة
+            limit: عدد الرسائل المطلوبة
+            
+        Returns:
+            قائمة {"role", "content"} من الأقدم للأحدث (رسائل user / assistant غير الفارغة فقط)
+        """
+        return [
+            {"role": message.role, "content": message.content}
+            for message in self.get_conversation_history(db, conversation_id, limit)
+            if message.role in ("user", "assistant") and message.content
+        ]
+    
     def get_user_conversations(
         self,
         db: Session,
@@ -164,12 +199,38 @@ class MemoryService:
         Returns:
             قائمة المحادثات
         """
+        message_buffer.flush()
+        
         conversations = db.query(Conversation).filter(
             Conversation.user_id == user_id
         ).order_by(Conversation.updated_at.desc()).limit(limit).all()
         
         return conversations
     
+    def get_message_counts(
+        self,
+        db: Session,
+        conversation_ids: List[int]
+    ) -> Dict[int, int]:
+        """
+        عدد الرسائل لكل محادثة في استعلام واحد (بدل len(conv.messages) لكل محادثة)
+        
+        Args:
+            db: جلسة قاعدة البيانات
+            conversation_ids: معرفات المحادثات
+            
+        Returns:
+            {conversation_id: عدد الرسائل}
+        """
+        message_buffer.flush()
+        
+        if not conversation_ids:
+            return {}
+        rows = db.query(Message.conversation_id, func.count(Message.id)).filter(
+            Message.conversation_id.in_(conversation_ids)
+        ).group_by(Message.conversation_id).all()
+        return {conversation_id: count for conversation_id, count in rows}
+    
     def get_conversation_context(
         self,
         db: Session,
@@ -179,6 +240,9 @@ class MemoryService:
         """
         الحصول على سياق المحادثة للوكيل
         
+        الرسائل الأقدم من آخر max_messages تدخل في ملخص تراكمي (context_builder)،
+        فحجم السياق ثابت ضمن MEMORY_CONTEXT_TOKEN_BUDGET مهما طالت المحادثة
+        
         Args:
             db: جلسة قاعدة البيانات
             conversation_id: معرف المحادثة
@@ -187,17 +251,9 @@ class MemoryService:
         Returns:
             نص السياق
         """
-        messages = self.get_conversation_history(db, conversation_id, max_messages)
+        message_buffer.flush()
         
-        if not messages:
-            return ""
-        
-        context_parts = []
-        for msg in messages:
-            role_ar = "المستخدم" if msg.role == "user" else "المساعد"
-            context_parts.append(f"{role_ar}: {msg.content}")
-        
-        return "\n".join(context_parts)
+        return context_builder.build(db, conversation_id, recent_turns=max_messages)
     
     def get_user_preferences(
         self,
@@ -214,49 +270,121 @@ class MemoryService:
         Returns:
             تفضيلات المستخدم
         """
-        # الحصول على آخر 100 رسالة للمستخدم
-        conversations = self.get_user_conversations(db, user_id, limit=10)
+        message_buffer.flush()
+        
+        # تجميع على مستوى SQL لآخر 10 محادثات — عدد ثابت من الاستعلامات مهما كبر التاريخ
+        recent = self._recent_conversations(user_id, limit=10)
+        total_conversations, last_interaction = self._conversations_overview(db, recent)
         
         preferences = {
-            "total_conversations": len(conversations),
+            "total_conversations": total_conversations,
             "common_intents": [],
             "preferred_platforms": [],
             "last_interaction": None
         }
         
-        if conversations:
-            preferences["last_interaction"] = conversations[0].updated_at.isoformat()
-            
-            # تحليل النوايا الشائعة
-            intent_counts = {}
-            platform_counts = {}
-            
-            for conv in conversations:
-                for msg in conv.messages:
-                    if msg.intent:
-                        intent_counts[msg.intent] = intent_counts.get(msg.intent, 0) + 1
-                    
-                    if msg.extra_data:
-                        try:
-                            extra_data = json.loads(msg.extra_data)
-                            if extra_data.get("platform"):
-                                platform = extra_data["platform"]
-                                platform_counts[platform] = platform_counts.get(platform, 0) + 1
-                        except:
-                            pass
+        if total_conversations:
+            preferences["last_interaction"] = last_interaction.isoformat() if last_interaction else None
             
             # أكثر النوايا شيوعاً
-            if intent_counts:
-                sorted_intents = sorted(intent_counts.items(), key=lambda x: x[1], reverse=True)
-                preferences["common_intents"] = [intent for intent, _ in sorted_intents[:5]]
+            preferences["common_intents"] = [
+                intent for intent, _ in self._top_intents(db, recent, limit=5)
+            ]
             
-            # المنصات المفضلة
-            if platform_counts:
-                sorted_platforms = sorted(platform_counts.items(), key=lambda x: x[1], reverse=True)
-                preferences["preferred_platforms"] = [platform for platform, _ in sorted_platforms[:3]]
+            # المنصات المفضلة (platform من JSON في extra_data)
+            preferences["preferred_platforms"] = [
+                value for value, _ in self._top_platforms(db, recent, limit=3)
+            ]
         
         return preferences
     
+    def get_conversation_stats(
+        self,
+        db: Session,
+        user_id: int,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        إحصائيات آخر المحادثات للمستخدم (COUNT و GROUP BY في SQL بدل تحميل الرسائل)
+        
+        Args:
+            db: جلسة قاعدة البيانات
+            user_id: معرف المستخدم
+            limit: عدد المحادثات الأخيرة المشمولة
+            
+        Returns:
+            total_conversations, total_messages, top_intents, last_conversation
+        """
+        message_buffer.flush()
+        
+        recent = self._recent_conversations(user_id, limit)
+        total_conversations, last_conversation = self._conversations_overview(db, recent)
+        
+        total_messages = db.query(func.count(Message.id)).filter(
+            Message.conversation_id.in_(select(recent.c.id))
+        ).scalar() if total_conversations else 0
+        
+        top_intents = self._top_intents(db, recent, limit=5) if total_messages else []
+        
+        return {
+            "total_conversations": total_conversations,
+            "total_messages": total_messages,
+            "top_intents": [{"intent": intent, "count": count} for intent, count in top_intents],
+            "last_conversation": last_conversation.isoformat() if last_conversation else None
+        }
+    
+    def _recent_conversations(self, user_id: int, limit: int):
+        """subquery لآخر محادثات المستخدم (id, updated_at)"""
+        return select(Conversation.id, Conversation.updated_at).where(
+            Conversation.user_id == user_id
+        ).order_by(Conversation.updated_at.desc()).limit(limit).subquery()
+    
+    def _conversations_overview(self, db: Session, recent) -> Tuple[int, Optional[datetime]]:
+        count, last = db.query(func.count(recent.c.id), func.max(recent.c.updated_at)).one()
+        return count or 0, last
+    
+    def _top_intents(self, db: Session, recent, limit: int) -> List[Tuple[str, int]]:
+        count = func.count(Message.id)
+        rows = db.query(Message.intent, count).filter(
+            Message.conversation_id.in_(select(recent.c.id)),
+            Message.intent.isnot(None),
+            Message.intent != ""
+        ).group_by(Message.intent).order_by(count.desc(), Message.intent).limit(limit).all()
+        return [(intent, total) for intent, total in rows]
+    
+    def _top_platforms(self, db: Session, recent, limit: int) -> List[Tuple[str, int]]:
+        in_recent = Message.conversation_id.in_(select(recent.c.id))
+        if db.get_bind().dialect.name == "sqlite":
+            # JSON1: التجميع كله في SQL
+            platform = case(
+                (func.json_valid(Message.extra_data) == 1, func.json_extract(Message.extra_data, "$.platform")),
+                else_=None
+            )
+            count = func.count(Message.id)
+            rows = db.query(platform, count).filter(
+                in_recent,
+                Message.extra_data.isnot(None),
+                platform.isnot(None),
+                platform != ""
+            ).group_by(platform).order_by(count.desc(), platform).limit(limit).all()
+            return [(value, total) for value, total in rows]
+        
+        # قواعد أخرى (PostgreSQL): extra_data نص وقد لا يكون JSON صالحاً، و ::json يُفشل
+        # الاستعلام كله عند أول صف تالف — نقرأ الصفوف التي تذكر platform ونحللها هنا
+        counts: Dict[str, int] = {}
+        rows = db.query(Message.extra_data).filter(
+            in_recent,
+            Message.extra_data.like('%"platform"%')
+        )
+        for (raw,) in rows:
+            try:
+                value = json.loads(raw).get("platform")
+            except (ValueError, AttributeError):
+                continue
+            if isinstance(value, str) and value:
+                counts[value] = counts.get(value, 0) + 1
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    
     def delete_conversation(
         self,
         db: Session,
@@ -274,6 +402,8 @@ class MemoryService:
         Returns:
             نجاح العملية
         """
+        message_buffer.flush()
+        
         query = db.query(Conversation).filter(Conversation.id == conversation_id)
         
         if user_id:
@@ -282,6 +412,16 @@ class MemoryService:
         conversation = query.first()
         
         if conversation:
+            # إنقاص العدادات بمقدار رسائل المحادثة (استعلام تجميع واحد)
+            deltas = {CONVERSATIONS_TOTAL: -1}
+            for intent, count in db.query(Message.intent, func.count(Message.id)).filter(
+                Message.conversation_id == conversation.id
+            ).group_by(Message.intent).all():
+                deltas[MESSAGES_TOTAL] = deltas.get(MESSAGES_TOTAL, 0) - count
+                if intent:
+                    deltas[intent_metric(intent)] = -count
+            rollup_service.add(db, deltas, user_id=conversation.user_id)
+            
             db.delete(conversation)
             db.commit()
             return True
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Message Write Buffer
+تجميع كتابات MemoryService.add_message (write-behind)
+
+كل add_message كان: INSERT + SELECT للمحادثة + UPDATE لـ updated_at + commit + refresh،
+أي عدة رحلات وعملية fsync لكل رسالة (مرتين في كل دور). هنا تُجمع الرسائل في الذاكرة
+وتُكتب دفعة واحدة كل MEMORY_WRITE_FLUSH_MS (أو عند MEMORY_WRITE_BATCH_SIZE رسالة):
+INSERT واحد لكل الرسائل، UPDATE واحد لمحادثاتها (updated_at والعنوان) وعدادات
+stat_rollups — في transaction واحدة.
+
+من يحتاج قراءة رسالته فوراً يمرر durable=True لـ add_message: تُكتب الرسائل المعلقة
+أولاً (للحفاظ على الترتيب) ثم رسالته مباشرة.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import Conversation, Message
+from app.services.rollup_service import rollup_service, MESSAGES_TOTAL, intent_metric
+
+NEW_CONVERSATION_TITLE = "محادثة جديدة"
+# محاولات كتابة الدفعة قبل التخلي عنها (خطأ دائم في قاعدة البيانات)
+MAX_ATTEMPTS = 3
+
+
+def conversation_title(content: str) -> str:
+    """أول 50 حرف من رسالة المستخدم كعنوان للمحادثة"""
+    return content[:50] + ("..." if len(content) > 50 else "")
+
+
+class MessageWriteBuffer:
+    """طابور رسائل يُفرَّغ في الخلفية بدفعات"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        flush_interval: float = 0.05,
+        max_batch: int = 100,
+        enabled: bool = True
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self.enabled = enabled
+        self._pending: List[Dict[str, Any]] = []
+        self._attempts = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._flushes = 0
+        self._written = 0
+        self._dropped = 0
+
+    def add(self, values: Dict[str, Any]):
+        """إضافة رسالة للطابور (قيم أعمدة messages)"""
+        with self._cond:
+            self._pending.append(values)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def flush(self):
+        """كتابة كل الرسائل المعلقة الآن (في thread المستدعي)"""
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            self._write_batch(batch)
+
+    def close(self):
+        """إيقاف الـ thread وكتابة ما تبقى (عند إغلاق التطبيق)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "flushes": self._flushes,
+                "written": self._written,
+                "dropped": self._dropped
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                if len(self._pending) < self.max_batch:
+                    # انتظار بقية رسائل الفترة (رسائل أدوار أخرى تدخل نفس الدفعة)
+                    self._cond.wait(self.flush_interval)
+            self.flush()
+            if self._attempts:
+                time.sleep(self.flush_interval * self._attempts)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        if not batch:
+            return
+        db = self.session_factory()
+        try:
+            write_messages(db, batch)
+            db.commit()
+            self._attempts = 0
+            with self._cond:
+                self._flushes += 1
+                self._written += len(batch)
+        except Exception as e:
+            db.rollback()
+            self._attempts += 1
+            if self._attempts >= MAX_ATTEMPTS:
+                print(f"[ERROR] Message buffer: dropping {len(batch)} messages after {self._attempts} attempts: {str(e)}")
+                self._attempts = 0
+                with self._cond:
+                    self._dropped += len(batch)
+            else:
+                print(f"Warning: Message buffer flush failed (attempt {self._attempts}): {str(e)}")
+                with self._cond:
+                    # إعادتها لأول الطابور للحفاظ على الترتيب
+                    self._pending[:0] = batch
+        finally:
+            db.close()
+
+
+def write_messages(db: Session, batch: List[Dict[str, Any]], insert_rows: bool = True):
+    """
+    كتابة دفعة رسائل في جلسة db (بدون commit):
+    INSERT للرسائل، UPDATE للمحادثات (updated_at / العنوان) وعدادات stat_rollups
+
+    insert_rows=False إذا أُضيفت الرسائل للجلسة مسبقاً (الكتابة الفورية durable)
+    """
+    conversation_ids = {values["conversation_id"] for values in batch}
+    conversations = {
+        row.id: row for row in db.query(
+            Conversation.id, Conversation.user_id, Conversation.title
+        ).filter(Conversation.id.in_(conversation_ids)).all()
+    }
+    # رسائل محادثات حُذفت قبل الكتابة تُتجاهل
+    batch = [values for values in batch if values["conversation_id"] in conversations]
+    if not batch:
+        return
+
+    if insert_rows:
+        db.execute(insert(Message), batch)
+
+    touched: Dict[int, Dict[str, Any]] = {}
+    deltas: Dict[Optional[int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for values in batch:
+        conversation = conversations[values["conversation_id"]]
+        # نفس المفاتيح لكل الصفوف (executemany واحد)
+        touch = touched.setdefault(conversation.id, {
+            "id": conversation.id,
+            "title": conversation.title,
+            "updated_at": values["created_at"]
+        })
+        touch["updated_at"] = max(touch["updated_at"], values["created_at"])
+        if values["role"] == "user" and touch["title"] == NEW_CONVERSATION_TITLE:
+            touch["title"] = conversation_title(values["content"])
+
+        user_deltas = deltas[conversation.user_id]
+        user_deltas[MESSAGES_TOTAL] += 1
+        if values.get("intent"):
+            user_deltas[intent_metric(values["intent"])] += 1
+
+    db.execute(update(Conversation), list(touched.values()))
+    for user_id, user_deltas in deltas.items():
+        rollup_service.add(db, user_deltas, user_id=user_id)
+
+
+# مثيل واحد لكل عملية
+message_buffer = MessageWriteBuffer(
+    session_factory=SessionLocal,
+    flush_interval=settings.MEMORY_WRITE_FLUSH_MS / 1000,
+    max_batch=settings.MEMORY_WRITE_BATCH_SIZE,
+    enabled=settings.MEMORY_WRITE_BUFFER
+)
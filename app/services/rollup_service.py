@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Stat Rollups Service
+عدادات إحصائية محسوبة مسبقاً في جدول stat_rollups
+
+بدل COUNT على users / conversations / messages / social_accounts عند كل تحديث للوحة التحكم،
+كل عملية كتابة (MemoryService.add_message، AccountService، تسجيل/تعديل/حذف المستخدمين)
+تزيد أو تنقص العدادات المتأثرة داخل نفس الـ transaction، بعبارة upsert واحدة.
+لوحات التحكم تقرأ كل أرقامها باستعلام واحد.
+
+backfill() يعيد حساب كل العدادات من الجداول (python backfill_rollups.py).
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.models import Conversation, Message, SocialAccount, StatRollup, User, XAccount
+
+# user_id للعدادات العامة
+GLOBAL = 0
+
+USERS_TOTAL = "users.total"
+USERS_ACTIVE = "users.active"
+USERS_ADMIN = "users.admin"
+X_ACCOUNTS_TOTAL = "x_accounts.total"
+CONVERSATIONS_TOTAL = "conversations.total"
+MESSAGES_TOTAL = "messages.total"
+ACCOUNTS_TOTAL = "accounts.total"
+
+
+def users_created_on(day: date) -> str:
+    return f"users.created:{day.isoformat()}"
+
+
+def intent_metric(intent: str) -> str:
+    return f"intent:{intent}"
+
+
+def account_status_metric(status: str) -> str:
+    return f"accounts.status:{status}"
+
+
+def account_platform_metric(platform: str) -> str:
+    return f"accounts.platform:{platform}"
+
+
+def user_metrics(user: User, sign: int = 1) -> Dict[str, int]:
+    """عدادات مستخدم واحد (sign=-1 عند الحذف)"""
+    created = (user.created_at or datetime.utcnow()).date()
+    return {
+        USERS_TOTAL: sign,
+        USERS_ACTIVE: sign if user.is_active is not False else 0,
+        USERS_ADMIN: sign if user.is_admin else 0,
+        users_created_on(created): sign,
+    }
+
+
+def account_metrics(account: SocialAccount, sign: int = 1) -> Dict[str, int]:
+    """عدادات حساب اجتماعي واحد (sign=-1 عند الحذف أو قبل تعديل الحالة/المنصة)"""
+    return {
+        ACCOUNTS_TOTAL: sign,
+        account_status_metric(account.status or "active"): sign,
+        account_platform_metric(account.platform): sign,
+    }
+
+
+class RollupService:
+    """قراءة وتحديث عدادات stat_rollups"""
+
+    def add(self, db: Session, deltas: Dict[str, int], user_id: Optional[int] = None):
+        """
+        تطبيق تغييرات على العدادات العامة (ولعدادات user_id إن وُجد)
+
+        لا يعمل commit — التغيير يُحفظ مع عملية الكتابة نفسها.
+
+        Args:
+            db: جلسة قاعدة البيانات
+            deltas: {metric: مقدار التغيير}
+            user_id: صاحب العدادات الشخصية (اختياري)
+        """
+        owners = (GLOBAL, user_id) if user_id else (GLOBAL,)
+        now = datetime.utcnow()
+        rows = [
+            {"user_id": owner, "metric": metric, "value": delta, "updated_at": now}
+            for metric, delta in deltas.items() if delta
+            for owner in owners
+        ]
+        if not rows:
+            return
+
+        insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(StatRollup).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[StatRollup.user_id, StatRollup.metric],
+            set_={"value": StatRollup.value + stmt.excluded.value, "updated_at": now}
+        ))
+
+    def get(self, db: Session, user_id: Optional[int] = None) -> Dict[str, int]:
+        """كل عدادات المالك (العامة إذا لم يُحدد user_id) — استعلام واحد"""
+        rows = db.query(StatRollup.metric, StatRollup.value).filter(
+            StatRollup.user_id == (user_id or GLOBAL)
+        ).all()
+        return defaultdict(int, {metric: value for metric, value in rows})
+
+    def get_many(self, db: Session, user_ids: Iterable[int], metrics: List[str]) -> Dict[int, Dict[str, int]]:
+        """عدادات محددة لعدة مستخدمين — استعلام واحد"""
+        user_ids = list(user_ids)
+        result = {user_id: defaultdict(int) for user_id in user_ids}
+        if not user_ids:
+            return result
+        rows = db.query(StatRollup.user_id, StatRollup.metric, StatRollup.value).filter(
+            StatRollup.user_id.in_(user_ids),
+            StatRollup.metric.in_(metrics)
+        ).all()
+        for user_id, metric, value in rows:
+            result[user_id][metric] = value
+        return result
+
+    def backfill(self, db: Session) -> int:
+        """
+        إعادة حساب كل العدادات من الجداول (GROUP BY) واستبدال الموجود
+
+        Returns:
+            عدد العدادات المكتوبة
+        """
+        totals: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+        def put(user_id: Optional[int], metric: str, value: int):
+            totals[GLOBAL][metric] += value
+            if user_id:
+                totals[user_id][metric] += value
+
+        # المستخدمون
+        created_day = func.date(User.created_at)
+        for day, count, active, admin in db.query(
+            created_day,
+            func.count(User.id),
+            func.sum(case((User.is_active == True, 1), else_=0)),
+            func.sum(case((User.is_admin == True, 1), else_=0))
+        ).group_by(created_day).all():
+            put(None, USERS_TOTAL, count)
+            put(None, USERS_ACTIVE, active or 0)
+            put(None, USERS_ADMIN, admin or 0)
+            if day:
+                put(None, f"users.created:{day}", count)
+
+        put(None, X_ACCOUNTS_TOTAL, db.query(func.count(XAccount.id)).scalar() or 0)
+
+        # المحادثات والرسائل والنوايا
+        for user_id, count in db.query(Conversation.user_id, func.count(Conversation.id)).group_by(Conversation.user_id).all():
+            put(user_id, CONVERSATIONS_TOTAL, count)
+
+        for user_id, intent, count in db.query(
+            Conversation.user_id, Message.intent, func.count(Message.id)
+        ).join(Conversation, Message.conversation_id == Conversation.id).group_by(Conversation.user_id, Message.intent).all():
+            put(user_id, MESSAGES_TOTAL, count)
+            if intent:
+                put(user_id, intent_metric(intent), count)
+
+        # الحسابات الاجتماعية
+        for user_id, status, platform, count in db.query(
+            SocialAccount.user_id, SocialAccount.status, SocialAccount.platform, func.count(SocialAccount.id)
+        ).group_by(SocialAccount.user_id, SocialAccount.status, SocialAccount.platform).all():
+            put(user_id, ACCOUNTS_TOTAL, count)
+            put(user_id, account_status_metric(status or "active"), count)
+            put(user_id, account_platform_metric(platform), count)
+
+        now = datetime.utcnow()
+        db.query(StatRollup).delete()
+        db.bulk_insert_mappings(StatRollup, [
+            {"user_id": user_id, "metric": metric, "value": value, "updated_at": now}
+            for user_id, metrics in totals.items()
+            for metric, value in metrics.items()
+        ])
+        db.commit()
+        return sum(len(metrics) for metrics in totals.values())
+
+
+# إنشاء instance عام
+rollup_service = RollupService()
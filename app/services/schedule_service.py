@@ -3,13 +3,19 @@ import logging
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, func, or_, select, text, update
+from sqlalchemy.orm import Session, aliased
 
 from app.db.models import ScheduleEvent
+from app.scheduler.schedule_queue import schedule_queue
+from app.services.slot_allocator import slot_allocator
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# قفل PostgreSQL (pg_advisory_xact_lock) يجعل حجز الناشر متسلسلاً بين العمال
+PUBLISH_CLAIM_LOCK = 0x5C4ED01E
+
 KSA = ZoneInfo("Asia/Riyadh")
 UTC = ZoneInfo("UTC")
 
@@ -72,7 +78,8 @@ def _detect_mood(content: str, category: str) -> str:
     return "neutral"
 
 
-def _pick_run_at(intent_time: str) -> datetime:
+def _window_bounds(intent_time: str) -> tuple[datetime, datetime]:
+    """نافذة النشر القادمة للنية (UTC): [start, end)"""
     now_ksa = datetime.now(KSA)
 
     if intent_time in TIME_WINDOWS:
@@ -90,17 +97,29 @@ def _pick_run_at(intent_time: str) -> datetime:
         if candidate_start < now_ksa:
             candidate_start = now_ksa + timedelta(minutes=5)
 
-        window_seconds = int((candidate_end - candidate_start).total_seconds())
-        if window_seconds <= 0:
-            window_seconds = 3600
-        offset = random.randint(0, window_seconds)
-        run_at_ksa = candidate_start + timedelta(seconds=offset)
+        if candidate_end <= candidate_start:
+            candidate_end = candidate_start + timedelta(hours=1)
     else:
-        offset = random.randint(0, 86400)
-        run_at_ksa = now_ksa + timedelta(seconds=offset)
+        candidate_start = now_ksa
+        candidate_end = now_ksa + timedelta(days=1)
+
+    return (
+        candidate_start.astimezone(UTC).replace(tzinfo=None),
+        candidate_end.astimezone(UTC).replace(tzinfo=None),
+    )
 
-    run_at_utc = run_at_ksa.astimezone(UTC).replace(tzinfo=None)
-    return run_at_utc
+
+def _pick_run_at(intent_time: str) -> datetime:
+    start, end = _window_bounds(intent_time)
+    offset = random.randint(0, int((end - start).total_seconds()))
+    return start + timedelta(seconds=offset)
+
+
+def _allocate_run_at(db: Session, username: str, intent_time: str) -> datetime:
+    """وقت النشر: slot_allocator (الأقل حملاً مع فاصل الحساب) أو offset عشوائي"""
+    if not settings.SCHEDULE_SLOT_ALLOCATOR:
+        return _pick_run_at(intent_time)
+    return slot_allocator.allocate(db, username, *_window_bounds(intent_time))
 
 
 def _generate_event_id() -> str:
@@ -109,36 +128,81 @@ def _generate_event_id() -> str:
     return f"evt_{token}"
 
 
-def create_schedule_event(
-    db: Session,
-    platform: str,
-    username: str,
-    category: str,
-    content: str,
-) -> ScheduleEvent:
+def _build_event(db: Session, platform: str, username: str, category: str, content: str) -> ScheduleEvent:
     intent_time = _detect_intent_time(content, category)
     mood = _detect_mood(content, category)
-    run_at = _pick_run_at(intent_time)
-    event_id = _generate_event_id()
-
-    event = ScheduleEvent(
-        schedule_event_id=event_id,
+    return ScheduleEvent(
+        schedule_event_id=_generate_event_id(),
         platform=platform,
         username=username,
         category=category,
         content=content,
-        run_at=run_at,
+        run_at=_allocate_run_at(db, username, intent_time),
         intent_time=intent_time,
         mood=mood,
         status="SCHEDULED",
     )
-    db.add(event)
-    db.commit()
+
+
+def _release_slots(events: list[ScheduleEvent]):
+    if settings.SCHEDULE_SLOT_ALLOCATOR:
+        for event in events:
+            slot_allocator.release(event.username, event.run_at)
+
+
+def create_schedule_event(
+    db: Session,
+    platform: str,
+    username: str,
+    category: str,
+    content: str,
+) -> ScheduleEvent:
+    event = _build_event(db, platform, username, category, content)
+    try:
+        db.add(event)
+        db.commit()
+    except Exception:
+        db.rollback()
+        _release_slots([event])
+        raise
     db.refresh(event)
-    logger.info(f"Created ScheduleEvent {event_id} run_at={run_at} intent={intent_time} mood={mood}")
+    # يوقظ scheduler_tick إذا كان هذا أقرب حدث
+    schedule_queue.push(event.schedule_event_id, event.run_at)
+    logger.info(
+        f"Created ScheduleEvent {event.schedule_event_id} run_at={event.run_at} "
+        f"intent={event.intent_time} mood={event.mood}"
+    )
     return event
 
 
+def create_schedule_events(db: Session, posts: list[dict]) -> list[ScheduleEvent]:
+    """
+    جدولة عدة منشورات (platform, username, category, content) في commit واحد.
+    كل حدث يحجز وقته من slot_allocator قبل التالي، فتتوزع الدفعة على دقائق النافذة
+    وحسابات المنشورات بدل أن تتكدس.
+    """
+    events = []
+    try:
+        for post in posts:
+            events.append(_build_event(
+                db, post["platform"], post["username"], post["category"], post["content"]
+            ))
+        db.add_all(events)
+        db.flush()
+        # منفصلة عن الجلسة حتى لا يُعاد تحميل كل حدث بعد commit
+        for event in events:
+            db.expunge(event)
+        db.commit()
+    except Exception:
+        db.rollback()
+        _release_slots(events)
+        raise
+    for event in events:
+        schedule_queue.push(event.schedule_event_id, event.run_at)
+    logger.info(f"Created {len(events)} ScheduleEvents")
+    return events
+
+
 def get_due_events(db: Session) -> list[ScheduleEvent]:
     now_utc = datetime.utcnow()
     return (
@@ -151,6 +215,238 @@ def get_due_events(db: Session) -> list[ScheduleEvent]:
     )
 
 
+def claim_due_events(
+    db: Session,
+    worker_id: str,
+    lease_seconds: int = 60,
+    now: Optional[datetime] = None,
+    limit: int = 500,
+    due_before: Optional[datetime] = None,
+) -> list[ScheduleEvent]:
+    """
+    حجز حتى limit حدث مستحق لهذا العامل بعبارة واحدة
+    (UPDATE ... SET claimed_by, lease_until WHERE status='SCHEDULED' AND run_at<=due_before
+    AND الحدث غير محجوز أو انتهى حجزه RETURNING) و commit واحد.
+    الحجز يبدأ من now (وقت الاستدعاء)؛ due_before (افتراضياً now) حد run_at ثابت لكل دفعات اللحاق.
+
+    عدة عمليات (uvicorn workers / خوادم) تحجز دفعات منفصلة: الشرط يُعاد فحصه في UPDATE،
+    و PostgreSQL يتخطى الصفوف المقفلة (SKIP LOCKED) بدل انتظارها. إذا توقف العامل قبل
+    complete_claimed_events يحجزها غيره بعد lease_until.
+    الأحداث المُرجعة منفصلة عن الجلسة (detached) ومحملة بالكامل.
+    """
+    now_utc = now or datetime.utcnow()
+    claimable = and_(
+        ScheduleEvent.status == "SCHEDULED",
+        ScheduleEvent.run_at <= (due_before or now_utc),
+        or_(ScheduleEvent.lease_until.is_(None), ScheduleEvent.lease_until < now_utc),
+    )
+    due_ids = (
+        select(ScheduleEvent.id)
+        .where(claimable)
+        .order_by(ScheduleEvent.run_at)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        due_ids = due_ids.with_for_update(skip_locked=True)
+    stmt = (
+        update(ScheduleEvent)
+        .where(ScheduleEvent.id.in_(due_ids.scalar_subquery()), claimable)
+        .values(claimed_by=worker_id, lease_until=now_utc + timedelta(seconds=lease_seconds))
+        .returning(ScheduleEvent)
+    )
+    events = db.scalars(stmt, execution_options={"synchronize_session": False}).all()
+    for event in events:
+        db.expunge(event)
+    db.commit()
+    return events
+
+
+def complete_claimed_events(
+    db: Session,
+    worker_id: str,
+    event_ids: list[int],
+    auto_publish: bool = False,
+) -> set[int]:
+    """
+    تحويل أحداث محجوزة لهذا العامل إلى READY_TO_PUBLISH (UPDATE ... RETURNING واحد).
+    auto_publish=True يجعلها متاحة للناشر (claim_ready_events)
+
+    Returns:
+        معرفات الأحداث المحولة (ينقص منها ما انتهى حجزه وأخذه عامل آخر)
+    """
+    if not event_ids:
+        return set()
+    completed = db.scalars(
+        update(ScheduleEvent)
+        .where(
+            ScheduleEvent.id.in_(event_ids),
+            ScheduleEvent.claimed_by == worker_id,
+            ScheduleEvent.status == "SCHEDULED",
+        )
+        .values(
+            status="READY_TO_PUBLISH",
+            lease_until=None,
+            auto_publish=auto_publish,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(ScheduleEvent.id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    db.commit()
+    return set(completed)
+
+
+def account_key_expr(column):
+    """اسم الحساب للمقارنة في SQL: بدون @ وبأحرف صغيرة"""
+    return func.lower(func.ltrim(column, "@"))
+
+
+def claim_ready_events(
+    db: Session,
+    worker_id: str,
+    lease_seconds: int = 300,
+    limit: int = 10,
+    platforms: tuple = ("x",),
+    now: Optional[datetime] = None,
+) -> list[ScheduleEvent]:
+    """
+    حجز أحداث READY_TO_PUBLISH للنشر (نفس أسلوب claim_due_events).
+    lease_until في المستقبل يعني حدثاً محجوزاً أو مؤجلاً (إعادة محاولة / حد الحساب).
+    فقط auto_publish: الأحداث التي أصبحت جاهزة قبل تفعيل الناشر لا تُنشر مرة أخرى.
+    حساب لديه حدث محجوز قيد النشر (عند أي عامل) لا يُحجز له حدث آخر حتى ينتهي.
+    """
+    now_utc = now or datetime.utcnow()
+    inflight = aliased(ScheduleEvent)
+    account_busy = exists().where(
+        account_key_expr(inflight.username) == account_key_expr(ScheduleEvent.username),
+        inflight.status == "READY_TO_PUBLISH",
+        inflight.claimed_by.isnot(None),
+        inflight.lease_until >= now_utc,
+    )
+    claimable = and_(
+        ScheduleEvent.status == "READY_TO_PUBLISH",
+        ScheduleEvent.auto_publish.is_(True),
+        ScheduleEvent.platform.in_(platforms),
+        or_(ScheduleEvent.lease_until.is_(None), ScheduleEvent.lease_until < now_utc),
+        ~account_busy,
+    )
+    ready_ids = (
+        select(ScheduleEvent.id)
+        .where(claimable)
+        .order_by(ScheduleEvent.run_at)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        ready_ids = ready_ids.with_for_update(skip_locked=True)
+        # بدون القفل يرى عاملان نفس اللقطة ويحجزان حدثين لنفس الحساب معاً
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PUBLISH_CLAIM_LOCK})
+    stmt = (
+        update(ScheduleEvent)
+        .where(ScheduleEvent.id.in_(ready_ids.scalar_subquery()), claimable)
+        .values(claimed_by=worker_id, lease_until=now_utc + timedelta(seconds=lease_seconds))
+        .returning(ScheduleEvent)
+    )
+    events = db.scalars(stmt, execution_options={"synchronize_session": False}).all()
+    for event in events:
+        db.expunge(event)
+    db.commit()
+    return events
+
+
+def last_published(db: Session, accounts: set[str], since: datetime) -> dict[str, datetime]:
+    """آخر نشر (published_at) لكل حساب من accounts منذ since، من أي عامل"""
+    key = account_key_expr(ScheduleEvent.username)
+    rows = (
+        db.query(key, func.max(ScheduleEvent.published_at))
+        .filter(
+            ScheduleEvent.status == "PUBLISHED",
+            ScheduleEvent.published_at >= since,
+            key.in_(accounts),
+        )
+        .group_by(key)
+        .all()
+    )
+    return {account: published_at for account, published_at in rows}
+
+
+def release_events(db: Session, worker_id: str, event_ids: list[int], until: datetime):
+    """إرجاع أحداث محجوزة بدون محاولة (لا تُحجز قبل until)"""
+    if not event_ids:
+        return
+    db.execute(
+        update(ScheduleEvent)
+        .where(ScheduleEvent.id.in_(event_ids), ScheduleEvent.claimed_by == worker_id)
+        .values(claimed_by=None, lease_until=until),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+
+
+def renew_leases(db: Session, worker_id: str, event_ids: list[int], lease_seconds: int) -> int:
+    """
+    تمديد حجز أحداث قيد النشر لهذا العامل (حتى لا يحجزها عامل آخر أثناء النشر)
+
+    Returns:
+        عدد الأحداث التي ما زالت محجوزة لهذا العامل
+    """
+    if not event_ids:
+        return 0
+    result = db.execute(
+        update(ScheduleEvent)
+        .where(
+            ScheduleEvent.id.in_(event_ids),
+            ScheduleEvent.claimed_by == worker_id,
+            ScheduleEvent.status == "READY_TO_PUBLISH",
+        )
+        .values(lease_until=datetime.utcnow() + timedelta(seconds=lease_seconds)),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    return result.rowcount
+
+
+def record_publish_attempt(
+    db: Session,
+    worker_id: str,
+    event_id: int,
+    status: str,
+    post_url: Optional[str] = None,
+    error: Optional[str] = None,
+    retry_at: Optional[datetime] = None,
+) -> bool:
+    """
+    تسجيل نتيجة محاولة نشر لحدث محجوز لهذا العامل:
+    PUBLISHED / FAILED، أو READY_TO_PUBLISH مع retry_at لإعادة المحاولة لاحقاً.
+
+    Returns:
+        False إذا لم يعد الحدث محجوزاً لهذا العامل
+    """
+    now_utc = datetime.utcnow()
+    values = {
+        "status": status,
+        "attempts": ScheduleEvent.attempts + 1,
+        "last_error": error,
+        "lease_until": retry_at,
+        "updated_at": now_utc,
+    }
+    if status == "PUBLISHED":
+        values.update(published_at=now_utc, post_url=post_url)
+    if retry_at is not None:
+        values["claimed_by"] = None
+    result = db.execute(
+        update(ScheduleEvent)
+        .where(
+            ScheduleEvent.id == event_id,
+            ScheduleEvent.claimed_by == worker_id,
+            ScheduleEvent.status == "READY_TO_PUBLISH",
+        )
+        .values(**values),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
 def mark_ready_to_publish(db: Session, event: ScheduleEvent) -> ScheduleEvent:
     event.status = "READY_TO_PUBLISH"
     event.updated_at = datetime.utcnow()
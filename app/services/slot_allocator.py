@@ -0,0 +1,177 @@
+import bisect
+import logging
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import ScheduleEvent
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+# الحالات التي ما زالت تشغل وقتها (لم تُنشر بعد)
+PENDING_STATUSES = ("SCHEDULED", "READY_TO_PUBLISH")
+
+
+def account_key(username: str) -> str:
+    return (username or "").strip().lstrip("@").lower()
+
+
+def seconds_of(dt: datetime) -> float:
+    """ثواني منذ EPOCH لوقت UTC بدون tzinfo"""
+    return (dt - EPOCH).total_seconds()
+
+
+def minute_of(dt: datetime) -> int:
+    return int(seconds_of(dt) // 60)
+
+
+class SlotAllocator:
+    """
+    اختيار run_at داخل نافذة النية بحيث يتوزع الحمل بدل offset عشوائي:
+
+    - لا يتجاوز أي دقيقة max_per_minute حدث (لكل الحسابات)
+    - منشورات نفس الحساب تبعد account_spacing ثانية على الأقل
+    - من الدقائق المسموحة تُختار الأقل حملاً، ثم الأبعد عن منشورات الحساب، ثم عشوائياً
+
+    فهرس الإشغال في الذاكرة (عدد الأحداث لكل دقيقة + أوقات كل حساب) يُبنى من schedule_events
+    عند أول استخدام ويُعاد بناؤه كل reload_interval ثانية (أحداث عمليات أخرى).
+    إذا امتلأت النافذة يُجرب نفس النافذة في الأيام التالية (حتى max_days_ahead).
+    """
+
+    def __init__(
+        self,
+        account_spacing: int = 300,
+        max_per_minute: int = 10,
+        max_days_ahead: int = 7,
+        reload_interval: float = 300,
+    ):
+        self.account_spacing = account_spacing
+        self.max_per_minute = max(1, max_per_minute)
+        self.max_days_ahead = max_days_ahead
+        self.reload_interval = reload_interval
+        self._minutes: Dict[int, int] = {}
+        # الحساب → أوقات منشوراته مرتبة (ثواني منذ EPOCH)
+        self._accounts: Dict[str, List[float]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allocate(self, db: Session, username: str, start: datetime, end: datetime) -> datetime:
+        """
+        حجز وقت نشر (UTC) للحساب داخل [start, end) أو نفس النافذة في يوم لاحق.
+        إذا فشل حفظ الحدث يجب استدعاء release.
+        """
+        key = account_key(username)
+        with self._lock:
+            self._ensure_loaded(db)
+            for day in range(self.max_days_ahead + 1):
+                offset = timedelta(days=day)
+                run_at = self._best_slot(key, start + offset, end + offset)
+                if run_at is not None:
+                    break
+            else:
+                run_at = self._least_loaded(start, end)
+                logger.warning(
+                    f"No free slot for @{key} within {self.max_days_ahead} days — "
+                    f"using least loaded minute {run_at}"
+                )
+            self._reserve(key, run_at)
+            return run_at
+
+    def release(self, username: str, run_at: datetime):
+        """إلغاء حجز (الحدث لم يُحفظ)"""
+        key = account_key(username)
+        with self._lock:
+            minute = minute_of(run_at)
+            if self._minutes.get(minute):
+                self._minutes[minute] -= 1
+            times = self._accounts.get(key)
+            at = seconds_of(run_at)
+            if times and at in times:
+                times.remove(at)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "minutes": len(self._minutes),
+                "accounts": len(self._accounts),
+                "events": sum(self._minutes.values()),
+            }
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.reload_interval:
+            return
+        since = datetime.utcnow() - timedelta(seconds=self.account_spacing)
+        rows = (
+            db.query(ScheduleEvent.username, ScheduleEvent.run_at)
+            .filter(ScheduleEvent.status.in_(PENDING_STATUSES), ScheduleEvent.run_at >= since)
+            .all()
+        )
+        self._minutes = {}
+        self._accounts = {}
+        for username, run_at in rows:
+            self._reserve(account_key(username), run_at)
+        self._loaded_at = time.monotonic()
+
+    def _reserve(self, key: str, run_at: datetime):
+        minute = minute_of(run_at)
+        self._minutes[minute] = self._minutes.get(minute, 0) + 1
+        bisect.insort(self._accounts.setdefault(key, []), seconds_of(run_at))
+
+    def _gap(self, times: List[float], at: float) -> float:
+        """المسافة (ثواني) لأقرب منشور للحساب"""
+        i = bisect.bisect_left(times, at)
+        gap = math.inf
+        if i < len(times):
+            gap = times[i] - at
+        if i > 0:
+            gap = min(gap, at - times[i - 1])
+        return gap
+
+    def _best_slot(self, key: str, start: datetime, end: datetime) -> Optional[datetime]:
+        times = self._accounts.get(key, [])
+        first = math.ceil(seconds_of(start) / 60)
+        last = minute_of(end)
+        best: List[int] = []
+        best_score: Optional[Tuple[int, float]] = None
+        for minute in range(first, last):
+            count = self._minutes.get(minute, 0)
+            if count >= self.max_per_minute:
+                continue
+            gap = self._gap(times, minute * 60)
+            if gap < self.account_spacing:
+                continue
+            score = (count, -gap)
+            if best_score is None or score < best_score:
+                best, best_score = [minute], score
+            elif score == best_score:
+                best.append(minute)
+        if not best:
+            return None
+
+        at = random.choice(best) * 60
+        # ثانية عشوائية داخل الدقيقة إن بقيت المسافة كافية
+        jittered = at + random.randint(0, 59)
+        if jittered < seconds_of(end) and self._gap(times, jittered) >= self.account_spacing:
+            at = jittered
+        return EPOCH + timedelta(seconds=at)
+
+    def _least_loaded(self, start: datetime, end: datetime) -> datetime:
+        first, last = minute_of(start) + 1, max(minute_of(end), minute_of(start) + 2)
+        minute = min(range(first, last), key=lambda m: (self._minutes.get(m, 0), random.random()))
+        return EPOCH + timedelta(minutes=minute)
+
+
+# مثيل واحد لكل عملية
+slot_allocator = SlotAllocator(
+    account_spacing=settings.SCHEDULE_ACCOUNT_SPACING,
+    max_per_minute=settings.SCHEDULE_MAX_PER_MINUTE,
+    max_days_ahead=settings.SCHEDULE_MAX_DAYS_AHEAD,
+    reload_interval=settings.SCHEDULER_RECONCILE_INTERVAL,
+)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Arabic Text Normalization
+توحيد كتابة النص العربي قبل المطابقة والتخزين المؤقت
+"""
+
+# التشكيل (الحركات، التنوين، الشدة، السكون، الألف الخنجرية وعلامات المصحف) + التطويل
+_STRIPPED = (
+    [chr(c) for c in range(0x0610, 0x061B)]
+    + [chr(c) for c in range(0x064B, 0x0660)]
+    + ["ٰ", "ـ"]
+    + [chr(c) for c in range(0x06D6, 0x06EE)]
+)
+
+_TRANSLATION = str.maketrans({
+    **{ch: None for ch in _STRIPPED},
+    # أشكال الألف
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    # الألف المقصورة
+    "ى": "ي",
+    # التاء المربوطة
+    "ة": "ه",
+})
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    توحيد النص العربي:
+    - أ إ آ ٱ ← ا
+    - ى ← ي
+    - ة ← ه
+    - حذف التشكيل والتطويل (ـ)
+    - دمج المسافات المتتالية وحذف المسافات في البداية والنهاية
+
+    Args:
+        text: النص الأصلي
+
+    Returns:
+        النص بعد التوحيد (الأحرف اللاتينية لا تتغير)
+    """
+    if not text:
+        return ""
+    return " ".join(text.translate(_TRANSLATION).split())
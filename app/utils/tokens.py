@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Token Counting
+تقدير عدد التوكنز لرسائل المحادثة (لتقليم سجل المحادثة حسب ميزانية توكنز)
+
+يستخدم tiktoken إذا كان مثبتاً، وإلا تقديراً تقريبياً (حرف واحد ≈ ثلث توكن) —
+النص العربي يستهلك توكنز أكثر لكل حرف من الإنجليزي، فالتقدير يميل للأعلى عمداً.
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# تكلفة ثابتة لكل رسالة في chat.completions (role + فواصل)
+MESSAGE_OVERHEAD = 4
+CHARS_PER_TOKEN = 3
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    عدد التوكنز في نص
+
+    Args:
+        text: النص
+        model: اسم النموذج (لاختيار الترميز الصحيح في tiktoken)
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """أول max_tokens توكن من النص (مع … إذا قُص)"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is not None:
+        # توكن للـ …
+        head = encoding.decode(encoding.encode(text)[:max(max_tokens - 1, 0)])
+    else:
+        head = text[:max(max_tokens - 1, 0) * CHARS_PER_TOKEN]
+    return head.rstrip() + "…"
+
+
+def message_tokens(message: Dict[str, str], model: Optional[str] = None) -> int:
+    """عدد توكنز رسالة {"role", "content"} شاملاً التكلفة الثابتة"""
+    return count_tokens(message.get("content") or "", model) + MESSAGE_OVERHEAD
@@ -3,14 +3,16 @@ import io
 import json
 import os
 import tempfile
-import threading
 import time as _time
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
-from flask import Flask, flash, jsonify, redirect, render_template, request, session, url_for
+from flask import Flask, Response, flash, jsonify, redirect, render_template, request, session, stream_with_context, url_for
 
 from modules.auth import login_required, require_api_token
+from modules.bulk_login import recover_bulk_logins, start_bulk_login
 from modules.db import (
     delete_cookie,
     get_cookie_by_label,
@@ -26,16 +28,29 @@ from modules.db import (
     list_tweets,
     get_tweet,
     delete_tweet_from_db,
+    get_bulk_login_task,
 )
 from modules.utils import download_to_temp, is_url, safe_label, normalize_cookies
 from modules.x_login import TwitterLoginAdvanced
-from modules.x_post import post_to_x
 from modules.x_profile import update_profile_on_x
-from modules.x_actions import like_tweet, repost_tweet, reply_to_tweet, quote_tweet, share_copy_link, undo_repost_tweet, undo_like_tweet
-from modules.x_bookmark import bookmark_tweet, undo_bookmark_tweet
-from modules.x_follow import follow_user
-from modules.x_unfollow import unfollow_user
-from modules.x_delete import delete_tweet, delete_tweet_by_id
+from modules.x_actions import share_copy_link
+from modules.x_engine import (
+    post_to_x,
+    like_tweet,
+    undo_like_tweet,
+    repost_tweet,
+    undo_repost_tweet,
+    reply_to_tweet,
+    quote_tweet,
+    bookmark_tweet,
+    undo_bookmark_tweet,
+    follow_user,
+    unfollow_user,
+    delete_tweet,
+    delete_tweet_by_id,
+)
+from modules.browser_pool import pool_stats
+from modules.jobs import job_handler, job_stats, parse_job, start_job_workers, submit_job, wait_for_job
 
 load_dotenv()
 
@@ -71,10 +86,6 @@ ADMIN_USER = os.getenv('XSUITE_ADMIN_USER', 'admin')
 ADMIN_PASS = os.getenv('XSUITE_ADMIN_PASS', 'Mm112233@@')
 DEFAULT_HEADLESS = os.getenv('XSUITE_DEFAULT_HEADLESS', '0') == '1'
 
-# حالة المهام الجماعية لتسجيل الدخول
-bulk_login_tasks = {}
-bulk_task_counter = 0
-
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'change-me')
 
@@ -82,6 +93,8 @@ app.secret_key = os.getenv('SECRET_KEY', 'change-me')
 @app.before_request
 def _ensure_db():
     init_db()
+    start_job_workers()
+    recover_bulk_logins()
 
 
 # =====================
@@ -254,9 +267,7 @@ def login_page():
 @app.route('/x-login-bulk', methods=['POST'])
 @login_required
 def login_bulk_page():
-    """تسجيل دخول عدة حسابات عبر ملف CSV"""
-    global bulk_task_counter
-
+    """تسجيل دخول عدة حسابات عبر ملف CSV (بالتوازي — انظر modules/bulk_login.py)"""
     f = request.files.get('csv_file')
     if not f or not f.filename:
         flash('ارفع ملف CSV', 'error')
@@ -282,49 +293,7 @@ def login_bulk_page():
             flash('الملف فارغ أو لا يحتوي حسابات صالحة', 'error')
             return redirect(url_for('login_page'))
 
-        bulk_task_counter += 1
-        task_id = str(bulk_task_counter)
-        bulk_login_tasks[task_id] = {
-            "total": len(accounts),
-            "done": 0,
-            "success": 0,
-            "failed": 0,
-            "finished": False,
-            "results": []
-        }
-
-        def worker():
-            engine = TwitterLoginAdvanced()
-            for i, acc in enumerate(accounts):
-                username = acc["username"]
-                password = acc["password"]
-                label = safe_label(acc.get("label") or username)
-                try:
-                    cookie_path = engine.login_twitter(
-                        username=username, password=password,
-                        cookies_dir=str(COOKIES_DIR)
-                    )
-                    dst = COOKIES_DIR / f"{label}.json"
-                    if cookie_path != dst:
-                        try:
-                            Path(cookie_path).replace(dst)
-                        except Exception:
-                            pass
-                    upsert_cookie(label, dst.name)
-                    log_operation('login', label, 'success', f'تم حفظ الكوكيز: {dst.name}')
-                    bulk_login_tasks[task_id]["success"] += 1
-                    bulk_login_tasks[task_id]["results"].append({"username": username, "label": label, "success": True})
-                except Exception as e:
-                    log_operation('login', label, 'error', f'فشل تسجيل الدخول: {e}')
-                    bulk_login_tasks[task_id]["failed"] += 1
-                    bulk_login_tasks[task_id]["results"].append({"username": username, "label": label, "success": False, "error": str(e)})
-                bulk_login_tasks[task_id]["done"] += 1
-                if i < len(accounts) - 1:
-                    _time.sleep(5)
-            bulk_login_tasks[task_id]["finished"] = True
-
-        thread = threading.Thread(target=worker, daemon=True)
-        thread.start()
+        task_id = start_bulk_login(accounts, str(COOKIES_DIR))
 
         return jsonify({"success": True, "task_id": task_id, "total": len(accounts)})
 
@@ -333,16 +302,41 @@ def login_bulk_page():
         return redirect(url_for('login_page'))
 
 
-@app.route('/x-login-bulk-status/<task_id>')
+@app.route('/x-login-bulk-status/<int:task_id>')
 @login_required
 def login_bulk_status(task_id):
     """حالة مهمة تسجيل الدخول الجماعي"""
-    task = bulk_login_tasks.get(task_id)
+    task = get_bulk_login_task(task_id)
     if not task:
         return jsonify({"error": "Task not found"}), 404
     return jsonify(task)
 
 
+@app.route('/x-login-bulk-stream/<int:task_id>')
+@login_required
+def login_bulk_stream(task_id):
+    """بث حالة مهمة تسجيل الدخول الجماعي (Server-Sent Events) مع كل تغيير"""
+    def events():
+        version = None
+        while True:
+            task = get_bulk_login_task(task_id)
+            if not task:
+                yield 'event: error\ndata: {"error": "Task not found"}\n\n'
+                return
+            if task['version'] != version:
+                version = task['version']
+                yield f"data: {json.dumps(task, ensure_ascii=False)}\n\n"
+            if task['finished']:
+                return
+            _time.sleep(1)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @app.route('/post', methods=['GET', 'POST'])
 @login_required
 def post_page():
@@ -784,7 +778,13 @@ def api_docs():
 # =====================
 @app.route('/api/health', methods=['GET'])
 def api_health():
-    return jsonify({'status': 'healthy', 'service': 'X Suite', 'version': '1.0'}), 200
+    return jsonify({
+        'status': 'healthy',
+        'service': 'X Suite',
+        'version': '1.0',
+        'browser_pool': pool_stats(),
+        'jobs': job_stats(),
+    }), 200
 
 
 @app.route('/api/cookies', methods=['GET'])
@@ -855,6 +855,213 @@ def api_login():
         return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
 
 
+# =====================
+# Job Queue (API actions)
+# =====================
+# عمليات X في الـ API تُسجل كمهام في الطابور وتُرجع task_id فوراً (202)،
+# والنتيجة تُقرأ من GET /api/task/<id>. يمكن تمرير wait (ثواني) لانتظار النتيجة.
+JOB_MEDIA_DIR = BASE_DIR / 'instance' / 'job_media'
+API_MAX_WAIT = 600
+
+
+def _save_job_upload(file_storage):
+    """حفظ ملف مرفوع بجانب قاعدة البيانات ليقرأه العامل لاحقاً (يُحذف بعد التنفيذ)."""
+    if not (file_storage and file_storage.filename):
+        return None
+    JOB_MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+    path = JOB_MEDIA_DIR / f"{uuid.uuid4().hex}{Path(file_storage.filename).suffix}"
+    file_storage.save(str(path))
+    return str(path)
+
+
+def _job_storage_path(job) -> str:
+    storage_state_path = cookie_label_to_path(job['cookie_label'])
+    if not storage_state_path:
+        raise RuntimeError('cookie not found')
+    return storage_state_path
+
+
+@contextmanager
+def _job_media(progress, media_path=None, media_url=None):
+    """ملف مرفوع مسبقاً أو رابط يُنزّل داخل العامل. الملفات المؤقتة تُحذف بعد التنفيذ."""
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if not media_path and media_url and is_url(media_url):
+                progress('جاري تنزيل الميديا')
+                try:
+                    media_path = download_to_temp(media_url, tmp)
+                except Exception as e:
+                    raise RuntimeError(f'فشل تنزيل الميديا: {e}') from e
+            yield media_path
+        finally:
+            if media_path and Path(media_path).parent == JOB_MEDIA_DIR:
+                try:
+                    os.remove(media_path)
+                except OSError:
+                    pass
+
+
+def _queued_response(op_id: int, wait=None):
+    try:
+        wait = min(float(wait or request.args.get('wait') or 0), API_MAX_WAIT)
+    except (TypeError, ValueError):
+        wait = 0
+
+    if wait > 0:
+        op = wait_for_job(op_id, wait)
+        if op and op['status'] not in ('queued', 'running'):
+            task = parse_job(op)
+            ok = op['status'] == 'success'
+            body = {'success': ok, 'task_id': op_id, 'status': op['status']}
+            body.update(task['result'] or {})
+            body['message' if ok else 'error'] = op['message']
+            return jsonify(body), (200 if ok else 500)
+
+    return jsonify({
+        'success': True,
+        'task_id': op_id,
+        'status': 'queued',
+        'message': 'تمت جدولة العملية ⏳',
+        'status_url': url_for('api_task', task_id=op_id),
+    }), 202
+
+
+def _enqueue_tweet_action(action: str, message: str, default_wait_ms: int):
+    data = request.get_json(force=True, silent=True) or {}
+    cookie_label = (data.get('cookie_label') or '').strip()
+    tweet_url = (data.get('tweet_url') or '').strip()
+    headless = bool(data.get('headless', True))
+    wait_after_ms = int(data.get('wait_after_ms') or default_wait_ms)
+
+    if not cookie_label or not tweet_url:
+        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
+    if not get_cookie_by_label(cookie_label):
+        return jsonify({'success': False, 'error': 'cookie not found'}), 404
+
+    op_id = submit_job(
+        action, cookie_label,
+        {'tweet_url': tweet_url, 'headless': headless, 'wait_after_ms': wait_after_ms},
+        message, meta={'headless': headless, 'tweet_url': tweet_url},
+    )
+    return _queued_response(op_id, data.get('wait'))
+
+
+def _enqueue_user_action(action: str, message: str):
+    data = request.get_json(silent=True) or {}
+    cookie_label = (data.get('cookie_label') or '').strip()
+    profile_url = (data.get('profile_url') or '').strip()
+    headless = bool(data.get('headless', True))
+    wait_after_ms = int(data.get('wait_after_ms') or 3000)
+
+    if not cookie_label or not profile_url:
+        return jsonify({'success': False, 'error': 'cookie_label and profile_url required'}), 400
+    if not cookie_label_to_path(cookie_label):
+        return jsonify({'success': False, 'error': 'cookie not found'}), 404
+
+    op_id = submit_job(
+        action, cookie_label,
+        {'profile_url': profile_url, 'headless': headless, 'wait_after_ms': wait_after_ms},
+        message, meta={'target': profile_url},
+    )
+    return _queued_response(op_id, data.get('wait'))
+
+
+def _register_simple_action(action: str, fn, target_key: str, success: str, error_prefix: str):
+    @job_handler(action, error_prefix)
+    def _handler(job, payload, progress):
+        progress('جاري التنفيذ')
+        fn(
+            _job_storage_path(job),
+            payload[target_key],
+            headless=payload.get('headless', True),
+            wait_after_ms=payload.get('wait_after_ms', 2000),
+        )
+        return {'message': success}
+    return _handler
+
+
+for _action, _fn, _target, _success, _error in [
+    ('like', like_tweet, 'tweet_url', 'تمت محاولة الإعجاب ✅', 'فشل الإعجاب'),
+    ('undo_like', undo_like_tweet, 'tweet_url', 'تم التراجع عن الإعجاب ✅', 'فشل التراجع عن الإعجاب'),
+    ('repost', repost_tweet, 'tweet_url', 'تمت محاولة إعادة النشر ✅', 'فشل إعادة النشر'),
+    ('undo_repost', undo_repost_tweet, 'tweet_url', 'تم التراجع عن إعادة النشر ✅', 'فشل التراجع عن إعادة النشر'),
+    ('bookmark', bookmark_tweet, 'tweet_url', 'تمت محاولة البوك مارك ✅', 'فشل البوك مارك'),
+    ('undo_bookmark', undo_bookmark_tweet, 'tweet_url', 'تم التراجع عن البوك مارك ✅', 'فشل التراجع عن البوك مارك'),
+    ('share', share_copy_link, 'tweet_url', 'تمت محاولة المشاركة (نسخ الرابط) ✅', 'فشل المشاركة'),
+    ('follow', follow_user, 'profile_url', 'تمت المتابعة بنجاح ✅', 'فشل المتابعة'),
+    ('unfollow', unfollow_user, 'profile_url', 'تم إلغاء المتابعة بنجاح ✅', 'فشل إلغاء المتابعة'),
+]:
+    _register_simple_action(_action, _fn, _target, _success, _error)
+
+
+@job_handler('post', 'فشل النشر')
+def _job_post(job, payload, progress):
+    storage_state_path = _job_storage_path(job)
+    with _job_media(progress, payload.get('media_path'), payload.get('media_url')) as media_path:
+        progress('جاري النشر')
+        tweet_url = post_to_x(storage_state_path, payload['text'], media_path, headless=payload.get('headless', True))
+    if tweet_url:
+        save_tweet(job['cookie_label'], tweet_url, payload['text'])
+    return {'message': 'تمت محاولة النشر ✅', 'tweet_url': tweet_url}
+
+
+@job_handler('reply', 'فشل الرد')
+def _job_reply(job, payload, progress):
+    storage_state_path = _job_storage_path(job)
+    with _job_media(progress, payload.get('media_path'), payload.get('media_url')) as media_path:
+        progress('جاري الرد')
+        tweet_url = reply_to_tweet(
+            storage_state_path=storage_state_path, tweet_url=payload['tweet_url'], reply_text=payload['reply_text'],
+            headless=payload.get('headless', True), media_path=media_path, wait_after_ms=payload.get('wait_after_ms', 5000),
+        )
+    return {'message': 'تمت محاولة الرد ✅', 'tweet_url': tweet_url}
+
+
+@job_handler('quote', 'فشل الاقتباس')
+def _job_quote(job, payload, progress):
+    storage_state_path = _job_storage_path(job)
+    with _job_media(progress, payload.get('media_path'), payload.get('media_url')) as media_path:
+        progress('جاري الاقتباس')
+        tweet_url = quote_tweet(
+            storage_state_path=storage_state_path, tweet_url=payload['tweet_url'], text=payload['text'],
+            headless=payload.get('headless', True), media_path=media_path, wait_after_ms=payload.get('wait_after_ms', 5000),
+        )
+    return {'message': 'تمت محاولة الاقتباس ✅', 'tweet_url': tweet_url}
+
+
+@job_handler('profile', 'فشل تعديل البروفايل')
+def _job_profile(job, payload, progress):
+    storage_state_path = _job_storage_path(job)
+    with _job_media(progress, payload.get('avatar_path'), payload.get('avatar_url')) as avatar_path, \
+            _job_media(progress, payload.get('banner_path'), payload.get('banner_url')) as banner_path:
+        progress('جاري تعديل البروفايل')
+        update_profile_on_x(
+            storage_state_path=storage_state_path,
+            name=payload.get('name', ''),
+            bio=payload.get('bio', ''),
+            location=payload.get('location', ''),
+            website=payload.get('website', ''),
+            avatar_path=avatar_path,
+            banner_path=banner_path,
+            headless=payload.get('headless', True),
+        )
+    return {'message': 'تم تعديل البروفايل (أو تمت المحاولة) ✅'}
+
+
+@job_handler('delete_tweet', 'فشل حذف التغريدة')
+def _job_delete_tweet(job, payload, progress):
+    storage_state_path = _job_storage_path(job)
+    progress('جاري حذف التغريدة')
+    headless = payload.get('headless', True)
+    if payload.get('tweet_url'):
+        delete_tweet(storage_state_path, payload['tweet_url'], headless=headless)
+    else:
+        delete_tweet_by_id(storage_state_path, payload['tweet_id'], headless=headless)
+    if payload.get('db_tweet_id'):
+        delete_tweet_from_db(payload['db_tweet_id'])
+    return {'message': 'تم حذف التغريدة بنجاح ✅'}
+
+
 @app.route('/api/post', methods=['POST'])
 @require_api_token
 def api_post():
@@ -865,68 +1072,23 @@ def api_post():
         text = (data.get('text') or '').strip()
         headless = bool(data.get('headless', True))
         media_url = (data.get('media_url') or '').strip()
-        if not cookie_label or not text:
-            return jsonify({'success': False, 'error': 'cookie_label and text required'}), 400
-        c = get_cookie_by_label(cookie_label)
-        if not c:
-            return jsonify({'success': False, 'error': 'cookie not found'}), 404
-        storage_state_path = str(COOKIES_DIR / c['filename'])
-        op_id = log_operation('post', cookie_label, 'pending', 'بدأت عملية النشر', meta_json=json.dumps({'headless': headless}))
-        with tempfile.TemporaryDirectory() as tmp:
-            media_path = None
-            if media_url and is_url(media_url):
-                try:
-                    media_path = download_to_temp(media_url, tmp)
-                except Exception as e:
-                    log_operation('post', cookie_label, 'error', f'فشل تنزيل الميديا: {e}')
-                    return jsonify({'success': False, 'task_id': op_id, 'error': f'فشل تنزيل الميديا: {e}'}), 400
-            try:
-                tweet_url = post_to_x(storage_state_path, text, media_path, headless=headless)
-                log_operation('post', cookie_label, 'success', 'تمت محاولة النشر ✅', meta_json=json.dumps({'tweet_url': tweet_url}))
-                if tweet_url:
-                    save_tweet(cookie_label, tweet_url, text)
-                return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة النشر ✅', 'tweet_url': tweet_url}), 200
-            except Exception as e:
-                log_operation('post', cookie_label, 'error', f'فشل النشر: {e}')
-                return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
-
-    # multipart
-    cookie_label = (request.form.get('cookie_label') or '').strip()
-    text = (request.form.get('text') or '').strip()
-    headless = (request.form.get('headless') == '1')
-    media_url = (request.form.get('media_url') or '').strip()
-    media_file = request.files.get('media_file')
+        media_file = None
+    else:
+        data = request.form
+        cookie_label = (request.form.get('cookie_label') or '').strip()
+        text = (request.form.get('text') or '').strip()
+        headless = (request.form.get('headless') == '1')
+        media_url = (request.form.get('media_url') or '').strip()
+        media_file = request.files.get('media_file')
 
     if not cookie_label or not text:
         return jsonify({'success': False, 'error': 'cookie_label and text required'}), 400
-    c = get_cookie_by_label(cookie_label)
-    if not c:
+    if not get_cookie_by_label(cookie_label):
         return jsonify({'success': False, 'error': 'cookie not found'}), 404
-    storage_state_path = str(COOKIES_DIR / c['filename'])
 
-    op_id = log_operation('post', cookie_label, 'pending', 'بدأت عملية النشر', meta_json=json.dumps({'headless': headless}))
-
-    with tempfile.TemporaryDirectory() as tmp:
-        media_path = None
-        if media_file and media_file.filename:
-            media_path = os.path.join(tmp, media_file.filename)
-            media_file.save(media_path)
-        elif media_url and is_url(media_url):
-            try:
-                media_path = download_to_temp(media_url, tmp)
-            except Exception as e:
-                log_operation('post', cookie_label, 'error', f'فشل تنزيل الميديا: {e}')
-                return jsonify({'success': False, 'task_id': op_id, 'error': f'فشل تنزيل الميديا: {e}'}), 400
-
-        try:
-            tweet_url = post_to_x(storage_state_path, text, media_path, headless=headless)
-            log_operation('post', cookie_label, 'success', 'تمت محاولة النشر ✅', meta_json=json.dumps({'tweet_url': tweet_url}))
-            if tweet_url:
-                save_tweet(cookie_label, tweet_url, text)
-            return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة النشر ✅', 'tweet_url': tweet_url}), 200
-        except Exception as e:
-            log_operation('post', cookie_label, 'error', f'فشل النشر: {e}')
-            return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    payload = {'text': text, 'headless': headless, 'media_url': media_url, 'media_path': _save_job_upload(media_file)}
+    op_id = submit_job('post', cookie_label, payload, 'بدأت عملية النشر', meta={'headless': headless})
+    return _queued_response(op_id, data.get('wait'))
 
 
 @app.route('/api/profile/update', methods=['POST'])
@@ -935,199 +1097,56 @@ def api_profile_update():
     # يدعم multipart (files/form) أو JSON
     if request.is_json:
         data = request.get_json(force=True, silent=True) or {}
-        cookie_label = (data.get('cookie_label') or '').strip()
-        name = (data.get('name') or '').strip()
-        bio = (data.get('bio') or '').strip()
-        location = (data.get('location') or '').strip()
-        website = (data.get('website') or '').strip()
         headless = bool(data.get('headless', True))
-        avatar_url = (data.get('avatar_url') or '').strip()
-        banner_url = (data.get('banner_url') or '').strip()
         avatar_file = None
         banner_file = None
     else:
-        cookie_label = (request.form.get('cookie_label') or '').strip()
-        name = (request.form.get('name') or '').strip()
-        bio = (request.form.get('bio') or '').strip()
-        location = (request.form.get('location') or '').strip()
-        website = (request.form.get('website') or '').strip()
+        data = request.form
         headless = (request.form.get('headless') == '1')
-        avatar_url = (request.form.get('avatar_url') or '').strip()
-        banner_url = (request.form.get('banner_url') or '').strip()
         avatar_file = request.files.get('avatar_file')
         banner_file = request.files.get('banner_file')
-    c = get_cookie_by_label(cookie_label)
-    if not c:
+    cookie_label = (data.get('cookie_label') or '').strip()
+    if not get_cookie_by_label(cookie_label):
         return jsonify({'success': False, 'error': 'cookie not found'}), 404
 
-    # (تم تعريف الحقول أعلاه حسب نوع الطلب)
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('profile', cookie_label, 'pending', 'بدأت عملية تعديل البروفايل', meta_json=json.dumps({'headless': headless}))
-
-    with tempfile.TemporaryDirectory() as tmp:
-        avatar_path = None
-        banner_path = None
-        try:
-            if avatar_file and avatar_file.filename:
-                avatar_path = os.path.join(tmp, avatar_file.filename)
-                avatar_file.save(avatar_path)
-            elif avatar_url and is_url(avatar_url):
-                avatar_path = download_to_temp(avatar_url, tmp)
-
-            if banner_file and banner_file.filename:
-                banner_path = os.path.join(tmp, banner_file.filename)
-                banner_file.save(banner_path)
-            elif banner_url and is_url(banner_url):
-                banner_path = download_to_temp(banner_url, tmp)
-
-            update_profile_on_x(
-                storage_state_path=storage_state_path,
-                name=name,
-                bio=bio,
-                location=location,
-                website=website,
-                avatar_path=avatar_path,
-                banner_path=banner_path,
-                headless=headless,
-            )
-            log_operation('profile', cookie_label, 'success', 'تم تعديل البروفايل (أو تمت المحاولة) ✅')
-            return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة تعديل البروفايل ✅'}), 200
-        except Exception as e:
-            log_operation('profile', cookie_label, 'error', f'فشل تعديل البروفايل: {e}')
-            return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    payload = {key: (data.get(key) or '').strip() for key in ('name', 'bio', 'location', 'website', 'avatar_url', 'banner_url')}
+    payload.update(
+        headless=headless,
+        avatar_path=_save_job_upload(avatar_file),
+        banner_path=_save_job_upload(banner_file),
+    )
+    op_id = submit_job('profile', cookie_label, payload, 'بدأت عملية تعديل البروفايل', meta={'headless': headless})
+    return _queued_response(op_id, data.get('wait'))
 
 
 @app.route('/api/repost', methods=['POST'])
 @require_api_token
 def api_repost():
-    data = request.get_json(force=True, silent=True) or {}
-    cookie_label = (data.get('cookie_label') or '').strip()
-    tweet_url = (data.get('tweet_url') or '').strip()
-    headless = bool(data.get('headless', True))
-    wait_after_ms = int(data.get('wait_after_ms') or 5000)
-
-    if not cookie_label or not tweet_url:
-        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
-
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('repost', cookie_label, 'pending', 'بدأت عملية إعادة النشر', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        repost_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, headless=headless, wait_after_ms=wait_after_ms)
-        log_operation('repost', cookie_label, 'success', 'تمت محاولة إعادة النشر ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة إعادة النشر ✅'}), 200
-    except Exception as e:
-        log_operation('repost', cookie_label, 'error', f'فشل إعادة النشر: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    return _enqueue_tweet_action('repost', 'بدأت عملية إعادة النشر', default_wait_ms=5000)
 
 
 @app.route('/api/like', methods=['POST'])
 @require_api_token
 def api_like():
-    data = request.get_json(force=True, silent=True) or {}
-    cookie_label = (data.get('cookie_label') or '').strip()
-    tweet_url = (data.get('tweet_url') or '').strip()
-    headless = bool(data.get('headless', True))
-    wait_after_ms = int(data.get('wait_after_ms') or 2000)
-
-    if not cookie_label or not tweet_url:
-        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
-
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('like', cookie_label, 'pending', 'بدأت عملية الإعجاب', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        like_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, headless=headless, wait_after_ms=wait_after_ms)
-        log_operation('like', cookie_label, 'success', 'تمت محاولة الإعجاب ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة الإعجاب ✅'}), 200
-    except Exception as e:
-        log_operation('like', cookie_label, 'error', f'فشل الإعجاب: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    return _enqueue_tweet_action('like', 'بدأت عملية الإعجاب', default_wait_ms=2000)
 
 
 @app.route('/api/undo-repost', methods=['POST'])
 @require_api_token
 def api_undo_repost():
-    data = request.get_json(force=True, silent=True) or {}
-    cookie_label = (data.get('cookie_label') or '').strip()
-    tweet_url = (data.get('tweet_url') or '').strip()
-    headless = bool(data.get('headless', True))
-
-    if not cookie_label or not tweet_url:
-        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
-
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('undo_repost', cookie_label, 'pending', 'بدأت عملية التراجع عن إعادة النشر', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        undo_repost_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, headless=headless, wait_after_ms=2000)
-        log_operation('undo_repost', cookie_label, 'success', 'تم التراجع عن إعادة النشر ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تم التراجع عن إعادة النشر ✅'}), 200
-    except Exception as e:
-        log_operation('undo_repost', cookie_label, 'error', f'فشل التراجع عن إعادة النشر: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    return _enqueue_tweet_action('undo_repost', 'بدأت عملية التراجع عن إعادة النشر', default_wait_ms=2000)
 
 
 @app.route('/api/undo-like', methods=['POST'])
 @require_api_token
 def api_undo_like():
-    data = request.get_json(force=True, silent=True) or {}
-    cookie_label = (data.get('cookie_label') or '').strip()
-    tweet_url = (data.get('tweet_url') or '').strip()
-    headless = bool(data.get('headless', True))
-
-    if not cookie_label or not tweet_url:
-        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
-
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('undo_like', cookie_label, 'pending', 'بدأت عملية التراجع عن الإعجاب', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        undo_like_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, headless=headless, wait_after_ms=2000)
-        log_operation('undo_like', cookie_label, 'success', 'تم التراجع عن الإعجاب ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تم التراجع عن الإعجاب ✅'}), 200
-    except Exception as e:
-        log_operation('undo_like', cookie_label, 'error', f'فشل التراجع عن الإعجاب: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    return _enqueue_tweet_action('undo_like', 'بدأت عملية التراجع عن الإعجاب', default_wait_ms=2000)
 
 
 @app.route('/api/undo-bookmark', methods=['POST'])
 @require_api_token
 def api_undo_bookmark():
-    data = request.get_json(force=True, silent=True) or {}
-    cookie_label = (data.get('cookie_label') or '').strip()
-    tweet_url = (data.get('tweet_url') or '').strip()
-    headless = bool(data.get('headless', True))
-
-    if not cookie_label or not tweet_url:
-        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
-
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('undo_bookmark', cookie_label, 'pending', 'بدأت عملية التراجع عن البوك مارك', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        undo_bookmark_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, headless=headless, wait_after_ms=2000)
-        log_operation('undo_bookmark', cookie_label, 'success', 'تم التراجع عن البوك مارك ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تم التراجع عن البوك مارك ✅'}), 200
-    except Exception as e:
-        log_operation('undo_bookmark', cookie_label, 'error', f'فشل التراجع عن البوك مارك: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    return _enqueue_tweet_action('undo_bookmark', 'بدأت عملية التراجع عن البوك مارك', default_wait_ms=2000)
 
 
 @app.route('/api/reply', methods=['POST'])
@@ -1136,99 +1155,35 @@ def api_reply():
     # supports JSON or multipart
     if request.content_type and 'application/json' in request.content_type:
         data = request.get_json(force=True, silent=True) or {}
-        cookie_label = (data.get('cookie_label') or '').strip()
-        tweet_url = (data.get('tweet_url') or '').strip()
-        reply_text = (data.get('reply_text') or '').strip()
         headless = bool(data.get('headless', True))
-        media_url = (data.get('media_url') or '').strip()
-        wait_after_ms = int(data.get('wait_after_ms', 5000) or 5000)
-
-        if not cookie_label or not tweet_url or not reply_text:
-            return jsonify({'success': False, 'error': 'cookie_label, tweet_url and reply_text required'}), 400
-        c = get_cookie_by_label(cookie_label)
-        if not c:
-            return jsonify({'success': False, 'error': 'cookie not found'}), 404
-        storage_state_path = str(COOKIES_DIR / c['filename'])
-
-        op_id = log_operation('reply', cookie_label, 'pending', 'بدأت عملية الرد', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-        with tempfile.TemporaryDirectory() as tmp:
-            media_path = None
-            if media_url and is_url(media_url):
-                try:
-                    media_path = download_to_temp(media_url, tmp)
-                except Exception as e:
-                    log_operation('reply', cookie_label, 'error', f'فشل تنزيل الميديا: {e}')
-                    return jsonify({'success': False, 'task_id': op_id, 'error': f'فشل تنزيل الميديا: {e}'}), 400
-            try:
-                reply_to_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, reply_text=reply_text, headless=headless, media_path=media_path, wait_after_ms=wait_after_ms)
-                log_operation('reply', cookie_label, 'success', 'تمت محاولة الرد ✅')
-                return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة الرد ✅'}), 200
-            except Exception as e:
-                log_operation('reply', cookie_label, 'error', f'فشل الرد: {e}')
-                return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
-
-    # multipart
-    cookie_label = (request.form.get('cookie_label') or '').strip()
-    tweet_url = (request.form.get('tweet_url') or '').strip()
-    reply_text = (request.form.get('reply_text') or '').strip()
-    headless = (request.form.get('headless') == '1')
-    media_url = (request.form.get('media_url') or '').strip()
-    media_file = request.files.get('media_file')
-    wait_after_ms = int(request.form.get('wait_after_ms') or 5000)
+        media_file = None
+    else:
+        data = request.form
+        headless = (request.form.get('headless') == '1')
+        media_file = request.files.get('media_file')
+    cookie_label = (data.get('cookie_label') or '').strip()
+    tweet_url = (data.get('tweet_url') or '').strip()
+    reply_text = (data.get('reply_text') or '').strip()
+    media_url = (data.get('media_url') or '').strip()
+    wait_after_ms = int(data.get('wait_after_ms') or 5000)
 
     if not cookie_label or not tweet_url or not reply_text:
         return jsonify({'success': False, 'error': 'cookie_label, tweet_url and reply_text required'}), 400
-    c = get_cookie_by_label(cookie_label)
-    if not c:
+    if not get_cookie_by_label(cookie_label):
         return jsonify({'success': False, 'error': 'cookie not found'}), 404
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-
-    op_id = log_operation('reply', cookie_label, 'pending', 'بدأت عملية الرد', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
 
-    with tempfile.TemporaryDirectory() as tmp:
-        media_path = None
-        if media_file and media_file.filename:
-            media_path = os.path.join(tmp, media_file.filename)
-            media_file.save(media_path)
-        elif media_url and is_url(media_url):
-            try:
-                media_path = download_to_temp(media_url, tmp)
-            except Exception as e:
-                log_operation('reply', cookie_label, 'error', f'فشل تنزيل الميديا: {e}')
-                return jsonify({'success': False, 'task_id': op_id, 'error': f'فشل تنزيل الميديا: {e}'}), 400
+    payload = {
+        'tweet_url': tweet_url, 'reply_text': reply_text, 'headless': headless, 'wait_after_ms': wait_after_ms,
+        'media_url': media_url, 'media_path': _save_job_upload(media_file),
+    }
+    op_id = submit_job('reply', cookie_label, payload, 'بدأت عملية الرد', meta={'headless': headless, 'tweet_url': tweet_url})
+    return _queued_response(op_id, data.get('wait'))
 
-        try:
-            reply_to_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, reply_text=reply_text, headless=headless, media_path=media_path, wait_after_ms=wait_after_ms)
-            log_operation('reply', cookie_label, 'success', 'تمت محاولة الرد ✅')
-            return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة الرد ✅'}), 200
-        except Exception as e:
-            log_operation('reply', cookie_label, 'error', f'فشل الرد: {e}')
-            return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
 
 @app.route('/api/bookmark', methods=['POST'])
 @require_api_token
 def api_bookmark():
-    data = request.get_json(force=True, silent=True) or {}
-    cookie_label = (data.get('cookie_label') or '').strip()
-    tweet_url = (data.get('tweet_url') or '').strip()
-    headless = bool(data.get('headless', True))
-    wait_after_ms = int(data.get('wait_after_ms', 2000) or 2000)
-
-    if not cookie_label or not tweet_url:
-        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('bookmark', cookie_label, 'pending', 'بدأت عملية البوك مارك', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        bookmark_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, headless=headless, wait_after_ms=wait_after_ms)
-        log_operation('bookmark', cookie_label, 'success', 'تمت محاولة البوك مارك ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة البوك مارك ✅'}), 200
-    except Exception as e:
-        log_operation('bookmark', cookie_label, 'error', f'فشل البوك مارك: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    return _enqueue_tweet_action('bookmark', 'بدأت عملية البوك مارك', default_wait_ms=2000)
 
 
 @app.route('/api/quote', methods=['POST'])
@@ -1237,115 +1192,35 @@ def api_quote():
     # supports JSON or multipart
     if request.content_type and 'application/json' in request.content_type:
         data = request.get_json(force=True, silent=True) or {}
-        cookie_label = (data.get('cookie_label') or '').strip()
-        tweet_url = (data.get('tweet_url') or '').strip()
-        text = (data.get('text') or '').strip()
         headless = bool(data.get('headless', True))
-        media_url = (data.get('media_url') or '').strip()
-        wait_after_ms = int(data.get('wait_after_ms', 5000) or 5000)
-
-        if not cookie_label or not tweet_url or not text:
-            return jsonify({'success': False, 'error': 'cookie_label, tweet_url and text required'}), 400
-        c = get_cookie_by_label(cookie_label)
-        if not c:
-            return jsonify({'success': False, 'error': 'cookie not found'}), 404
-        storage_state_path = str(COOKIES_DIR / c['filename'])
-
-        op_id = log_operation('quote', cookie_label, 'pending', 'بدأت عملية الاقتباس', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-        with tempfile.TemporaryDirectory() as tmp:
-            media_path = None
-            if media_url and is_url(media_url):
-                try:
-                    media_path = download_to_temp(media_url, tmp)
-                except Exception as e:
-                    log_operation('quote', cookie_label, 'error', f'فشل تنزيل الميديا: {e}')
-                    return jsonify({'success': False, 'task_id': op_id, 'error': f'فشل تنزيل الميديا: {e}'}), 400
-            try:
-                quote_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, text=text, headless=headless, media_path=media_path, wait_after_ms=wait_after_ms)
-                log_operation('quote', cookie_label, 'success', 'تمت محاولة الاقتباس ✅')
-                return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة الاقتباس ✅'}), 200
-            except Exception as e:
-                log_operation('quote', cookie_label, 'error', f'فشل الاقتباس: {e}')
-                return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
-
-    # multipart
-    cookie_label = (request.form.get('cookie_label') or '').strip()
-    tweet_url = (request.form.get('tweet_url') or '').strip()
-    text = (request.form.get('text') or '').strip()
-    headless = (request.form.get('headless') == '1')
-    media_url = (request.form.get('media_url') or '').strip()
-    media_file = request.files.get('media_file')
-    wait_after_ms = int(request.form.get('wait_after_ms') or 5000)
+        media_file = None
+    else:
+        data = request.form
+        headless = (request.form.get('headless') == '1')
+        media_file = request.files.get('media_file')
+    cookie_label = (data.get('cookie_label') or '').strip()
+    tweet_url = (data.get('tweet_url') or '').strip()
+    text = (data.get('text') or '').strip()
+    media_url = (data.get('media_url') or '').strip()
+    wait_after_ms = int(data.get('wait_after_ms') or 5000)
 
     if not cookie_label or not tweet_url or not text:
         return jsonify({'success': False, 'error': 'cookie_label, tweet_url and text required'}), 400
-    c = get_cookie_by_label(cookie_label)
-    if not c:
+    if not get_cookie_by_label(cookie_label):
         return jsonify({'success': False, 'error': 'cookie not found'}), 404
-    storage_state_path = str(COOKIES_DIR / c['filename'])
 
-    op_id = log_operation('quote', cookie_label, 'pending', 'بدأت عملية الاقتباس', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    with tempfile.TemporaryDirectory() as tmp:
-        media_path = None
-        if media_file and media_file.filename:
-            media_path = os.path.join(tmp, media_file.filename)
-            media_file.save(media_path)
-        elif media_url and is_url(media_url):
-            try:
-                media_path = download_to_temp(media_url, tmp)
-            except Exception as e:
-                log_operation('quote', cookie_label, 'error', f'فشل تنزيل الميديا: {e}')
-                return jsonify({'success': False, 'task_id': op_id, 'error': f'فشل تنزيل الميديا: {e}'}), 400
-        try:
-            quote_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, text=text, headless=headless, media_path=media_path, wait_after_ms=wait_after_ms)
-            log_operation('quote', cookie_label, 'success', 'تمت محاولة الاقتباس ✅')
-            return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة الاقتباس ✅'}), 200
-        except Exception as e:
-            log_operation('quote', cookie_label, 'error', f'فشل الاقتباس: {e}')
-            return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    payload = {
+        'tweet_url': tweet_url, 'text': text, 'headless': headless, 'wait_after_ms': wait_after_ms,
+        'media_url': media_url, 'media_path': _save_job_upload(media_file),
+    }
+    op_id = submit_job('quote', cookie_label, payload, 'بدأت عملية الاقتباس', meta={'headless': headless, 'tweet_url': tweet_url})
+    return _queued_response(op_id, data.get('wait'))
 
 
 @app.route('/api/share', methods=['POST'])
 @require_api_token
 def api_share():
-    data = request.get_json(force=True, silent=True) or {}
-    cookie_label = (data.get('cookie_label') or '').strip()
-    tweet_url = (data.get('tweet_url') or '').strip()
-    headless = bool(data.get('headless', True))
-    wait_after_ms = int(data.get('wait_after_ms', 2000) or 2000)
-
-    if not cookie_label or not tweet_url:
-        return jsonify({'success': False, 'error': 'cookie_label and tweet_url required'}), 400
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('share', cookie_label, 'pending', 'بدأت عملية المشاركة', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        share_copy_link(storage_state_path=storage_state_path, tweet_url=tweet_url, headless=headless, wait_after_ms=wait_after_ms)
-        log_operation('share', cookie_label, 'success', 'تمت محاولة المشاركة (نسخ الرابط) ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة المشاركة (نسخ الرابط) ✅'}), 200
-    except Exception as e:
-        log_operation('share', cookie_label, 'error', f'فشل المشاركة: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
-
-    if not cookie_label or not tweet_url or not reply_text:
-        return jsonify({'success': False, 'error': 'cookie_label, tweet_url, reply_text required'}), 400
-
-    c = get_cookie_by_label(cookie_label)
-    if not c:
-        return jsonify({'success': False, 'error': 'cookie not found'}), 404
-
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('reply', cookie_label, 'pending', 'بدأت عملية الرد', meta_json=json.dumps({'headless': headless, 'tweet_url': tweet_url}))
-    try:
-        reply_to_tweet(storage_state_path=storage_state_path, tweet_url=tweet_url, reply_text=reply_text, headless=headless, wait_after_ms=wait_after_ms)
-        log_operation('reply', cookie_label, 'success', 'تمت محاولة الرد ✅')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تمت محاولة الرد ✅'}), 200
-    except Exception as e:
-        log_operation('reply', cookie_label, 'error', f'فشل الرد: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    return _enqueue_tweet_action('share', 'بدأت عملية المشاركة', default_wait_ms=2000)
 
 
 @app.route('/api/stats', methods=['GET'])
@@ -1368,7 +1243,10 @@ def api_task(task_id: int):
     op = get_operation(task_id)
     if not op:
         return jsonify({'success': False, 'error': 'not found'}), 404
-    return jsonify({'success': True, 'task': op}), 200
+    task = parse_job(op)
+    task.pop('payload', None)
+    task.pop('payload_json', None)
+    return jsonify({'success': True, 'task': task}), 200
 
 
 
@@ -1441,53 +1319,13 @@ def unfollow_page_post():
 @app.post("/api/follow")
 @require_api_token
 def api_follow():
-
-    payload = request.get_json(silent=True) or {}
-    cookie_label = (payload.get("cookie_label") or "").strip()
-    profile_url = (payload.get("profile_url") or "").strip()
-    headless = bool(payload.get("headless", True))
-    wait_after_ms = int(payload.get("wait_after_ms") or 3000)
-
-    if not cookie_label or not profile_url:
-        return jsonify({"success": False, "error": "cookie_label and profile_url required"}), 400
-
-    cookie_path = cookie_label_to_path(cookie_label)
-    if not cookie_path:
-        return jsonify({"success": False, "error": "cookie not found"}), 404
-
-    try:
-        follow_user(cookie_path, profile_url, headless=headless, wait_after_ms=wait_after_ms)
-        db_log_action(cookie_label, "follow", profile_url, True, "")
-        return jsonify({"success": True})
-    except Exception as e:
-        db_log_action(cookie_label, "follow", profile_url, False, str(e))
-        return jsonify({"success": False, "error": str(e)}), 500
+    return _enqueue_user_action("follow", "بدأت عملية المتابعة")
 
 
 @app.post("/api/unfollow")
 @require_api_token
 def api_unfollow():
-
-    payload = request.get_json(silent=True) or {}
-    cookie_label = (payload.get("cookie_label") or "").strip()
-    profile_url = (payload.get("profile_url") or "").strip()
-    headless = bool(payload.get("headless", True))
-    wait_after_ms = int(payload.get("wait_after_ms") or 3000)
-
-    if not cookie_label or not profile_url:
-        return jsonify({"success": False, "error": "cookie_label and profile_url required"}), 400
-
-    cookie_path = cookie_label_to_path(cookie_label)
-    if not cookie_path:
-        return jsonify({"success": False, "error": "cookie not found"}), 404
-
-    try:
-        unfollow_user(cookie_path, profile_url, headless=headless, wait_after_ms=wait_after_ms)
-        db_log_action(cookie_label, "unfollow", profile_url, True, "")
-        return jsonify({"success": True})
-    except Exception as e:
-        db_log_action(cookie_label, "unfollow", profile_url, False, str(e))
-        return jsonify({"success": False, "error": str(e)}), 500
+    return _enqueue_user_action("unfollow", "بدأت عملية إلغاء المتابعة")
 
 
 # =====================
@@ -1603,17 +1441,12 @@ def api_tweet_delete(tweet_id: int):
     if not c:
         return jsonify({'success': False, 'error': 'cookie not found'}), 404
     
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('delete_tweet', cookie_label, 'pending', f'بدأت عملية حذف التغريدة: {tweet_url}')
-    
-    try:
-        delete_tweet(storage_state_path, tweet_url, headless=headless)
-        delete_tweet_from_db(tweet_id)
-        log_operation('delete_tweet', cookie_label, 'success', f'تم حذف التغريدة: {tweet_url}')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تم حذف التغريدة بنجاح ✅'}), 200
-    except Exception as e:
-        log_operation('delete_tweet', cookie_label, 'error', f'فشل حذف التغريدة: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    op_id = submit_job(
+        'delete_tweet', cookie_label,
+        {'tweet_url': tweet_url, 'db_tweet_id': tweet_id, 'headless': headless},
+        f'بدأت عملية حذف التغريدة: {tweet_url}', meta={'tweet_url': tweet_url},
+    )
+    return _queued_response(op_id, data.get('wait'))
 
 
 @app.route('/api/delete-tweet', methods=['POST'])
@@ -1631,16 +1464,12 @@ def api_delete_tweet_by_id():
     if not c:
         return jsonify({'success': False, 'error': 'cookie not found'}), 404
     
-    storage_state_path = str(COOKIES_DIR / c['filename'])
-    op_id = log_operation('delete_tweet', cookie_label, 'pending', f'بدأت عملية حذف التغريدة: {tweet_id}')
-    
-    try:
-        delete_tweet_by_id(storage_state_path, tweet_id, headless=headless)
-        log_operation('delete_tweet', cookie_label, 'success', f'تم حذف التغريدة: {tweet_id}')
-        return jsonify({'success': True, 'task_id': op_id, 'message': 'تم حذف التغريدة بنجاح ✅'}), 200
-    except Exception as e:
-        log_operation('delete_tweet', cookie_label, 'error', f'فشل حذف التغريدة: {e}')
-        return jsonify({'success': False, 'task_id': op_id, 'error': str(e)}), 500
+    op_id = submit_job(
+        'delete_tweet', cookie_label,
+        {'tweet_id': tweet_id, 'headless': headless},
+        f'بدأت عملية حذف التغريدة: {tweet_id}', meta={'tweet_id': tweet_id},
+    )
+    return _queued_response(op_id, data.get('wait'))
 
 
 if __name__ == '__main__':
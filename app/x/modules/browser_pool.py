@@ -0,0 +1,647 @@
+"""
+مجمع متصفحات Playwright دائم (Browser Pool)
+
+بدل تشغيل Chromium جديد مع كل عملية (like / repost / post ...)، نحتفظ بعدد
+ثابت من المتصفحات الدافئة ونفتح لكل عملية BrowserContext خاص بالحساب
+من ملف storage_state الخاص به.
+
+كل متصفح يحتفظ بذاكرة LRU من الـ contexts الدافئة (مسجلة الدخول ومحمّلة
+ملفات x.com مسبقاً) مفتاحها اسم ملف الكوكيز (label). عمليات نفس الحساب
+تُوجَّه دائماً لنفس المتصفح حتى تعيد استخدام نفس الصفحة، وعند إخراج الـ
+context من الذاكرة (خمول / تجاوز الحجم أو الميزانية) تُكتب الكوكيز المحدّثة
+في ملف storage_state.
+
+ملاحظة: Playwright sync API مرتبط بالخيط الذي أنشأه، لذلك كل متصفح يعيش
+داخل خيط عامل خاص به، والعمليات تُرسل إليه كدالة تستقبل page وتُرجع النتيجة.
+
+مهلة العملية (XSUITE_BROWSER_JOB_TIMEOUT) تُفرض داخل المجمع نفسه:
+- عملية لم تبدأ قبل انتهاء المهلة لا تُنفذ، وكل استدعاء Playwright مقيد بالوقت
+  المتبقي (page.set_default_timeout).
+- عند انتهاء المهلة يُغلق الـ context الخاص بالعملية فيفشل استدعاء Playwright الجاري.
+  لا يوجد API عام لذلك من خيط آخر، فنستخدم حلقة asyncio الداخلية للـ context
+  فقط مع Playwright 1.x (النسخة المثبتة في requirements).
+- إذا لم يتوفر ذلك أو لم تنتهِ العملية خلال ABORT_GRACE_S/3، يُستبدل العامل بعامل
+  جديد (متصفح جديد) وتنتقل إليه العمليات المنتظرة، والعامل العالق ينتهي ويغلق
+  متصفحه بعد أن تنتهي عمليته.
+
+الإعدادات (متغيرات بيئة):
+    XSUITE_BROWSER_POOL_SIZE         عدد المتصفحات الدافئة = أقصى عدد عمليات متزامنة (افتراضي 2)
+    XSUITE_BROWSER_MAX_USES          إعادة تشغيل المتصفح بعد هذا العدد من العمليات (افتراضي 50)
+    XSUITE_BROWSER_MAX_PENDING       أقصى عدد عمليات في الانتظار قبل الرفض (افتراضي 32)
+    XSUITE_BROWSER_HEALTH_INTERVAL   فحص صحة المتصفح الخامل كل N ثانية (افتراضي 30)
+    XSUITE_BROWSER_JOB_TIMEOUT       أقصى انتظار لنتيجة العملية بالثواني (افتراضي 600)
+    XSUITE_CONTEXT_CACHE_SIZE        أقصى عدد contexts دافئة لكل متصفح (افتراضي 8، 0 = تعطيل)
+    XSUITE_CONTEXT_IDLE_TTL          إخراج الـ context بعد N ثانية خمول (افتراضي 600)
+    XSUITE_CONTEXT_MEMORY_MB         ميزانية الذاكرة لكل الـ contexts الدافئة في المجمع (افتراضي 1024)
+"""
+import asyncio
+import atexit
+import importlib.metadata
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from playwright.sync_api import Page, sync_playwright
+
+
+DEFAULT_TIMEOUT = 30_000
+
+POOL_SIZE = max(1, int(os.getenv("XSUITE_BROWSER_POOL_SIZE", "2")))
+MAX_USES = max(1, int(os.getenv("XSUITE_BROWSER_MAX_USES", "50")))
+MAX_PENDING = max(1, int(os.getenv("XSUITE_BROWSER_MAX_PENDING", "32")))
+HEALTH_INTERVAL_S = float(os.getenv("XSUITE_BROWSER_HEALTH_INTERVAL", "30"))
+JOB_TIMEOUT_S = float(os.getenv("XSUITE_BROWSER_JOB_TIMEOUT", "600"))
+
+CONTEXT_CACHE_SIZE = max(0, int(os.getenv("XSUITE_CONTEXT_CACHE_SIZE", "8")))
+CONTEXT_IDLE_TTL_S = float(os.getenv("XSUITE_CONTEXT_IDLE_TTL", "600"))
+CONTEXT_MEMORY_MB = float(os.getenv("XSUITE_CONTEXT_MEMORY_MB", "1024"))
+
+# مهلة إضافية ينتظرها المستدعي حتى يوقف العامل عملية انتهت مهلتها
+ABORT_GRACE_S = 15.0
+
+# تقدير ثابت لكلفة الـ renderer لكل context فوق حجم JS heap المقاس
+CONTEXT_BASE_MB = 60.0
+
+
+def _playwright_major() -> int:
+    try:
+        return int(importlib.metadata.version("playwright").split(".")[0])
+    except Exception:
+        return 0
+
+
+# إغلاق context من خيط آخر يعتمد على تفاصيل داخلية (_impl_obj / _loop) مجربة على Playwright 1.x
+_CLOSE_HOOK_SUPPORTED = _playwright_major() == 1
+
+
+def _schedule_close(context) -> bool:
+    """
+    جدولة context.close() على حلقة asyncio الخاصة بخيط العامل (آمن من أي خيط):
+    ينفذ فوراً إذا كان العامل ينتظر استدعاء Playwright، أو مع أول استدعاء تالٍ.
+    يُرجع False إذا لم يكن ذلك ممكناً مع نسخة Playwright الحالية.
+    """
+    if not _CLOSE_HOOK_SUPPORTED:
+        return False
+    impl = getattr(context, "_impl_obj", None)
+    loop = getattr(context, "_loop", None)
+    if impl is None or not isinstance(loop, asyncio.AbstractEventLoop) or loop.is_closed():
+        return False
+    try:
+        asyncio.run_coroutine_threadsafe(impl.close(), loop)
+    except Exception:
+        return False
+    return True
+
+
+def launch_browser(p, headless: bool):
+    """Launch Chromium with optional Chrome channel (defaults to installed Chrome)."""
+    chrome_channel = os.getenv("XSUITE_CHROME_CHANNEL", "").strip() or "chrome"
+    try:
+        return p.chromium.launch(channel=chrome_channel, headless=headless)
+    except Exception:
+        # Fallback if channel isn't available
+        return p.chromium.launch(headless=headless)
+
+
+def cookie_label_of(storage_state_path: str) -> str:
+    """مفتاح الكاش: اسم ملف الكوكيز بدون الامتداد (label)."""
+    return Path(storage_state_path).stem
+
+
+def _file_mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class JobTimeoutError(TimeoutError):
+    """
+    انتهت مهلة العملية في المتصفح.
+
+    sent=True إذا كانت العملية قد بدأت: ربما نفذت جزئياً (مثل الضغط على زر النشر)،
+    وإعادة تنفيذها قد تكرر أثرها.
+    """
+
+    def __init__(self, message: str, sent: bool = False):
+        super().__init__(message)
+        self.sent = sent
+
+
+class _Job:
+    __slots__ = ("storage_state_path", "key", "fn", "default_timeout", "future", "deadline", "expired", "lock")
+
+    def __init__(self, storage_state_path: str, fn: Callable[[Page], Any], default_timeout: int, timeout_s: float):
+        self.storage_state_path = storage_state_path
+        self.key = cookie_label_of(storage_state_path)
+        self.fn = fn
+        self.default_timeout = default_timeout
+        self.future: Future = Future()
+        self.deadline = time.monotonic() + timeout_s
+        # expired: المراقب أغلق الـ context بعد انتهاء المهلة (lock يحمي السباق مع انتهاء fn)
+        self.expired = False
+        self.lock = threading.Lock()
+
+
+class _WarmContext:
+    __slots__ = ("key", "storage_state_path", "context", "page", "source_mtime", "last_used", "uses", "mem_mb")
+
+    def __init__(self, key: str, storage_state_path: str, context, page, source_mtime: float):
+        self.key = key
+        self.storage_state_path = storage_state_path
+        self.context = context
+        self.page = page
+        self.source_mtime = source_mtime
+        self.last_used = time.time()
+        self.uses = 0
+        self.mem_mb = CONTEXT_BASE_MB
+
+
+class _BrowserWorker(threading.Thread):
+    """خيط يملك متصفحًا واحدًا وينفذ عليه العمليات واحدة تلو الأخرى."""
+
+    def __init__(self, pool: "BrowserPool", index: int):
+        super().__init__(name=f"xsuite-browser-{pool.mode}-{index}", daemon=True)
+        self.pool = pool
+        self.index = index
+        self.jobs: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        # عدد العمليات الموجهة لهذا العامل لكل حساب (في الانتظار أو قيد التنفيذ)
+        self.key_refs: Counter = Counter()
+        self.busy = False
+        self.uses = 0
+        self.launches = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.evictions = 0
+        self.last_error: Optional[str] = None
+        self._playwright = None
+        self._browser = None
+        self._warm: "OrderedDict[str, _WarmContext]" = OrderedDict()
+
+    @property
+    def load(self) -> int:
+        return self.jobs.qsize() + (1 if self.busy else 0)
+
+    # ---------- lifecycle ----------
+
+    def run(self):
+        tick = HEALTH_INTERVAL_S
+        if self.pool.cache_size and CONTEXT_IDLE_TTL_S > 0:
+            tick = min(tick, max(1.0, CONTEXT_IDLE_TTL_S / 2))
+        try:
+            while True:
+                try:
+                    job = self.jobs.get(timeout=tick)
+                except queue.Empty:
+                    self._health_check()
+                    self._evict_idle()
+                    continue
+                if job is None:
+                    break
+                self.busy = True
+                try:
+                    self._run_job(job)
+                finally:
+                    self.busy = False
+                    self.pool._job_done(self, job.key)
+        finally:
+            self._close_browser()
+            if self._playwright is not None:
+                try:
+                    self._playwright.stop()
+                except Exception:
+                    pass
+                self._playwright = None
+
+    def _ensure_browser(self):
+        if self._browser is not None and not self._browser.is_connected():
+            # المتصفح انهار أو أُغلق من الخارج
+            self._close_browser()
+        if self._browser is None:
+            if self._playwright is None:
+                self._playwright = sync_playwright().start()
+            self._browser = launch_browser(self._playwright, headless=self.pool.headless)
+            self.launches += 1
+            self.uses = 0
+        return self._browser
+
+    def _close_browser(self):
+        for key in list(self._warm.keys()):
+            self._evict(key)
+        if self._browser is None:
+            return
+        try:
+            self._browser.close()
+        except Exception:
+            pass
+        self._browser = None
+
+    def _health_check(self):
+        if self._browser is not None and not self._browser.is_connected():
+            self.last_error = "browser disconnected"
+            self._close_browser()
+
+    # ---------- warm contexts ----------
+
+    def _acquire_context(self, job: _Job) -> _WarmContext:
+        warm = self._warm.get(job.key)
+        if warm is not None:
+            if (
+                warm.storage_state_path == job.storage_state_path
+                and _file_mtime(job.storage_state_path) <= warm.source_mtime
+                and not warm.page.is_closed()
+            ):
+                self._warm.move_to_end(job.key)
+                self.cache_hits += 1
+                return warm
+            # ملف الكوكيز تغيّر (تسجيل دخول جديد) أو الصفحة أُغلقت
+            self._evict(job.key)
+
+        self.cache_misses += 1
+        browser = self._ensure_browser()
+        source_mtime = _file_mtime(job.storage_state_path)
+        context = browser.new_context(storage_state=job.storage_state_path)
+        try:
+            page = context.new_page()
+        except Exception:
+            context.close()
+            raise
+        warm = _WarmContext(job.key, job.storage_state_path, context, page, source_mtime)
+        if self.pool.cache_size:
+            self._warm[job.key] = warm
+        return warm
+
+    def _measure(self, warm: _WarmContext):
+        try:
+            used = warm.page.evaluate(
+                "() => (performance.memory && performance.memory.usedJSHeapSize) || 0"
+            )
+            warm.mem_mb = CONTEXT_BASE_MB + float(used or 0) / (1024 * 1024)
+        except Exception:
+            warm.mem_mb = CONTEXT_BASE_MB
+
+    def _write_back(self, warm: _WarmContext):
+        """كتابة الكوكيز المحدّثة في ملف storage_state (إلا إذا تغيّر الملف من مصدر آخر)."""
+        if _file_mtime(warm.storage_state_path) > warm.source_mtime:
+            return
+        state = warm.context.storage_state()
+        tmp = f"{warm.storage_state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, warm.storage_state_path)
+
+    def _evict(self, key: str, write_back: bool = True):
+        warm = self._warm.pop(key, None)
+        if warm is None:
+            return
+        self.evictions += 1
+        if write_back and self._browser is not None and self._browser.is_connected():
+            try:
+                self._write_back(warm)
+            except Exception as e:
+                self.last_error = f"write-back failed for {key}: {e}"[:300]
+        try:
+            warm.context.close()
+        except Exception:
+            pass
+        self.pool._context_released(self, key)
+
+    def _evict_idle(self):
+        if CONTEXT_IDLE_TTL_S <= 0:
+            return
+        now = time.time()
+        for key, warm in list(self._warm.items()):
+            if now - warm.last_used > CONTEXT_IDLE_TTL_S:
+                self._evict(key)
+
+    def _enforce_budget(self):
+        budget = self.pool.memory_budget_mb / self.pool.size
+        while self._warm and (
+            len(self._warm) > self.pool.cache_size
+            or sum(w.mem_mb for w in self._warm.values()) > budget
+        ):
+            oldest = next(iter(self._warm))
+            self._evict(oldest)
+            if len(self._warm) <= 1:
+                break
+
+    # ---------- jobs ----------
+
+    def _abort(self, job: _Job, warm: _WarmContext):
+        """يُستدعى من خيط المراقب عند انتهاء مهلة عملية جارية."""
+        with job.lock:
+            if job.future.done():
+                return
+            job.expired = True
+        if not _schedule_close(warm.context):
+            self.last_error = f"cannot close context of {job.key} from watchdog, replacing worker"
+            self.pool._retire(self)
+            return
+        escalate = threading.Timer(ABORT_GRACE_S / 3, self._escalate, args=(job,))
+        escalate.daemon = True
+        escalate.start()
+
+    def _escalate(self, job: _Job):
+        """إغلاق الـ context لم يوقف العملية: العامل يُستبدل حتى لا تنتظر خلفه عمليات أخرى."""
+        if not job.future.done():
+            self.last_error = f"job for {job.key} still running after timeout, replacing worker"
+            self.pool._retire(self)
+
+    def _run_job(self, job: _Job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        if time.monotonic() >= job.deadline:
+            # انتظرت في الطابور حتى انتهت مهلتها
+            job.future.set_exception(JobTimeoutError("انتهت مهلة العملية قبل أن تبدأ في المتصفح"))
+            return
+        warm: Optional[_WarmContext] = None
+        watchdog: Optional[threading.Timer] = None
+        try:
+            warm = self._acquire_context(job)
+            remaining = job.deadline - time.monotonic()
+            warm.page.set_default_timeout(max(1, min(job.default_timeout, int(remaining * 1000))))
+            watchdog = threading.Timer(max(0.0, remaining), self._abort, args=(job, warm))
+            watchdog.daemon = True
+            watchdog.start()
+            result = job.fn(warm.page)
+            with job.lock:
+                if job.expired:
+                    raise JobTimeoutError("انتهت مهلة تنفيذ العملية في المتصفح", sent=True)
+                job.future.set_result(result)
+            warm.uses += 1
+            warm.last_used = time.time()
+        except BaseException as e:
+            if job.expired and not isinstance(e, JobTimeoutError):
+                # الخطأ ناتج عن إغلاق الـ context بعد انتهاء المهلة (sent من fn إن حددته)
+                e = JobTimeoutError(f"انتهت مهلة تنفيذ العملية في المتصفح: {e}", sent=getattr(e, "sent", True))
+            self.last_error = str(e)[:300]
+            # لا نعيد استخدام صفحة فشلت فيها عملية (قد تبقى حوارات مفتوحة)
+            if warm is not None:
+                if self._warm.get(job.key) is warm:
+                    self._evict(job.key)
+                else:
+                    try:
+                        warm.context.close()
+                    except Exception:
+                        pass
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if self._warm.get(job.key) is warm:
+                self._measure(warm)
+                self._enforce_budget()
+            else:
+                # الكاش معطل: context لمرة واحدة
+                try:
+                    warm.context.close()
+                except Exception:
+                    pass
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            self.uses += 1
+            if self.uses >= self.pool.max_uses:
+                # إعادة تدوير المتصفح لتفادي تراكم الذاكرة (مع حفظ الكوكيز)
+                self._close_browser()
+
+    def info(self) -> dict:
+        now = time.time()
+        return {
+            "name": self.name,
+            "alive": self.is_alive(),
+            "busy": self.busy,
+            "pending": self.jobs.qsize(),
+            "browser_connected": bool(self._browser is not None and self._browser.is_connected()),
+            "uses": self.uses,
+            "launches": self.launches,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "evictions": self.evictions,
+            "warm_contexts": [
+                {
+                    "label": w.key,
+                    "uses": w.uses,
+                    "idle_s": round(now - w.last_used, 1),
+                    "mem_mb": round(w.mem_mb, 1),
+                }
+                for w in list(self._warm.values())
+            ],
+            "last_error": self.last_error,
+        }
+
+
+class BrowserPool:
+    """مجمع متصفحات لوضع واحد (headless أو مرئي)."""
+
+    def __init__(
+        self,
+        headless: bool,
+        size: int = POOL_SIZE,
+        max_uses: int = MAX_USES,
+        max_pending: int = MAX_PENDING,
+        cache_size: int = CONTEXT_CACHE_SIZE,
+        memory_budget_mb: float = CONTEXT_MEMORY_MB,
+    ):
+        self.headless = headless
+        self.mode = "headless" if headless else "headed"
+        self.size = size
+        self.max_uses = max_uses
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.memory_budget_mb = memory_budget_mb
+        self._workers: List[_BrowserWorker] = []
+        # كل حساب مرتبط بعامل واحد طالما عنده عمليات أو context دافئ عليه
+        self._owners: Dict[str, _BrowserWorker] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        # عمال استُبدلوا لأنهم علقوا في عملية انتهت مهلتها
+        self.replaced = 0
+
+    def _start(self):
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers or self._closed:
+                return
+            workers = [_BrowserWorker(self, i) for i in range(self.size)]
+            for w in workers:
+                w.start()
+            self._workers = workers
+
+    def _dispatch(self, job: _Job):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise RuntimeError("مجمع المتصفحات مشغول، حاول لاحقاً")
+            worker = self._owners.get(job.key)
+            if worker is None or not worker.is_alive():
+                worker = min((w for w in self._workers if w.is_alive()), key=lambda w: w.load, default=None)
+                if worker is None:
+                    raise RuntimeError("لا يوجد متصفح متاح في المجمع")
+                self._owners[job.key] = worker
+            worker.key_refs[job.key] += 1
+            self._pending += 1
+            # داخل القفل: _retire لا ينقل العمليات المنتظرة إلا تحته
+            worker.jobs.put(job)
+
+    def _job_done(self, worker: _BrowserWorker, key: str):
+        with self._lock:
+            self._pending -= 1
+            worker.key_refs[key] -= 1
+            self._release_if_idle(worker, key)
+
+    def _context_released(self, worker: _BrowserWorker, key: str):
+        with self._lock:
+            self._release_if_idle(worker, key)
+
+    def _retire(self, worker: _BrowserWorker):
+        """
+        استبدال عامل عالق في عملية انتهت مهلتها بعامل جديد: العمليات المنتظرة تنتقل
+        إليه فوراً، والعامل القديم يخرج (ويغلق متصفحه) بعد انتهاء عمليته الحالية.
+        """
+        with self._lock:
+            if self._closed or worker not in self._workers:
+                return
+            replacement = _BrowserWorker(self, worker.index)
+            self._workers[self._workers.index(worker)] = replacement
+            for key, owner in list(self._owners.items()):
+                if owner is worker:
+                    del self._owners[key]
+            moved: List[_Job] = []
+            while True:
+                try:
+                    job = worker.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    moved.append(job)
+            for job in moved:
+                worker.key_refs[job.key] -= 1
+                replacement.key_refs[job.key] += 1
+                self._owners[job.key] = replacement
+            replacement.start()
+            for job in moved:
+                replacement.jobs.put(job)
+            worker.jobs.put(None)
+            self.replaced += 1
+
+    def _release_if_idle(self, worker: _BrowserWorker, key: str):
+        if worker.key_refs[key] <= 0 and key not in worker._warm:
+            worker.key_refs.pop(key, None)
+            if self._owners.get(key) is worker:
+                del self._owners[key]
+
+    def run(
+        self,
+        storage_state_path: str,
+        fn: Callable[[Page], Any],
+        default_timeout: int = DEFAULT_TIMEOUT,
+        timeout_s: float = JOB_TIMEOUT_S,
+    ) -> Any:
+        """
+        تنفيذ fn(page) على صفحة الحساب (دافئة إن وُجدت) في أحد المتصفحات.
+        يحجب حتى انتهاء العملية ويعيد نتيجتها (أو يرفع استثناءها).
+        عند تجاوز timeout_s يرفع JobTimeoutError بعد أن يوقف العامل العملية.
+        """
+        if isinstance(threading.current_thread(), _BrowserWorker):
+            raise RuntimeError("لا يمكن استدعاء مجمع المتصفحات من داخل عملية متصفح")
+        if self._closed:
+            raise RuntimeError("مجمع المتصفحات مغلق")
+
+        self._start()
+        job = _Job(storage_state_path, fn, default_timeout, timeout_s)
+        self._dispatch(job)
+
+        try:
+            # العامل يفرض المهلة بنفسه؛ المهلة الإضافية هنا لانتظار إيقاف العملية
+            result = job.future.result(timeout=timeout_s + ABORT_GRACE_S)
+        except JobTimeoutError:
+            # مهلة فرضها العامل (FutureTimeoutError هو TimeoutError نفسه في Python 3.11+)
+            self.failed += 1
+            raise
+        except FutureTimeoutError:
+            started = not job.future.cancel()
+            self.failed += 1
+            raise JobTimeoutError("انتهت مهلة تنفيذ العملية في المتصفح", sent=started)
+        except BaseException:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "size": self.size,
+            "max_uses": self.max_uses,
+            "context_cache_size": self.cache_size,
+            "context_memory_budget_mb": self.memory_budget_mb,
+            "pending": self._pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "replaced": self.replaced,
+            "workers": [w.info() for w in self._workers],
+        }
+
+    def shutdown(self, wait_s: float = 10.0):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for w in workers:
+            w.jobs.put(None)
+        deadline = time.time() + wait_s
+        for w in workers:
+            w.join(timeout=max(0.0, deadline - time.time()))
+
+
+# =================
+# Process-wide pools
+# =================
+_pools: Dict[bool, BrowserPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(headless: bool) -> BrowserPool:
+    headless = bool(headless)
+    pool = _pools.get(headless)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(headless)
+            if pool is None:
+                pool = BrowserPool(headless=headless)
+                _pools[headless] = pool
+    return pool
+
+
+def run_with_page(
+    storage_state_path: str,
+    headless: bool,
+    fn: Callable[[Page], Any],
+    default_timeout: int = DEFAULT_TIMEOUT,
+) -> Any:
+    """اختصار: تنفيذ fn(page) على المجمع المناسب لوضع headless."""
+    return get_browser_pool(headless).run(storage_state_path, fn, default_timeout=default_timeout)
+
+
+def pool_stats() -> dict:
+    return {pool.mode: pool.stats() for pool in list(_pools.values())}
+
+
+def shutdown_pools():
+    """إغلاق كل المتصفحات (مع حفظ كوكيز الـ contexts الدافئة)."""
+    for pool in list(_pools.values()):
+        pool.shutdown()
+
+
+atexit.register(shutdown_pools)
@@ -0,0 +1,125 @@
+"""
+تسجيل الدخول الجماعي (CSV) بالتوازي
+
+يعتمد على x_auth.login.x_login_concurrent: عدد محدود من الحسابات في نفس الوقت،
+تأخير عشوائي لكل حساب، وإعادة المحاولة مع backoff عند الأخطاء المؤقتة.
+حالة كل مهمة وكل حساب تُحفظ في جدولي bulk_login_tasks / bulk_login_items
+(بدون كلمات المرور)، لذلك تبقى النتائج بعد إعادة تشغيل الخادم.
+
+كل مهمة تحمل worker_id (hostname:pid) و heartbeat_at يحدّثه خيط خاص (مثل jobs.py)؛
+المهام التي ماتت عمليتها أو توقف الـ heartbeat (XSUITE_JOB_STALE_AFTER) تُعلَّم interrupted،
+ومهام العمليات الأخرى الحية على نفس القاعدة لا تُمس.
+
+الإعدادات (متغيرات بيئة — تُقرأ في x_auth.login):
+    XSUITE_LOGIN_CONCURRENCY    أقصى عدد حسابات متزامنة (افتراضي 5)
+    XSUITE_LOGIN_JITTER         تأخير عشوائي قبل كل حساب 0..N ثانية (افتراضي 5)
+    XSUITE_LOGIN_RETRIES        إعادة المحاولة عند الأخطاء المؤقتة (افتراضي 2)
+    XSUITE_LOGIN_BACKOFF        أساس التأخير بين المحاولات بالثواني (افتراضي 10)
+"""
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .db import (
+    create_bulk_login_task,
+    finish_bulk_login_task,
+    heartbeat_bulk_logins,
+    interrupt_unfinished_bulk_logins,
+    log_operation,
+    running_bulk_login_workers,
+    update_bulk_login_item,
+    upsert_cookie,
+)
+from .jobs import HEARTBEAT_INTERVAL, STALE_AFTER, current_worker_id, dead_workers
+from .utils import safe_label
+
+
+_recovered = False
+_recover_lock = threading.Lock()
+
+
+def _interrupt_orphans():
+    count = interrupt_unfinished_bulk_logins(STALE_AFTER, dead_workers(running_bulk_login_workers()))
+    if count:
+        print(f"[bulk_login] {count} مهمة تسجيل دخول جماعي توقفت عمليتها وتم تعليمها interrupted")
+
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        try:
+            heartbeat_bulk_logins(current_worker_id())
+            _interrupt_orphans()
+        except Exception as e:
+            print(f"[bulk_login] فشل تحديث heartbeat: {e}")
+
+
+def recover_bulk_logins():
+    """
+    مرة واحدة لكل عملية: تعليم مهام العمليات الميتة interrupted، وتشغيل خيط
+    heartbeat لمهام هذه العملية (يكرر نفس الفحص دورياً).
+    """
+    global _recovered
+    with _recover_lock:
+        if _recovered:
+            return
+        _recovered = True
+        _interrupt_orphans()
+        threading.Thread(target=_heartbeat_loop, name="bulk-login-heartbeat", daemon=True).start()
+
+
+def _store_cookie_file(cookies_dir: str, username: str, label: str) -> Path:
+    """x_login يحفظ الكوكيز باسم username.json — ننقلها إلى label.json."""
+    src = Path(cookies_dir) / f"{username}.json"
+    dst = Path(cookies_dir) / f"{label}.json"
+    if src != dst and src.exists():
+        src.replace(dst)
+    if not dst.exists():
+        raise RuntimeError(f"تم تسجيل الدخول لكن ملف الكوكيز غير موجود: {dst}")
+    return dst
+
+
+def _run(task_id: int, accounts: List[Dict[str, Any]], cookies_dir: str):
+    from .x_auth.login import x_login_concurrent
+
+    def on_progress(index: int, username: str, status: str, info: Dict[str, Any]):
+        label = accounts[index]["label"]
+        error = info.get("error")
+        if status == "success":
+            try:
+                dst = _store_cookie_file(cookies_dir, username, label)
+                upsert_cookie(label, dst.name)
+                log_operation("login", label, "success", f"تم حفظ الكوكيز: {dst.name}")
+            except Exception as e:
+                status, error = "error", str(e)
+        if status == "error":
+            log_operation("login", label, "error", f"فشل تسجيل الدخول: {error}")
+        update_bulk_login_item(task_id, index, status, attempts=info.get("attempt", 0), error=error)
+
+    try:
+        asyncio.run(x_login_concurrent(accounts, cookies_dir, on_progress=on_progress))
+        finish_bulk_login_task(task_id, "finished")
+    except Exception as e:
+        print(f"[bulk_login] المهمة {task_id} توقفت: {e}")
+        finish_bulk_login_task(task_id, "failed")
+
+
+def start_bulk_login(accounts: List[Dict[str, Any]], cookies_dir: str) -> int:
+    """
+    بدء مهمة تسجيل دخول جماعي في الخلفية.
+
+    Args:
+        accounts: [{"username": ..., "password": ..., "label": ... (اختياري), "email": ... (اختياري)}]
+        cookies_dir: مجلد حفظ الكوكيز
+
+    Returns:
+        int: رقم المهمة (يُتابع عبر get_bulk_login_task)
+    """
+    accounts = [dict(acc, label=safe_label(acc.get("label") or acc["username"])) for acc in accounts]
+    recover_bulk_logins()
+    task_id = create_bulk_login_task(accounts, current_worker_id())
+    thread = threading.Thread(target=_run, args=(task_id, accounts, cookies_dir), name=f"bulk-login-{task_id}", daemon=True)
+    thread.start()
+    return task_id
@@ -1,3 +1,4 @@
+import json
 import os
 import sqlite3
 from dataclasses import dataclass
@@ -13,6 +14,34 @@ def connect() -> sqlite3.Connection:
     return con
 
 
+# أعمدة طابور المهام داخل جدول operations (تُضاف للقواعد القديمة تلقائياً)
+OPERATION_JOB_COLUMNS = {
+    'payload_json': 'TEXT',
+    'result_json': 'TEXT',
+    'progress': 'TEXT',
+    'started_at': 'TEXT',
+    'finished_at': 'TEXT',
+    'worker_id': 'TEXT',      # العملية (hostname:pid) التي تنفذ المهمة
+    'heartbeat_at': 'TEXT',   # آخر إشارة حياة من تلك العملية
+}
+
+# ملكية مهام تسجيل الدخول الجماعي (نفس فكرة worker_id / heartbeat_at في operations)
+BULK_LOGIN_TASK_COLUMNS = {
+    'worker_id': 'TEXT',
+    'heartbeat_at': 'TEXT',
+}
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+
+
+def _ensure_columns(con: sqlite3.Connection, table: str, columns: Dict[str, str]) -> None:
+    existing = {r['name'] for r in con.execute(f"PRAGMA table_info({table})").fetchall()}
+    for name, decl in columns.items():
+        if name not in existing:
+            con.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
 def init_db() -> None:
     with connect() as con:
         con.execute(
@@ -38,6 +67,40 @@ def init_db() -> None:
             )
             """
         )
+        _ensure_columns(con, 'operations', OPERATION_JOB_COLUMNS)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_operations_status ON operations(status, id)")
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bulk_login_tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                success INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                version INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                finished_at TEXT
+            )
+            """
+        )
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bulk_login_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                label TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        _ensure_columns(con, 'bulk_login_tasks', BULK_LOGIN_TASK_COLUMNS)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_bulk_login_items_task ON bulk_login_items(task_id, position)")
         con.execute(
             """
             CREATE TABLE IF NOT EXISTS tweets (
@@ -51,9 +114,9 @@ def init_db() -> None:
         )
 
 
-def now_iso() -> str:
-    from datetime import datetime
-    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def now_iso(seconds_ago: float = 0) -> str:
+    from datetime import datetime, timedelta
+    return (datetime.now() - timedelta(seconds=seconds_ago)).strftime('%Y-%m-%d %H:%M:%S')
 
 
 def upsert_cookie(label: str, filename: str) -> int:
@@ -161,3 +224,228 @@ def delete_tweet_from_db(tweet_id: int) -> Optional[Dict[str, Any]]:
             return None
         con.execute("DELETE FROM tweets WHERE id=?", (tweet_id,))
         return dict(r)
+
+
+# =====================
+# Job queue (operations)
+# =====================
+def enqueue_job(action: str, cookie_label: Optional[str], payload: Dict[str, Any], message: str = "",
+                meta: Optional[Dict[str, Any]] = None) -> int:
+    with connect() as con:
+        cur = con.execute(
+            "INSERT INTO operations(action,cookie_label,status,message,meta_json,payload_json,created_at) "
+            "VALUES(?,?,?,?,?,?,?)",
+            (action, cookie_label, JOB_QUEUED, message, json.dumps(meta or {}, ensure_ascii=False),
+             json.dumps(payload, ensure_ascii=False), now_iso()),
+        )
+        return int(cur.lastrowid)
+
+
+def claim_next_job(worker_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    حجز أقدم مهمة في الانتظار بشكل ذري، مع تخطي الحسابات التي لديها مهمة قيد التنفيذ
+    (عمليات نفس الحساب تُنفذ واحدة تلو الأخرى). المهمة تُسجل باسم worker_id مع heartbeat_at.
+    """
+    con = connect()
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        r = con.execute(
+            "SELECT * FROM operations WHERE status=? AND (cookie_label IS NULL OR cookie_label NOT IN "
+            "(SELECT cookie_label FROM operations WHERE status=? AND cookie_label IS NOT NULL)) "
+            "ORDER BY id LIMIT 1",
+            (JOB_QUEUED, JOB_RUNNING),
+        ).fetchone()
+        if not r:
+            con.execute("COMMIT")
+            return None
+        started_at = now_iso()
+        con.execute(
+            "UPDATE operations SET status=?, started_at=?, worker_id=?, heartbeat_at=? WHERE id=?",
+            (JOB_RUNNING, started_at, worker_id, started_at, r['id']),
+        )
+        con.execute("COMMIT")
+        job = dict(r)
+        job.update(status=JOB_RUNNING, started_at=started_at, worker_id=worker_id, heartbeat_at=started_at)
+        return job
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        con.close()
+
+
+def update_job_progress(op_id: int, progress: str) -> None:
+    with connect() as con:
+        con.execute("UPDATE operations SET progress=? WHERE id=?", (progress, op_id))
+
+
+def finish_job(op_id: int, status: str, message: str, result: Optional[Dict[str, Any]] = None) -> None:
+    with connect() as con:
+        con.execute(
+            "UPDATE operations SET status=?, message=?, result_json=?, finished_at=? WHERE id=?",
+            (status, message, json.dumps(result or {}, ensure_ascii=False), now_iso(), op_id),
+        )
+
+
+def heartbeat_jobs(worker_id: str) -> int:
+    """تحديث heartbeat_at لكل المهام الجارية لهذه العملية."""
+    with connect() as con:
+        cur = con.execute(
+            "UPDATE operations SET heartbeat_at=? WHERE status=? AND worker_id=?",
+            (now_iso(), JOB_RUNNING, worker_id),
+        )
+        return int(cur.rowcount)
+
+
+def running_job_workers() -> List[str]:
+    with connect() as con:
+        rows = con.execute(
+            "SELECT DISTINCT worker_id FROM operations WHERE status=? AND worker_id IS NOT NULL",
+            (JOB_RUNNING,),
+        ).fetchall()
+    return [r['worker_id'] for r in rows]
+
+
+def fail_interrupted_jobs(stale_after: float, dead_workers: Optional[List[str]] = None) -> int:
+    """
+    المهام التي توقفت عمليتها أثناء التنفيذ لا نعيد تشغيلها (قد تكون نُفذت جزئياً):
+    عمليتها في dead_workers، أو لم يصل منها heartbeat منذ stale_after ثانية
+    (أو بدون مالك — صفوف من قبل إضافة worker_id). مهام العمليات الحية لا تُمس.
+    """
+    dead_workers = list(dead_workers or [])
+    placeholders = ",".join("?" * len(dead_workers)) or "NULL"
+    with connect() as con:
+        cur = con.execute(
+            "UPDATE operations SET status='error', message=?, finished_at=? WHERE status=? AND "
+            f"(worker_id IS NULL OR heartbeat_at IS NULL OR heartbeat_at < ? OR worker_id IN ({placeholders}))",
+            ('توقفت المهمة بسبب إعادة تشغيل الخادم', now_iso(), JOB_RUNNING, now_iso(stale_after), *dead_workers),
+        )
+        return int(cur.rowcount)
+
+
+def job_counts() -> Dict[str, int]:
+    with connect() as con:
+        rows = con.execute(
+            "SELECT status, COUNT(*) c FROM operations WHERE status IN (?,?) GROUP BY status",
+            (JOB_QUEUED, JOB_RUNNING),
+        ).fetchall()
+    counts = {JOB_QUEUED: 0, JOB_RUNNING: 0}
+    counts.update({r['status']: int(r['c']) for r in rows})
+    return counts
+
+
+# =====================
+# Bulk login tasks
+# =====================
+# كلمات المرور لا تُحفظ في القاعدة — المهام التي ماتت عمليتها تُعلَّم interrupted
+BULK_LOGIN_DONE_STATUSES = ('success', 'error', 'interrupted')
+
+
+def create_bulk_login_task(accounts: List[Dict[str, Any]], worker_id: Optional[str] = None) -> int:
+    with connect() as con:
+        ts = now_iso()
+        cur = con.execute(
+            "INSERT INTO bulk_login_tasks(status,total,created_at,worker_id,heartbeat_at) VALUES('running',?,?,?,?)",
+            (len(accounts), ts, worker_id, ts),
+        )
+        task_id = int(cur.lastrowid)
+        con.executemany(
+            "INSERT INTO bulk_login_items(task_id,position,username,label,status,updated_at) VALUES(?,?,?,?,'pending',?)",
+            [(task_id, i, a['username'], a.get('label'), ts) for i, a in enumerate(accounts)],
+        )
+        return task_id
+
+
+def update_bulk_login_item(task_id: int, position: int, status: str, attempts: int = 0, error: Optional[str] = None) -> None:
+    with connect() as con:
+        ts = now_iso()
+        # مهمة أُنهيت (interrupted) لا تُعدّ حساباتها مرة أخرى
+        updated = con.execute(
+            "UPDATE bulk_login_items SET status=?, attempts=MAX(attempts,?), error=?, updated_at=? "
+            "WHERE task_id=? AND position=? AND EXISTS "
+            "(SELECT 1 FROM bulk_login_tasks WHERE id=? AND status='running')",
+            (status, attempts, error, ts, task_id, position, task_id),
+        ).rowcount
+        if not updated:
+            return
+        done = 1 if status in BULK_LOGIN_DONE_STATUSES else 0
+        con.execute(
+            "UPDATE bulk_login_tasks SET done=done+?, success=success+?, failed=failed+?, version=version+1, "
+            "heartbeat_at=? WHERE id=?",
+            (done, int(status == 'success'), int(done and status != 'success'), ts, task_id),
+        )
+
+
+def finish_bulk_login_task(task_id: int, status: str = 'finished') -> None:
+    with connect() as con:
+        _close_bulk_login_task(con, task_id, status)
+
+
+def _close_bulk_login_task(con: sqlite3.Connection, task_id: int, status: str) -> None:
+    """إنهاء المهمة، وأي حساب لم يكتمل يُحسب فاشلاً (مرة واحدة فقط)."""
+    ts = now_iso()
+    running = con.execute(
+        "UPDATE bulk_login_tasks SET status=? WHERE id=? AND status='running'", (status, task_id),
+    ).rowcount
+    if not running:
+        return
+    left = con.execute(
+        "UPDATE bulk_login_items SET status='interrupted', error=COALESCE(error, ?), updated_at=? "
+        "WHERE task_id=? AND status NOT IN (?,?,?)",
+        ('توقفت المهمة قبل تسجيل هذا الحساب', ts, task_id, *BULK_LOGIN_DONE_STATUSES),
+    ).rowcount
+    con.execute(
+        "UPDATE bulk_login_tasks SET done=done+?, failed=failed+?, version=version+1, finished_at=? WHERE id=?",
+        (left, left, ts, task_id),
+    )
+
+
+def heartbeat_bulk_logins(worker_id: str) -> int:
+    """تحديث heartbeat_at لكل مهام تسجيل الدخول الجارية لهذه العملية."""
+    with connect() as con:
+        cur = con.execute(
+            "UPDATE bulk_login_tasks SET heartbeat_at=? WHERE status='running' AND worker_id=?",
+            (now_iso(), worker_id),
+        )
+        return int(cur.rowcount)
+
+
+def running_bulk_login_workers() -> List[str]:
+    with connect() as con:
+        rows = con.execute(
+            "SELECT DISTINCT worker_id FROM bulk_login_tasks WHERE status='running' AND worker_id IS NOT NULL"
+        ).fetchall()
+    return [r['worker_id'] for r in rows]
+
+
+def interrupt_unfinished_bulk_logins(stale_after: float, dead_workers: Optional[List[str]] = None) -> int:
+    """
+    مهام جارية ماتت عمليتها: عمليتها في dead_workers، أو لم يصل منها heartbeat منذ
+    stale_after ثانية (أو بدون مالك — صفوف من قبل إضافة worker_id). مهام العمليات الحية لا تُمس.
+    """
+    dead_workers = list(dead_workers or [])
+    placeholders = ",".join("?" * len(dead_workers)) or "NULL"
+    with connect() as con:
+        rows = con.execute(
+            "SELECT id FROM bulk_login_tasks WHERE status='running' AND "
+            f"(worker_id IS NULL OR heartbeat_at IS NULL OR heartbeat_at < ? OR worker_id IN ({placeholders}))",
+            (now_iso(stale_after), *dead_workers),
+        ).fetchall()
+        for r in rows:
+            _close_bulk_login_task(con, int(r['id']), 'interrupted')
+        return len(rows)
+
+
+def get_bulk_login_task(task_id: int) -> Optional[Dict[str, Any]]:
+    with connect() as con:
+        t = con.execute("SELECT * FROM bulk_login_tasks WHERE id=?", (task_id,)).fetchone()
+        if not t:
+            return None
+        items = con.execute(
+            "SELECT username,label,status,attempts,error FROM bulk_login_items WHERE task_id=? ORDER BY position",
+            (task_id,),
+        ).fetchall()
+    task = dict(t)
+    task['finished'] = task['status'] != 'running'
+    task['results'] = [dict(r, success=(r['status'] == 'success')) for r in items]
+    return task
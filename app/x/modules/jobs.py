@@ -0,0 +1,274 @@
+"""
+طابور مهام X (Job Queue)
+
+بدل تنفيذ عملية X كاملة داخل طلب HTTP (قد تستغرق 30–180 ثانية مع المتصفح)،
+الـ API تسجل المهمة في جدول operations بحالة queued وتُرجع رقمها فوراً،
+ومجموعة عمال محدودة تنفذ المهام بالترتيب:
+- أقصى عدد مهام متزامنة = عدد العمال.
+- مهام نفس الحساب (cookie_label) لا تُنفذ بالتوازي أبداً.
+- التقدم والنتيجة تُحفظ في نفس الصف وتظهر في GET /api/task/<id>.
+
+الطابور محفوظ في SQLite، فالمهام المنتظرة تبقى بعد إعادة تشغيل الخادم.
+كل مهمة جارية تحمل worker_id (hostname:pid) و heartbeat_at يحدّثه خيط خاص؛ المهام
+التي ماتت عمليتها أو توقف الـ heartbeat تُعلَّم كفاشلة، ومهام العمليات الأخرى الحية
+(Flask reloader / أكثر من عملية على نفس القاعدة) لا تُمس.
+
+الإعدادات (متغيرات بيئة):
+    XSUITE_JOB_WORKERS          عدد العمال = أقصى عدد مهام متزامنة (افتراضي 4)
+    XSUITE_JOB_POLL_INTERVAL    فحص الطابور كل N ثانية إذا لم يصل إشعار (افتراضي 2)
+    XSUITE_JOB_HEARTBEAT        تحديث heartbeat للمهام الجارية كل N ثانية (افتراضي 15)
+    XSUITE_JOB_STALE_AFTER      مهمة بدون heartbeat منذ N ثانية تعتبر متوقفة (افتراضي 90)
+"""
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .db import (
+    JOB_QUEUED,
+    JOB_RUNNING,
+    claim_next_job,
+    enqueue_job,
+    fail_interrupted_jobs,
+    finish_job,
+    get_operation,
+    heartbeat_jobs,
+    job_counts,
+    running_job_workers,
+    update_job_progress,
+)
+
+
+JOB_WORKERS = max(1, int(os.getenv("XSUITE_JOB_WORKERS", "4")))
+POLL_INTERVAL = float(os.getenv("XSUITE_JOB_POLL_INTERVAL", "2"))
+HEARTBEAT_INTERVAL = float(os.getenv("XSUITE_JOB_HEARTBEAT", "15"))
+STALE_AFTER = float(os.getenv("XSUITE_JOB_STALE_AFTER", "90"))
+
+# handler(job, payload, progress) -> dict النتيجة (مفتاح message اختياري لرسالة النجاح)
+JobHandler = Callable[[Dict[str, Any], Dict[str, Any], Callable[[str], None]], Optional[Dict[str, Any]]]
+
+
+class _Registration:
+    def __init__(self, handler: JobHandler, error_prefix: str):
+        self.handler = handler
+        self.error_prefix = error_prefix
+
+
+_handlers: Dict[str, _Registration] = {}
+
+
+def job_handler(action: str, error_prefix: str = "فشل التنفيذ"):
+    """تسجيل دالة تنفيذ لنوع عملية (like / post ...)."""
+    def decorator(fn: JobHandler) -> JobHandler:
+        _handlers[action] = _Registration(fn, error_prefix)
+        return fn
+    return decorator
+
+
+def current_worker_id() -> str:
+    """معرف هذه العملية في الصفوف التي تملكها: hostname:pid"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill على Windows ينهي العملية — نعتمد على الـ heartbeat فقط
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def dead_workers(workers: List[str]) -> List[str]:
+    """عمليات على نفس الجهاز لم تعد موجودة (تُعرف فوراً بدل انتظار انتهاء الـ heartbeat)."""
+    host = socket.gethostname()
+    dead = []
+    for worker in workers:
+        worker_host, _, pid = worker.rpartition(":")
+        if worker_host == host and pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            dead.append(worker)
+    return dead
+
+
+def parse_job(op: Dict[str, Any]) -> Dict[str, Any]:
+    """صف operations مع فك payload/result/meta من JSON."""
+    task = dict(op)
+    for key in ("payload_json", "result_json", "meta_json"):
+        raw = task.get(key)
+        try:
+            task[key[:-5]] = json.loads(raw) if raw else None
+        except ValueError:
+            task[key[:-5]] = None
+    return task
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.worker_id = current_worker_id()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._finished = threading.Condition()
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._fail_interrupted()
+            for i in range(self.workers):
+                t = threading.Thread(target=self._loop, name=f"x-job-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            t = threading.Thread(target=self._heartbeat_loop, name="x-job-heartbeat", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, action: str, cookie_label: Optional[str], payload: Dict[str, Any],
+               message: str = "", meta: Optional[Dict[str, Any]] = None) -> int:
+        op_id = enqueue_job(action, cookie_label, payload, message, meta=meta)
+        self._notify()
+        return op_id
+
+    def wait(self, op_id: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """انتظار انتهاء المهمة حتى timeout ثانية، ويُرجع الصف بحالته الحالية."""
+        deadline = time.time() + timeout
+        while True:
+            op = get_operation(op_id)
+            remaining = deadline - time.time()
+            if not op or op["status"] not in (JOB_QUEUED, JOB_RUNNING) or remaining <= 0:
+                return op
+            with self._finished:
+                self._finished.wait(min(remaining, POLL_INTERVAL))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "workers": self.workers,
+                "started": bool(self._threads),
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+        try:
+            data.update(job_counts())
+        except Exception:
+            pass
+        return data
+
+    def _notify(self):
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _fail_interrupted(self):
+        interrupted = fail_interrupted_jobs(STALE_AFTER, dead_workers(running_job_workers()))
+        if interrupted:
+            print(f"[jobs] {interrupted} مهمة توقفت أثناء التنفيذ وتم تعليمها كفاشلة")
+            with self._finished:
+                self._finished.notify_all()
+            # حسابات تلك المهام أصبحت متاحة
+            self._notify()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                heartbeat_jobs(self.worker_id)
+                self._fail_interrupted()
+            except Exception as e:
+                print(f"[jobs] فشل تحديث heartbeat: {e}")
+
+    def _loop(self):
+        while True:
+            try:
+                job = claim_next_job(self.worker_id)
+            except Exception as e:
+                print(f"[jobs] فشل قراءة الطابور: {e}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(POLL_INTERVAL)
+                continue
+
+            with self._lock:
+                self._active += 1
+            try:
+                self._execute(job)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                with self._finished:
+                    self._finished.notify_all()
+                # مهمة لنفس الحساب ربما أصبحت متاحة الآن
+                self._notify()
+
+    def _execute(self, job: Dict[str, Any]):
+        op_id = int(job["id"])
+        registration = _handlers.get(job["action"])
+        if registration is None:
+            finish_job(op_id, "error", f"لا يوجد منفذ للعملية: {job['action']}")
+            with self._lock:
+                self._failed += 1
+            return
+
+        payload = parse_job(job)["payload"] or {}
+
+        def progress(text: str):
+            try:
+                update_job_progress(op_id, text)
+            except Exception:
+                pass
+
+        try:
+            result = registration.handler(job, payload, progress) or {}
+            message = result.pop("message", "تمت العملية ✅")
+            finish_job(op_id, "success", message, result)
+            with self._lock:
+                self._completed += 1
+        except Exception as e:
+            print(f"[jobs] المهمة {op_id} ({job['action']}) فشلت: {e}")
+            finish_job(op_id, "error", f"{registration.error_prefix}: {e}", {"error": str(e)})
+            with self._lock:
+                self._failed += 1
+
+
+# =====================
+# Module-level API
+# =====================
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def start_job_workers():
+    get_job_queue().start()
+
+
+def submit_job(action: str, cookie_label: Optional[str], payload: Dict[str, Any],
+               message: str = "", meta: Optional[Dict[str, Any]] = None) -> int:
+    return get_job_queue().submit(action, cookie_label, payload, message, meta=meta)
+
+
+def wait_for_job(op_id: int, timeout: float) -> Optional[Dict[str, Any]]:
+    return get_job_queue().wait(op_id, timeout)
+
+
+def job_stats() -> Dict[str, Any]:
+    return get_job_queue().stats()
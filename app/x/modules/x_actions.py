@@ -1,21 +1,23 @@
-import os
 import time
 from typing import Optional
 
-from playwright.sync_api import Page, sync_playwright
-
-
-DEFAULT_TIMEOUT = 30_000
-
-
-def _launch_browser(p, headless: bool):
-    """Launch Chromium with optional Chrome channel (defaults to installed Chrome)."""
-    chrome_channel = os.getenv("XSUITE_CHROME_CHANNEL", "").strip() or "chrome"
-    try:
-        return p.chromium.launch(channel=chrome_channel, headless=headless)
-    except Exception:
-        # Fallback if channel isn't available
-        return p.chromium.launch(headless=headless)
+from playwright.sync_api import Locator, Page
+
+from .browser_pool import run_with_page
+from .x_ready import (
+    OP_BOOKMARK,
+    OP_CREATE_TWEET,
+    OP_FOLLOW,
+    OP_LIKE,
+    OP_REPOST,
+    OP_UNDO_REPOST,
+    OP_UNFOLLOW,
+    OP_UNLIKE,
+    expect_api,
+    is_visible,
+    target_tweet,
+    wait_tweet_ready,
+)
 
 
 def _norm_tweet_url(url: str) -> str:
@@ -27,23 +29,24 @@ def _norm_tweet_url(url: str) -> str:
 
 
 def _goto_tweet(page: Page, tweet_url: str):
+    """Open the tweet and return its article (replies / parent tweet have their own buttons)."""
     tweet_url = _norm_tweet_url(tweet_url)
     if not tweet_url:
         raise ValueError("tweet_url required")
     page.goto(tweet_url, wait_until="domcontentloaded")
-    # Ensure tweet page is ready
-    page.wait_for_timeout(6200)
-    # Sometimes content loads after initial DOMContentLoaded
-    page.locator("article").first.wait_for(state="visible", timeout=60_000)
+    # Content loads after initial DOMContentLoaded: wait for the tweet itself
+    wait_tweet_ready(page)
+    return target_tweet(page, tweet_url)
 
 
-def _click_first_visible(page: Page, selectors: list[str], timeout_ms: int = 30_000):
+def _click_first_visible(page: Page, selectors: list[str], timeout_ms: int = 30_000, scope: Optional[Locator] = None):
+    root = scope if scope is not None else page
     deadline = time.time() + (timeout_ms / 1000.0)
     last_err: Optional[Exception] = None
     while time.time() < deadline:
         for sel in selectors:
             try:
-                loc = page.locator(sel)
+                loc = root.locator(sel)
                 if loc.count() and loc.first.is_visible():
                     loc.first.scroll_into_view_if_needed()
                     try:
@@ -179,7 +182,6 @@ def _wait_media_uploaded_in_composer(page: Page, timeout_ms: int = 180_000):
         # No indicator: require a short stable window (video often flips states)
         stable_ticks += 1
         if stable_ticks >= 4:  # ~1.2s stable
-            page.wait_for_timeout(700)
             return
         page.wait_for_timeout(300)
 
@@ -206,129 +208,118 @@ def _wait_button_enabled(scope: Page, selectors: list[str], timeout_ms: int = 12
     return False
 
 def like_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
-    """Like a tweet by URL."""
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        try:
-            _goto_tweet(page, tweet_url)
-
-            # Prefer stable testids
-            selectors = [
-                "div[data-testid='like']",
-                "button[data-testid='like']",
-                "div[role='button'][data-testid='like']",
-                # Fallback to aria-label (EN/AR)
-                "[aria-label*='Like']",
-                "[aria-label*='إعجاب']",
-                "[aria-label*='أعجب']",
-            ]
-            _click_first_visible(page, selectors, timeout_ms=60_000)
-
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    """
+    Like a tweet by URL.
+    Success is confirmed from the FavoriteTweet response and its payload is returned
+    ({"already": True} when the tweet is already liked).
+    wait_after_ms is kept for API compatibility; actions no longer sleep after the click.
+    """
+    def _run(page: Page):
+        tweet = _goto_tweet(page, tweet_url)
+        if is_visible(tweet, "[data-testid='unlike']"):
+            return {"already": True}
+
+        # Prefer stable testids
+        selectors = [
+            "div[data-testid='like']",
+            "button[data-testid='like']",
+            "div[role='button'][data-testid='like']",
+            # Fallback to aria-label (EN/AR)
+            "[aria-label*='Like']",
+            "[aria-label*='إعجاب']",
+            "[aria-label*='أعجب']",
+        ]
+        with expect_api(page, OP_LIKE) as confirmation:
+            _click_first_visible(page, selectors, timeout_ms=60_000, scope=tweet)
+        return confirmation.payload
+
+    return run_with_page(storage_state_path, headless, _run)
 
 
 def repost_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
-    """Repost (retweet) a tweet by URL."""
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        try:
-            _goto_tweet(page, tweet_url)
-
-            # Step 1: open repost menu
-            open_menu_selectors = [
-                "div[data-testid='retweet']",
-                "button[data-testid='retweet']",
-                "div[role='button'][data-testid='retweet']",
-                # recorded: aria label contains reposts. Repost
-                "[aria-label*='reposts'][aria-label*='Repost']",
-                "[aria-label*='Repost']",
-                "[aria-label*='إعادة النشر']",
-                "[aria-label*='إعاده النشر']",
-                "[aria-label*='إعادة نشر']",
-            ]
-            _click_first_visible(page, open_menu_selectors, timeout_ms=60_000)
-
-            # Step 2: choose "Repost" from menu
-            menu_item_selectors = [
-                "div[role='menuitem']:has-text('Repost')",
-                "div[role='menuitem']:has-text('إعادة النشر')",
-                "div[role='menuitem']:has-text('إعاده النشر')",
-                "div[role='menuitem']:has-text('إعادة نشر')",
-                "span:has-text('Repost')",
-                "span:has-text('إعادة النشر')",
-                "span:has-text('إعاده النشر')",
-                "span:has-text('إعادة نشر')",
-            ]
-            # Wait for menu to appear then click
-            _wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=15_000)
+    """Repost (retweet) a tweet by URL. Confirmed from the CreateRetweet response."""
+    def _run(page: Page):
+        tweet = _goto_tweet(page, tweet_url)
+        if is_visible(tweet, "[data-testid='unretweet']"):
+            return {"already": True}
+
+        # Step 1: open repost menu
+        open_menu_selectors = [
+            "div[data-testid='retweet']",
+            "button[data-testid='retweet']",
+            "div[role='button'][data-testid='retweet']",
+            # recorded: aria label contains reposts. Repost
+            "[aria-label*='reposts'][aria-label*='Repost']",
+            "[aria-label*='Repost']",
+            "[aria-label*='إعادة النشر']",
+            "[aria-label*='إعاده النشر']",
+            "[aria-label*='إعادة نشر']",
+        ]
+        _click_first_visible(page, open_menu_selectors, timeout_ms=60_000, scope=tweet)
+
+        # Step 2: choose "Repost" from menu
+        menu_item_selectors = [
+            "div[role='menuitem']:has-text('Repost')",
+            "div[role='menuitem']:has-text('إعادة النشر')",
+            "div[role='menuitem']:has-text('إعاده النشر')",
+            "div[role='menuitem']:has-text('إعادة نشر')",
+            "span:has-text('Repost')",
+            "span:has-text('إعادة النشر')",
+            "span:has-text('إعاده النشر')",
+            "span:has-text('إعادة نشر')",
+        ]
+        # Wait for menu to appear then click
+        _wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=15_000)
+        with expect_api(page, OP_REPOST) as confirmation:
             _click_first_visible(page, menu_item_selectors, timeout_ms=30_000)
+        return confirmation.payload
 
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    return run_with_page(storage_state_path, headless, _run)
 
 
 def undo_repost_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
-    """Undo repost (unretweet) a tweet by URL."""
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        try:
-            _goto_tweet(page, tweet_url)
-
-            # Step 1: click unretweet button
-            page.get_by_test_id("unretweet").click()
-            page.wait_for_timeout(1000)
-
-            # Step 2: click "Undo repost" text
+    """Undo repost (unretweet) a tweet by URL. Confirmed from the DeleteRetweet response."""
+    def _run(page: Page):
+        tweet = _goto_tweet(page, tweet_url)
+        if not is_visible(tweet, "[data-testid='unretweet']"):
+            return {"already": True}
+
+        # Step 1: click unretweet button
+        tweet.get_by_test_id("unretweet").first.click()
+        _wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=15_000)
+
+        # Step 2: click "Undo repost" text
+        with expect_api(page, OP_UNDO_REPOST) as confirmation:
             page.get_by_text("Undo repost").click()
+        return confirmation.payload
 
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    return run_with_page(storage_state_path, headless, _run)
 
 
 def undo_like_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
-    """Undo like (unlike) a tweet by URL."""
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        try:
-            _goto_tweet(page, tweet_url)
-
-            # Same selectors - clicking again will unlike
-            selectors = [
-                "div[data-testid='unlike']",
-                "button[data-testid='unlike']",
-                "div[role='button'][data-testid='unlike']",
-                "div[data-testid='like']",
-                "button[data-testid='like']",
-                "[aria-label*='Unlike']",
-                "[aria-label*='Liked']",
-                "[aria-label*='إلغاء الإعجاب']",
-                "[aria-label*='أعجبني']",
-            ]
-            _click_first_visible(page, selectors, timeout_ms=60_000)
-
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    """Undo like (unlike) a tweet by URL. Confirmed from the UnfavoriteTweet response."""
+    def _run(page: Page):
+        tweet = _goto_tweet(page, tweet_url)
+        if not is_visible(tweet, "[data-testid='unlike']"):
+            return {"already": True}
+
+        # Same selectors - clicking again will unlike
+        selectors = [
+            "div[data-testid='unlike']",
+            "button[data-testid='unlike']",
+            "div[role='button'][data-testid='unlike']",
+            "div[data-testid='like']",
+            "button[data-testid='like']",
+            "[aria-label*='Unlike']",
+            "[aria-label*='Liked']",
+            "[aria-label*='إلغاء الإعجاب']",
+            "[aria-label*='أعجبني']",
+        ]
+        with expect_api(page, OP_UNLIKE) as confirmation:
+            _click_first_visible(page, selectors, timeout_ms=60_000, scope=tweet)
+        return confirmation.payload
+
+    return run_with_page(storage_state_path, headless, _run)
 
 
 def reply_to_tweet(
@@ -340,103 +331,93 @@ def reply_to_tweet(
     media_timeout_ms: int = 180_000,
     wait_after_ms: int = 5_000,
 ):
-    """Reply to a tweet by URL."""
+    """Reply to a tweet by URL. Returns the reply URL taken from the CreateTweet response."""
     reply_text = (reply_text or "").strip()
     if not reply_text:
         raise ValueError("reply_text required")
 
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
+    def _run(page: Page):
+        _goto_tweet(page, tweet_url)
+
+        # Open reply composer (if needed)
+        reply_btn_selectors = [
+            "div[data-testid='reply']",
+            "button[data-testid='reply']",
+            "div[role='button'][data-testid='reply']",
+            "[aria-label*='Reply']",
+            "[aria-label*='رد']",
+        ]
+        # If textbox already visible, skip clicking reply
+        textbox = page.locator("div[data-testid='tweetTextarea_0']")
+        if not (textbox.count() and textbox.first.is_visible()):
+            _click_first_visible(page, reply_btn_selectors, timeout_ms=30_000)
+
+        # Textbox
+        tb = page.locator("div[data-testid='tweetTextarea_0'][role='textbox']")
+        if not tb.count():
+            tb = page.locator("div[data-testid='tweetTextarea_0']")
+        tb.first.wait_for(state="visible", timeout=60_000)
+        tb.first.click()
         try:
-            _goto_tweet(page, tweet_url)
-
-            # Open reply composer (if needed)
-            reply_btn_selectors = [
-                "div[data-testid='reply']",
-                "button[data-testid='reply']",
-                "div[role='button'][data-testid='reply']",
-                "[aria-label*='Reply']",
-                "[aria-label*='رد']",
-            ]
-            # If textbox already visible, skip clicking reply
-            textbox = page.locator("div[data-testid='tweetTextarea_0']")
-            if not (textbox.count() and textbox.first.is_visible()):
-                _click_first_visible(page, reply_btn_selectors, timeout_ms=30_000)
-
-            # Textbox
-            tb = page.locator("div[data-testid='tweetTextarea_0'][role='textbox']")
-            if not tb.count():
-                tb = page.locator("div[data-testid='tweetTextarea_0']")
-            tb.first.wait_for(state="visible", timeout=60_000)
-            tb.first.click()
-            try:
-                tb.first.fill(reply_text)
-            except Exception:
-                tb.first.press("Control+A")
-                
-
-            # Attach media (optional) for reply
-            if media_path and str(media_path).strip():
-                scope = _get_scope(page)
-                file_input = _pick_file_input(scope)
-                if file_input is None:
-                    raise RuntimeError("Could not find file input for reply composer.")
-                file_input.wait_for(state="attached", timeout=60_000)
-                file_input.set_input_files(media_path)
-                _wait_media_uploaded_in_composer(page, timeout_ms=media_timeout_ms)
-            
+            tb.first.fill(reply_text)
+        except Exception:
+            tb.first.press("Control+A")
             
-            # Publish reply: tweetButtonInline preferred
-            publish_selectors = [
-                "button[data-testid='tweetButtonInline']",
-                "button[data-testid='tweetButton']",
-                # fallback by visible text (EN/AR)
-                "button:has-text('Reply')",
-                "button:has-text('رد')",
-                "button:has-text('نشر')",
-                "button:has-text('Post')",
-            ]
-
-            # Wait until enabled (no eval/CSP-safe). For video replies this matters.
-            scope = _get_scope(page)
-            _wait_button_enabled(scope, ["button[data-testid='tweetButtonInline']", "button[data-testid='tweetButton']", "button:has-text('Reply')", "button:has-text('رد')", "button:has-text('نشر')", "button:has-text('Post')"], timeout_ms=120_000)
 
-            # If it never becomes enabled, we'll still attempt the click (X UI can be flaky)
+        # Attach media (optional) for reply
+        if media_path and str(media_path).strip():
+            scope = _get_scope(page)
+            file_input = _pick_file_input(scope)
+            if file_input is None:
+                raise RuntimeError("Could not find file input for reply composer.")
+            file_input.wait_for(state="attached", timeout=60_000)
+            file_input.set_input_files(media_path)
+            _wait_media_uploaded_in_composer(page, timeout_ms=media_timeout_ms)
+        
+        
+        # Publish reply: tweetButtonInline preferred
+        publish_selectors = [
+            "button[data-testid='tweetButtonInline']",
+            "button[data-testid='tweetButton']",
+            # fallback by visible text (EN/AR)
+            "button:has-text('Reply')",
+            "button:has-text('رد')",
+            "button:has-text('نشر')",
+            "button:has-text('Post')",
+        ]
+
+        # Wait until enabled (no eval/CSP-safe). For video replies this matters.
+        scope = _get_scope(page)
+        _wait_button_enabled(scope, ["button[data-testid='tweetButtonInline']", "button[data-testid='tweetButton']", "button:has-text('Reply')", "button:has-text('رد')", "button:has-text('نشر')", "button:has-text('Post')"], timeout_ms=120_000)
+
+        # If it never becomes enabled, we'll still attempt the click (X UI can be flaky)
+        with expect_api(page, OP_CREATE_TWEET, timeout_ms=60_000) as confirmation:
             _click_first_visible(page, publish_selectors, timeout_ms=30_000)
+        return confirmation.tweet_url
 
-            # Wait 5s as requested then exit
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    return run_with_page(storage_state_path, headless, _run)
 
 
 def bookmark_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
-    """Bookmark a tweet by URL."""
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        try:
-            _goto_tweet(page, tweet_url)
-            selectors = [
-                "div[data-testid='bookmark']",
-                "button[data-testid='bookmark']",
-                "div[role='button'][data-testid='bookmark']",
-                "[aria-label*='Bookmark']",
-                "[aria-label*='Bookmarks']",
-                "[aria-label*='إشارة مرجعية']",
-                "[aria-label*='الإشارات المرجعية']",
-            ]
-            _click_first_visible(page, selectors, timeout_ms=60_000)
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    """Bookmark a tweet by URL. Confirmed from the CreateBookmark response."""
+    def _run(page: Page):
+        tweet = _goto_tweet(page, tweet_url)
+        if is_visible(tweet, "[data-testid='removeBookmark']"):
+            return {"already": True}
+        selectors = [
+            "div[data-testid='bookmark']",
+            "button[data-testid='bookmark']",
+            "div[role='button'][data-testid='bookmark']",
+            "[aria-label*='Bookmark']",
+            "[aria-label*='Bookmarks']",
+            "[aria-label*='إشارة مرجعية']",
+            "[aria-label*='الإشارات المرجعية']",
+        ]
+        with expect_api(page, OP_BOOKMARK) as confirmation:
+            _click_first_visible(page, selectors, timeout_ms=60_000, scope=tweet)
+        return confirmation.payload
+
+    return run_with_page(storage_state_path, headless, _run)
 
 
 def quote_tweet(
@@ -448,197 +429,196 @@ def quote_tweet(
     media_timeout_ms: int = 180_000,
     wait_after_ms: int = 5_000,
 ):
-    """Quote a tweet (Repost with comment) by URL."""
+    """Quote a tweet (Repost with comment) by URL. Returns the new post URL from the CreateTweet response."""
     text = (text or '').strip()
     if not text:
         raise ValueError("text required for quote")
 
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
+    def _run(page: Page):
+        tweet = _goto_tweet(page, tweet_url)
+
+        # Open repost menu
+        open_menu_selectors = [
+            "div[data-testid='retweet']",
+            "button[data-testid='retweet']",
+            "div[role='button'][data-testid='retweet']",
+            "[aria-label*='Repost']",
+            "[aria-label*='إعادة النشر']",
+            "[aria-label*='إعاده النشر']",
+            "[aria-label*='إعادة نشر']",
+        ]
+        _click_first_visible(page, open_menu_selectors, timeout_ms=60_000, scope=tweet)
+        _wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=15_000)
+
+        # Click Quote (EN/AR)
+        quote_selectors = [
+            "div[role='menuitem']:has-text('Quote')",
+            "div[role='menuitem']:has-text('اقتباس')",
+            "div[role='menuitem']:has-text('اقتبس')",
+            "span:has-text('Quote')",
+            "span:has-text('اقتباس')",
+            "span:has-text('اقتبس')",
+        ]
+        _click_first_visible(page, quote_selectors, timeout_ms=30_000)
+
+        scope = _get_scope(page)
+        tb = scope.locator("div[data-testid='tweetTextarea_0'][role='textbox']")
+        if not tb.count():
+            tb = scope.locator("div[data-testid='tweetTextarea_0']")
+        tb.first.wait_for(state="visible", timeout=60_000)
+        tb.first.click()
         try:
-            _goto_tweet(page, tweet_url)
-
-            # Open repost menu
-            open_menu_selectors = [
-                "div[data-testid='retweet']",
-                "button[data-testid='retweet']",
-                "div[role='button'][data-testid='retweet']",
-                "[aria-label*='Repost']",
-                "[aria-label*='إعادة النشر']",
-                "[aria-label*='إعاده النشر']",
-                "[aria-label*='إعادة نشر']",
-            ]
-            _click_first_visible(page, open_menu_selectors, timeout_ms=60_000)
-            _wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=15_000)
-
-            # Click Quote (EN/AR)
-            quote_selectors = [
-                "div[role='menuitem']:has-text('Quote')",
-                "div[role='menuitem']:has-text('اقتباس')",
-                "div[role='menuitem']:has-text('اقتبس')",
-                "span:has-text('Quote')",
-                "span:has-text('اقتباس')",
-                "span:has-text('اقتبس')",
-            ]
-            _click_first_visible(page, quote_selectors, timeout_ms=30_000)
-
-            scope = _get_scope(page)
-            tb = scope.locator("div[data-testid='tweetTextarea_0'][role='textbox']")
-            if not tb.count():
-                tb = scope.locator("div[data-testid='tweetTextarea_0']")
-            tb.first.wait_for(state="visible", timeout=60_000)
-            tb.first.click()
-            try:
-                tb.first.fill(text)
-            except Exception:
-                tb.first.press("Control+A")
-                tb.first.type(text, delay=10)
-
-            if media_path and str(media_path).strip():
-                file_input = _pick_file_input(scope)
-                if file_input is None:
-                    raise RuntimeError("Could not find file input for quote composer.")
-                file_input.wait_for(state="attached", timeout=60_000)
-                file_input.set_input_files(media_path)
-                _wait_media_uploaded_in_composer(page, timeout_ms=media_timeout_ms)
-
-            # Publish
-            publish_selectors = [
-                "button[data-testid='tweetButtonInline']",
-                "button[data-testid='tweetButton']",
-                "button:has-text('Post')",
-                "button:has-text('نشر')",
-            ]
-            _wait_button_enabled(scope, ["button[data-testid='tweetButtonInline']", "button[data-testid='tweetButton']"], timeout_ms=120_000)
+            tb.first.fill(text)
+        except Exception:
+            tb.first.press("Control+A")
+            tb.first.type(text, delay=10)
+
+        if media_path and str(media_path).strip():
+            file_input = _pick_file_input(scope)
+            if file_input is None:
+                raise RuntimeError("Could not find file input for quote composer.")
+            file_input.wait_for(state="attached", timeout=60_000)
+            file_input.set_input_files(media_path)
+            _wait_media_uploaded_in_composer(page, timeout_ms=media_timeout_ms)
+
+        # Publish
+        publish_selectors = [
+            "button[data-testid='tweetButtonInline']",
+            "button[data-testid='tweetButton']",
+            "button:has-text('Post')",
+            "button:has-text('نشر')",
+        ]
+        _wait_button_enabled(scope, ["button[data-testid='tweetButtonInline']", "button[data-testid='tweetButton']"], timeout_ms=120_000)
+        with expect_api(page, OP_CREATE_TWEET, timeout_ms=60_000) as confirmation:
             _click_first_visible(page, publish_selectors, timeout_ms=30_000)
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+        return confirmation.tweet_url
 
+    return run_with_page(storage_state_path, headless, _run)
 
-def share_copy_link(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
-    """Open share menu and click 'Copy link' (share via OS sheet is not reliable in automation)."""
-    with sync_playwright() as p:
-        browser = _launch_browser(p, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        try:
-            _goto_tweet(page, tweet_url)
-
-            share_btn_selectors = [
-                "div[data-testid='share']",
-                "button[data-testid='share']",
-                "div[role='button'][data-testid='share']",
-                "[aria-label*='Share']",
-                "[aria-label*='Share post']",
-                "[aria-label*='مشاركة']",
-                "[aria-label*='شارك']",
-            ]
-            _click_first_visible(page, share_btn_selectors, timeout_ms=60_000)
-
-            # Copy link option (EN/AR)
-            copy_selectors = [
-                "div[role='menuitem']:has-text('Copy link')",
-                "div[role='menuitem']:has-text('Copy link to post')",
-                "div[role='menuitem']:has-text('نسخ الرابط')",
-                "div[role='menuitem']:has-text('نسخ رابط')",
-                "span:has-text('Copy link')",
-                "span:has-text('نسخ الرابط')",
-            ]
-            _wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=15_000)
-            _click_first_visible(page, copy_selectors, timeout_ms=30_000)
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
 
-
-def follow_user(storage_state_path: str, profile_url: str, headless: bool = True, wait_after_ms: int = 2000):
+def share_copy_link(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
     """
-    Follow user by visiting their profile and clicking Follow.
-    Supports Arabic/English because it relies on data-testid patterns when possible.
+    Open share menu and click 'Copy link' (share via OS sheet is not reliable in automation).
+    Copy link makes no API call, so we wait (at most wait_after_ms) for the "copied" toast.
     """
-    from playwright.sync_api import sync_playwright
+    def _run(page: Page):
+        _goto_tweet(page, tweet_url)
+
+        share_btn_selectors = [
+            "div[data-testid='share']",
+            "button[data-testid='share']",
+            "div[role='button'][data-testid='share']",
+            "[aria-label*='Share']",
+            "[aria-label*='Share post']",
+            "[aria-label*='مشاركة']",
+            "[aria-label*='شارك']",
+        ]
+        _click_first_visible(page, share_btn_selectors, timeout_ms=60_000)
+
+        # Copy link option (EN/AR)
+        copy_selectors = [
+            "div[role='menuitem']:has-text('Copy link')",
+            "div[role='menuitem']:has-text('Copy link to post')",
+            "div[role='menuitem']:has-text('نسخ الرابط')",
+            "div[role='menuitem']:has-text('نسخ رابط')",
+            "span:has-text('Copy link')",
+            "span:has-text('نسخ الرابط')",
+        ]
+        _wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=15_000)
+        _click_first_visible(page, copy_selectors, timeout_ms=30_000)
+        try:
+            _wait_any(page, ["[data-testid='toast']", "div[role='alert']"], timeout_ms=wait_after_ms)
+        except TimeoutError:
+            pass
 
-    chrome_channel = os.getenv("XSUITE_CHROME_CHANNEL", "").strip() or "chrome"
+    run_with_page(storage_state_path, headless, _run)
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(channel=chrome_channel, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(60_000)
 
-        try:
-            page.goto(profile_url, wait_until="domcontentloaded")
-            page.wait_for_timeout(6200)
+def _profile_column(page: Page):
+    """Profile column only: the sidebar "Who to follow" has its own -follow / -unfollow buttons."""
+    column = page.locator("[data-testid='primaryColumn']")
+    return column.first if column.count() else page
 
-            # Prefer testid like "*-follow"
-            btn = page.locator('[data-testid$="-follow"]')
-            if not (btn.count() and btn.first.is_visible()):
-                # fallback: any button containing Arabic "متابعة" or English "Follow"
-                btn = page.locator('button:has-text("متابعة"), button:has-text("Follow")')
 
-            btn.first.wait_for(state="visible", timeout=30_000)
-            btn.first.scroll_into_view_if_needed()
+# Any of these means the profile header (and its follow button) has rendered
+_PROFILE_FOLLOW_STATE = [
+    '[data-testid$="-follow"]',
+    '[data-testid$="-unfollow"]',
+    'button:has-text("Follow")',
+    'button:has-text("متابعة")',
+]
 
+
+def follow_user(storage_state_path: str, profile_url: str, headless: bool = True, wait_after_ms: int = 2000):
+    """
+    Follow user by visiting their profile and clicking Follow.
+    Supports Arabic/English because it relies on data-testid patterns when possible.
+    Confirmed from the friendships/create response.
+    """
+    def _run(page: Page):
+        page.goto(profile_url, wait_until="domcontentloaded")
+        _wait_any(page, _PROFILE_FOLLOW_STATE, timeout_ms=30_000)
+        profile = _profile_column(page)
+        if is_visible(profile, '[data-testid$="-unfollow"]'):
+            return {"already": True}
+
+        # Prefer testid like "*-follow"
+        btn = profile.locator('[data-testid$="-follow"]')
+        if not (btn.count() and btn.first.is_visible()):
+            # fallback: any button containing Arabic "متابعة" or English "Follow"
+            btn = profile.locator('button:has-text("متابعة"), button:has-text("Follow")')
+
+        btn.first.wait_for(state="visible", timeout=30_000)
+        btn.first.scroll_into_view_if_needed()
+
+        with expect_api(page, OP_FOLLOW) as confirmation:
             try:
                 btn.first.click(timeout=8_000)
             except Exception:
                 btn.first.click(timeout=8_000, force=True)
+        return confirmation.payload
 
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    return run_with_page(storage_state_path, headless, _run, default_timeout=60_000)
 
 
 def unfollow_user(storage_state_path: str, profile_url: str, headless: bool = True, wait_after_ms: int = 2000):
     """
     Unfollow user by visiting their profile and clicking Following -> confirm.
     Uses data-testid '*-unfollow' and confirmationSheetConfirm.
+    Confirmed from the friendships/destroy response.
     """
-    from playwright.sync_api import sync_playwright
-
-    chrome_channel = os.getenv("XSUITE_CHROME_CHANNEL", "").strip() or "chrome"
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(channel=chrome_channel, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(60_000)
-
-        try:
-            page.goto(profile_url, wait_until="domcontentloaded")
-            page.wait_for_timeout(6200)
-
-            btn = page.locator('[data-testid$="-unfollow"]')
-            if not (btn.count() and btn.first.is_visible()):
-                # Sometimes shows "Following" or "متابَع" etc.
-                btn = page.locator('button:has-text("إلغاء المتابعة"), button:has-text("Unfollow"), button:has-text("Following"), button:has-text("متابَع")')
-
-            btn.first.wait_for(state="visible", timeout=30_000)
-            btn.first.scroll_into_view_if_needed()
-
+    def _run(page: Page):
+        page.goto(profile_url, wait_until="domcontentloaded")
+        _wait_any(page, _PROFILE_FOLLOW_STATE, timeout_ms=30_000)
+        profile = _profile_column(page)
+        if is_visible(profile, '[data-testid$="-follow"]') and not is_visible(profile, '[data-testid$="-unfollow"]'):
+            return {"already": True}
+
+        btn = profile.locator('[data-testid$="-unfollow"]')
+        if not (btn.count() and btn.first.is_visible()):
+            # Sometimes shows "Following" or "متابَع" etc.
+            btn = profile.locator('button:has-text("إلغاء المتابعة"), button:has-text("Unfollow"), button:has-text("Following"), button:has-text("متابَع")')
+
+        btn.first.wait_for(state="visible", timeout=30_000)
+        btn.first.scroll_into_view_if_needed()
+
+        with expect_api(page, OP_UNFOLLOW) as confirmation:
             try:
                 btn.first.click(timeout=8_000)
             except Exception:
                 btn.first.click(timeout=8_000, force=True)
 
             # confirm sheet
+            try:
+                _wait_any(page, ['[data-testid="confirmationSheetConfirm"]'], timeout_ms=15_000)
+            except TimeoutError:
+                pass
             confirm = page.locator('[data-testid="confirmationSheetConfirm"]')
             if confirm.count():
-                confirm.first.wait_for(state="visible", timeout=15_000)
                 try:
                     confirm.first.click(timeout=8_000)
                 except Exception:
                     confirm.first.click(timeout=8_000, force=True)
+        return confirmation.payload
 
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    return run_with_page(storage_state_path, headless, _run, default_timeout=60_000)
@@ -1 +1,2 @@
-from .login import x_login, x_login_multi, x_login_with_cookies
+from .login import x_login, x_login_concurrent, x_login_multi, x_login_with_cookies
+from .actions import XActionClient, XApiError, XRequestError
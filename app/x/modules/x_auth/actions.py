@@ -0,0 +1,302 @@
+"""
+تنفيذ عمليات X عبر HTTP مباشرة — بدون متصفح
+
+نفس الـ endpoints التي تستدعيها واجهة x.com عند الضغط (GraphQL مثل FavoriteTweet
+و REST مثل friendships/create.json)، بكوكيز الحساب المحفوظة (auth_token + ct0)
+وعبر HTTPClient نفسه المستخدم في تسجيل الدخول. كل عملية = طلب HTTP واحد.
+
+الاستخدام:
+    async with XActionClient("cookies/acc1.json") as client:
+        await client.like("1234567890")
+"""
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+import curl_cffi
+
+from .login import COOKIES_DOMAIN, HTTPClient
+from .transaction import ClientTransaction, invalidate_cache
+
+
+# ============ Constants ============
+GRAPHQL_URL = 'https://x.com/i/api/graphql/{query_id}/{operation}'
+REST_URL = 'https://x.com/i/api/1.1/{path}'
+
+# queryId لكل عملية — تتغير مع تحديثات واجهة X، ويمكن تجاوزها عبر
+# X_GRAPHQL_QUERY_IDS='{"CreateTweet": "..."}'
+GRAPHQL_QUERY_IDS = {
+    'FavoriteTweet': 'lI07N6Otwv1PhnEgXILM7A',
+    'UnfavoriteTweet': 'ZYKSe-w7KEslx3JhSIk5LA',
+    'CreateRetweet': 'ojPdsZsimiJrUGLR1sjUtA',
+    'DeleteRetweet': 'iQtK4dl5hBmXewYZuEOKVw',
+    'CreateBookmark': 'aoDbu3RHznuiSkQ9aNM67Q',
+    'DeleteBookmark': 'Wlmlj2-xzyS1GN3a6cj-mQ',
+    'CreateTweet': 'SiM_cAu83R0wnrpmKQQSEw',
+    'DeleteTweet': 'VaenaVgh5q5ih7kvyVjgtg',
+}
+try:
+    GRAPHQL_QUERY_IDS.update(json.loads(os.getenv('X_GRAPHQL_QUERY_IDS') or '{}'))
+except ValueError:
+    print('[!] X_GRAPHQL_QUERY_IDS ليس JSON صالح — تم تجاهله')
+
+CREATE_TWEET_FEATURES = {
+    'communities_web_enable_tweet_community_results_fetch': True,
+    'c9s_tweet_anatomy_moderator_badge_enabled': True,
+    'responsive_web_edit_tweet_api_enabled': True,
+    'graphql_is_translatable_rweb_tweet_is_translatable_enabled': True,
+    'view_counts_everywhere_api_enabled': True,
+    'longform_notetweets_consumption_enabled': True,
+    'responsive_web_twitter_article_tweet_consumption_enabled': True,
+    'tweet_awards_web_tipping_enabled': False,
+    'creator_subscriptions_quote_tweet_preview_enabled': False,
+    'longform_notetweets_rich_text_read_enabled': True,
+    'longform_notetweets_inline_media_enabled': True,
+    'articles_preview_enabled': True,
+    'rweb_video_timestamps_enabled': True,
+    'rweb_tipjar_consumption_enabled': True,
+    'responsive_web_graphql_exclude_directive_enabled': True,
+    'verified_phone_label_enabled': False,
+    'freedom_of_speech_not_reach_fetch_enabled': True,
+    'standardized_nudges_misinfo': True,
+    'tweet_with_visibility_results_prefer_gql_limited_actions_policy_enabled': True,
+    'responsive_web_graphql_skip_user_profile_image_extensions_enabled': False,
+    'responsive_web_graphql_timeline_navigation_enabled': True,
+    'responsive_web_enhance_cards_enabled': False,
+}
+
+# أكواد X التي تعني أن الحالة المطلوبة موجودة مسبقاً
+# 139: already favorited — 327: already retweeted
+ALREADY_DONE_CODES = {139, 327}
+
+TWEET_ID_REGEX = re.compile(r'/status(?:es)?/(\d+)')
+
+
+# ============ Errors ============
+class XApiError(RuntimeError):
+    """
+    X رد على الطلب بخطأ (HTTP 4xx/5xx أو errors بدون data).
+    4xx / errors تعني أنه رفض الطلب ولم ينفذ شيئاً، أما 5xx (502/503/504 من البوابة)
+    فقد تأتي بعد تنفيذ العملية فعلاً، لذلك sent=True كما في XRequestError.
+    """
+
+    def __init__(self, message, status=None, payload=None):
+        super().__init__(message)
+        self.status = status
+        self.payload = payload
+
+    @property
+    def sent(self):
+        return self.status is not None and self.status >= 500
+
+    @property
+    def codes(self):
+        errors = (self.payload or {}).get('errors') if isinstance(self.payload, dict) else None
+        return {e.get('code') for e in errors or [] if isinstance(e, dict)}
+
+
+class XRequestError(RuntimeError):
+    """
+    فشل على مستوى الشبكة. sent=True يعني أن الطلب أُرسل ولا نعرف هل نفّذه X أم لا،
+    و sent=False يعني أن الفشل حصل قبل إرسال العملية نفسها.
+    """
+
+    def __init__(self, message, sent=True):
+        super().__init__(message)
+        self.sent = sent
+
+
+# ============ Helpers ============
+def tweet_id_from(tweet):
+    """يقبل رابط تغريدة أو معرفها مباشرة."""
+    tweet = str(tweet).strip()
+    if tweet.isdigit():
+        return tweet
+    match = TWEET_ID_REGEX.search(tweet)
+    if not match:
+        raise ValueError(f'لا يمكن استخراج معرف التغريدة من: {tweet}')
+    return match.group(1)
+
+
+def screen_name_from(profile):
+    """يقبل رابط بروفايل أو @username أو username."""
+    profile = str(profile).strip()
+    if '/' in profile:
+        profile = urlparse(profile if '://' in profile else f'https://{profile}').path.strip('/').split('/')[0]
+    profile = profile.lstrip('@')
+    if not profile:
+        raise ValueError('اسم المستخدم فارغ')
+    return profile
+
+
+def load_cookies(storage_state_path):
+    """قراءة كوكيز Playwright {cookies: [...]} أو dict قديم {key: value}."""
+    with open(storage_state_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'cookies' in data:
+        cookies = {c['name']: c['value'] for c in data['cookies'] if 'x.com' in (c.get('domain') or COOKIES_DOMAIN)}
+    else:
+        cookies = dict(data)
+    for name in ('auth_token', 'ct0'):
+        if not cookies.get(name):
+            raise KeyError(f'{name} غير موجود في الكوكيز: {storage_state_path}')
+    return cookies
+
+
+async def _get_transaction(http):
+    # مادة المفاتيح محفوظة في transaction.py (ذاكرة + قرص)، فالتهيئة هنا لا تجلب شيئاً غالباً
+    transaction = ClientTransaction()
+    await transaction.init(http, http.build_headers(authorization=False, csrf_token=False))
+    return transaction
+
+
+def reset_transaction():
+    invalidate_cache()
+
+
+# ============ Client ============
+class XActionClient:
+    def __init__(self, storage_state_path):
+        self.storage_state_path = storage_state_path
+        self.cookies = load_cookies(storage_state_path)
+        self.http = None
+
+    async def __aenter__(self):
+        self.http = HTTPClient(impersonate='chrome142')
+        for k, v in self.cookies.items():
+            self.http.cookies.set(k, str(v), COOKIES_DOMAIN)
+        try:
+            self.http.client_transaction = await _get_transaction(self.http)
+        except curl_cffi.CurlError as e:
+            await self.http.close()
+            raise XRequestError(f'فشل تهيئة ClientTransaction: {e}', sent=False) from e
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.close()
+
+    def _api_headers(self, referer='https://x.com/home', json_content=False):
+        headers = self.http.build_headers(json_content=json_content)
+        # هيدرات التنقل (document) لا يرسلها المتصفح مع طلبات fetch
+        for key in ('Upgrade-Insecure-Requests', 'Sec-Fetch-User'):
+            headers.pop(key, None)
+        headers.update({
+            'Accept': '*/*',
+            'Sec-Fetch-Mode': 'cors',
+            'Sec-Fetch-Dest': 'empty',
+            'x-twitter-auth-type': 'OAuth2Session',
+            'x-twitter-active-user': 'yes',
+            'x-twitter-client-language': 'en',
+            'Origin': 'https://x.com',
+            'Referer': referer,
+        })
+        return headers
+
+    async def _send(self, name, method, url, **kwargs):
+        try:
+            response = await self.http.request(method, url, raise_for_status=False, **kwargs)
+        except curl_cffi.CurlError as e:
+            raise XRequestError(f'فشل الاتصال أثناء {name}: {e}') from e
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+
+        failed = response.status_code >= 400
+        if isinstance(payload, dict) and payload.get('errors') and not payload.get('data'):
+            failed = True
+        if not failed:
+            return payload
+
+        error = XApiError(
+            f'رفض X تنفيذ {name} (HTTP {response.status_code}): {_error_message(payload, response)}',
+            status=response.status_code,
+            payload=payload,
+        )
+        if error.codes & ALREADY_DONE_CODES:
+            return {'already': True}
+        if response.status_code == 404:
+            # queryId أو transaction id قديم — نعيد التهيئة في المرة القادمة
+            reset_transaction()
+        raise error
+
+    async def graphql(self, operation, variables, features=None, referer='https://x.com/home'):
+        body = {'variables': variables, 'queryId': GRAPHQL_QUERY_IDS[operation]}
+        if features is not None:
+            body['features'] = features
+        url = GRAPHQL_URL.format(query_id=GRAPHQL_QUERY_IDS[operation], operation=operation)
+        return await self._send(
+            operation, 'POST', url,
+            data=json.dumps(body, separators=(',', ':')),
+            headers=self._api_headers(referer, json_content=True),
+        )
+
+    async def rest(self, path, data, referer='https://x.com/home'):
+        headers = self._api_headers(referer)
+        headers['content-type'] = 'application/x-www-form-urlencoded'
+        return await self._send(path, 'POST', REST_URL.format(path=path), data=data, headers=headers)
+
+    # ---------- Tweets ----------
+    async def like(self, tweet):
+        return await self.graphql('FavoriteTweet', {'tweet_id': tweet_id_from(tweet)})
+
+    async def unlike(self, tweet):
+        return await self.graphql('UnfavoriteTweet', {'tweet_id': tweet_id_from(tweet)})
+
+    async def repost(self, tweet):
+        return await self.graphql('CreateRetweet', {'tweet_id': tweet_id_from(tweet), 'dark_request': False})
+
+    async def undo_repost(self, tweet):
+        return await self.graphql('DeleteRetweet', {'source_tweet_id': tweet_id_from(tweet), 'dark_request': False})
+
+    async def bookmark(self, tweet):
+        return await self.graphql('CreateBookmark', {'tweet_id': tweet_id_from(tweet)})
+
+    async def undo_bookmark(self, tweet):
+        return await self.graphql('DeleteBookmark', {'tweet_id': tweet_id_from(tweet)})
+
+    async def delete_tweet(self, tweet):
+        return await self.graphql('DeleteTweet', {'tweet_id': tweet_id_from(tweet), 'dark_request': False})
+
+    async def create_tweet(self, text, reply_to=None, quote=None):
+        """نشر تغريدة نصية (أو رد/اقتباس). يُرجع رد CreateTweet كما هو."""
+        variables = {
+            'tweet_text': text,
+            'dark_request': False,
+            'media': {'media_entities': [], 'possibly_sensitive': False},
+            'semantic_annotation_ids': [],
+            'disallowed_reply_options': None,
+        }
+        if reply_to:
+            variables['reply'] = {'in_reply_to_tweet_id': tweet_id_from(reply_to), 'exclude_reply_user_ids': []}
+        if quote:
+            variables['attachment_url'] = f'https://x.com/i/status/{tweet_id_from(quote)}'
+        return await self.graphql('CreateTweet', variables, features=CREATE_TWEET_FEATURES)
+
+    # ---------- Users ----------
+    async def follow(self, profile):
+        return await self.rest('friendships/create.json', {
+            'include_profile_interstitial_type': '1',
+            'skip_status': '1',
+            'screen_name': screen_name_from(profile),
+        })
+
+    async def unfollow(self, profile):
+        return await self.rest('friendships/destroy.json', {
+            'include_profile_interstitial_type': '1',
+            'skip_status': '1',
+            'screen_name': screen_name_from(profile),
+        })
+
+
+def _error_message(payload, response):
+    if isinstance(payload, dict):
+        errors = payload.get('errors') or []
+        if errors and isinstance(errors[0], dict):
+            return str(errors[0].get('message') or errors[0])
+    try:
+        return response.text[:300]
+    except Exception:
+        return 'unknown error'
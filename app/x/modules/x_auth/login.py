@@ -75,7 +75,7 @@ class HTTPClient(curl_cffi.AsyncSession):
         super().__init__(*args, **kwargs)
         self.client_transaction = None
 
-    async def request(self, method, url, *args, use_transaction_id=True, **kwargs):
+    async def request(self, method, url, *args, use_transaction_id=True, raise_for_status=True, **kwargs):
         if use_transaction_id and self.client_transaction:
             transaction_id = self.client_transaction.generate_transaction_id(method, urlparse(url).path)
             headers = kwargs.get('headers') or {}
@@ -83,7 +83,7 @@ class HTTPClient(curl_cffi.AsyncSession):
             kwargs['headers'] = headers
 
         response = await super().request(method, url, *args, **kwargs)
-        if 400 <= response.status_code < 600:
+        if raise_for_status and 400 <= response.status_code < 600:
             msg = ''
             try:
                 msg = response.text[:2000]
@@ -304,7 +304,14 @@ async def x_login(username, password, email=None, cookies_dir="cookies"):
             print(f'[!] الكوكيز منتهية، جاري تسجيل دخول جديد...')
 
     http = HTTPClient(impersonate='chrome142')
+    try:
+        return await _fresh_login(http, username, password, email, cookies_dir, cookie_file)
+    finally:
+        # إغلاق الجلسة حتى عند الفشل (مهم مع تسجيل الدخول المتوازي وإعادة المحاولة)
+        await http.close()
+
 
+async def _fresh_login(http, username, password, email, cookies_dir, cookie_file):
     # 1. جلب guest_token من صفحة تسجيل الدخول
     print(f'[1] جلب guest_token...')
     response = await http.get(
@@ -366,7 +373,6 @@ async def x_login(username, password, email=None, cookies_dir="cookies"):
     if ct0 and at:
         _save_to_coo(ct0, at, username, cookies_dir)
 
-    await http.close()
     return cookies_dict
 
 
@@ -403,7 +409,91 @@ async def x_login_with_cookies(cookie_file):
     return cookies_dict
 
 
-async def x_login_multi(accounts, cookies_dir="cookies"):
+# ============ Bulk Login ============
+LOGIN_CONCURRENCY = int(os.getenv('XSUITE_LOGIN_CONCURRENCY', '5'))
+LOGIN_JITTER = float(os.getenv('XSUITE_LOGIN_JITTER', '5'))
+LOGIN_RETRIES = int(os.getenv('XSUITE_LOGIN_RETRIES', '2'))
+LOGIN_BACKOFF = float(os.getenv('XSUITE_LOGIN_BACKOFF', '10'))
+
+TRANSIENT_HTTP_REGEX = re.compile(r'^HTTP (429|5\d\d)\b')
+
+
+def is_transient_error(error):
+    """أخطاء الشبكة و 429/5xx تستحق إعادة المحاولة، بعكس كلمة مرور خاطئة أو تحقق إضافي."""
+    if isinstance(error, (curl_cffi.CurlError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return bool(TRANSIENT_HTTP_REGEX.match(str(error)))
+
+
+async def x_login_concurrent(accounts, cookies_dir="cookies", concurrency=None, jitter=None,
+                             retries=None, backoff=None, on_progress=None):
+    """
+    تسجيل دخول عدة حسابات بالتوازي
+
+    Args:
+        accounts: قائمة من dict: {"username": "...", "password": "...", "email": "..."}
+        cookies_dir: مجلد حفظ الكوكيز
+        concurrency: أقصى عدد حسابات تُسجل في نفس الوقت
+        jitter: تأخير عشوائي (0..jitter ثانية) قبل كل حساب حتى لا تخرج الطلبات دفعة واحدة
+        retries: عدد إعادة المحاولات عند الأخطاء المؤقتة (شبكة / 429 / 5xx)
+        backoff: أساس التأخير بين المحاولات (يتضاعف مع كل محاولة)
+        on_progress: دالة تُستدعى مع كل تغيير حالة:
+            on_progress(index, username, status, info) — status: running / retrying / success / error
+
+    Returns:
+        dict: {username: {"success": True, "cookies": ...} أو {"success": False, "error": ...}}
+    """
+    concurrency = max(1, concurrency or LOGIN_CONCURRENCY)
+    jitter = LOGIN_JITTER if jitter is None else jitter
+    retries = LOGIN_RETRIES if retries is None else retries
+    backoff = LOGIN_BACKOFF if backoff is None else backoff
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    def _notify(index, username, status, info=None):
+        if on_progress:
+            try:
+                on_progress(index, username, status, info or {})
+            except Exception as e:
+                print(f'[!] on_progress فشل: {e}')
+
+    async def _one(index, account):
+        username = account['username']
+        attempt = 0
+        while True:
+            attempt += 1
+            async with semaphore:
+                if jitter > 0:
+                    await asyncio.sleep(random.uniform(0, jitter))
+                _notify(index, username, 'running', {'attempt': attempt})
+                try:
+                    cookies = await x_login(username, account['password'], account.get('email'), cookies_dir)
+                except Exception as e:
+                    error = e
+                else:
+                    results[username] = {"success": True, "cookies": cookies}
+                    print(f'[✓] {username} — نجح')
+                    _notify(index, username, 'success', {'attempt': attempt, 'cookies': cookies})
+                    return
+
+            # الانتظار قبل إعادة المحاولة خارج الـ semaphore حتى لا يحجز مكان حساب آخر
+            if attempt <= retries and is_transient_error(error):
+                delay = backoff * (2 ** (attempt - 1)) + random.uniform(0, jitter or 1)
+                print(f'[!] {username} — خطأ مؤقت ({error})، إعادة المحاولة بعد {delay:.1f} ثانية')
+                _notify(index, username, 'retrying', {'attempt': attempt, 'error': str(error), 'delay': delay})
+                await asyncio.sleep(delay)
+                continue
+
+            results[username] = {"success": False, "error": str(error)}
+            print(f'[✗] {username} — فشل: {error}')
+            _notify(index, username, 'error', {'attempt': attempt, 'error': str(error)})
+            return
+
+    await asyncio.gather(*(_one(i, acc) for i, acc in enumerate(accounts)))
+    return results
+
+
+async def x_login_multi(accounts, cookies_dir="cookies", concurrency=None):
     """
     تسجيل دخول عدة حسابات
 
@@ -411,33 +501,16 @@ async def x_login_multi(accounts, cookies_dir="cookies"):
         accounts: قائمة من dict كل واحد فيه:
             {"username": "...", "password": "...", "email": "..."}
         cookies_dir: مجلد حفظ الكوكيز
+        concurrency: أقصى عدد حسابات متزامنة (افتراضي XSUITE_LOGIN_CONCURRENCY)
 
     Returns:
         dict: {username: cookies_dict}
     """
-    results = {}
-    for i, account in enumerate(accounts):
-        username = account['username']
-        password = account['password']
-        email = account.get('email')
-
-        print(f'\n{"="*50}')
-        print(f'  [{i+1}/{len(accounts)}] تسجيل دخول: {username}')
-        print(f'{"="*50}')
+    print(f'\n{"="*50}')
+    print(f'  تسجيل دخول {len(accounts)} حساب')
+    print(f'{"="*50}')
 
-        try:
-            cookies = await x_login(username, password, email, cookies_dir)
-            results[username] = {"success": True, "cookies": cookies}
-            print(f'[✓] {username} — نجح')
-        except Exception as e:
-            results[username] = {"success": False, "error": str(e)}
-            print(f'[✗] {username} — فشل: {e}')
-
-        # تأخير بين الحسابات
-        if i < len(accounts) - 1:
-            delay = random.uniform(5, 15)
-            print(f'[*] انتظار {delay:.1f} ثانية...')
-            await asyncio.sleep(delay)
+    results = await x_login_concurrent(accounts, cookies_dir, concurrency=concurrency)
 
     # ملخص
     print(f'\n{"="*50}')
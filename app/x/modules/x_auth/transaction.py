@@ -1,12 +1,17 @@
 """
 Client Transaction ID — توليد x-client-transaction-id
 """
+import os
 import re
+import json
 import math
 import time
 import random
 import base64
+import asyncio
 import hashlib
+import threading
+import weakref
 from functools import reduce
 
 import bs4
@@ -98,6 +103,79 @@ async def handle_x_migration(session, headers):
     return home_page
 
 
+# ============ Key Material Cache ============
+# مفتاح الصفحة والـ indices من ملف ondemand و animation_key ثابتة لفترة، فنحفظها
+# على مستوى العملية وعلى القرص بدل جلب x.com + ondemand.s.js وتحليلهما لكل جلسة.
+CACHE_TTL = int(os.getenv('XSUITE_TRANSACTION_TTL', '3600'))
+CACHE_FILE = os.getenv('XSUITE_TRANSACTION_CACHE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.transaction_cache.json')
+
+_MATERIAL_FIELDS = ('key', 'row_index', 'key_bytes_indices', 'animation_key', 'ondemand_hash', 'fetched_at')
+_cache_lock = threading.Lock()
+_cache = None
+_init_locks = weakref.WeakKeyDictionary()
+
+
+def _valid_material(entry):
+    return isinstance(entry, dict) and all(k in entry for k in _MATERIAL_FIELDS)
+
+
+def _read_material():
+    """آخر مادة مفاتيح معروفة (من الذاكرة أو القرص) حتى لو انتهت صلاحيتها."""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        try:
+            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if _valid_material(entry):
+            _cache = entry
+        return _cache
+
+
+def _fresh_material():
+    entry = _read_material()
+    if entry and time.time() - entry['fetched_at'] < CACHE_TTL:
+        return entry
+    return None
+
+
+def _store_material(entry):
+    global _cache
+    with _cache_lock:
+        _cache = entry
+        tmp = f"{CACHE_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp, CACHE_FILE)
+        except OSError:
+            pass
+
+
+def invalidate_cache():
+    """حذف المادة المحفوظة — التهيئة القادمة تجلب x.com و ondemand من جديد."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+        try:
+            os.remove(CACHE_FILE)
+        except OSError:
+            pass
+
+
+def _init_lock():
+    # جلسات نفس الـ event loop (تسجيل الدخول المتوازي) تنتظر تهيئة واحدة بدل أن يجلب كل منها
+    loop = asyncio.get_running_loop()
+    lock = _init_locks.get(loop)
+    if lock is None:
+        lock = _init_locks[loop] = asyncio.Lock()
+    return lock
+
+
 # ============ ClientTransaction ============
 class ClientTransaction:
     ADDITIONAL_RANDOM_NUMBER = 3
@@ -111,21 +189,61 @@ class ClientTransaction:
         self.key_bytes = None
         self.animation_key = None
 
-    async def init(self, session, headers):
+    async def init(self, session, headers, use_cache=True):
+        if use_cache and self._apply(_fresh_material()):
+            return
+        async with _init_lock():
+            # ربما أكملت جلسة أخرى التهيئة أثناء الانتظار
+            if use_cache and self._apply(_fresh_material()):
+                return
+            await self._init_from_network(session, headers)
+
+    async def _init_from_network(self, session, headers):
         home_page_response = await handle_x_migration(session, headers)
         self.home_page_response = self._validate(home_page_response)
-        self.DEFAULT_ROW_INDEX, self.DEFAULT_KEY_BYTES_INDICES = await self._get_indices(
-            self.home_page_response, session, headers)
+        ondemand_hash = self._get_ondemand_hash(self.home_page_response)
+
+        # الـ indices تتغير فقط مع تغير ملف ondemand — نعيد جلبه عند تغير الـ hash فقط
+        previous = _read_material()
+        if previous and ondemand_hash and previous['ondemand_hash'] == ondemand_hash:
+            self.DEFAULT_ROW_INDEX = previous['row_index']
+            self.DEFAULT_KEY_BYTES_INDICES = previous['key_bytes_indices']
+        else:
+            self.DEFAULT_ROW_INDEX, self.DEFAULT_KEY_BYTES_INDICES = await self._get_indices(
+                self.home_page_response, session, headers)
         self.key = self._get_key(self.home_page_response)
         self.key_bytes = self._get_key_bytes(self.key)
         self.animation_key = self._get_animation_key(self.key_bytes, self.home_page_response)
 
+        _store_material({
+            'key': self.key,
+            'row_index': self.DEFAULT_ROW_INDEX,
+            'key_bytes_indices': self.DEFAULT_KEY_BYTES_INDICES,
+            'animation_key': self.animation_key,
+            'ondemand_hash': ondemand_hash,
+            'fetched_at': time.time(),
+        })
+
+    def _apply(self, entry):
+        if not entry:
+            return False
+        self.key = entry['key']
+        self.key_bytes = self._get_key_bytes(self.key)
+        self.DEFAULT_ROW_INDEX = entry['row_index']
+        self.DEFAULT_KEY_BYTES_INDICES = list(entry['key_bytes_indices'])
+        self.animation_key = entry['animation_key']
+        return True
+
+    def _get_ondemand_hash(self, response):
+        on_demand_file = ON_DEMAND_FILE_REGEX.search(str(response))
+        return on_demand_file.group(1) if on_demand_file else None
+
     async def _get_indices(self, home_page_response, session, headers):
         key_byte_indices = []
         response = self._validate(home_page_response)
-        on_demand_file = ON_DEMAND_FILE_REGEX.search(str(response))
-        if on_demand_file:
-            on_demand_file_url = f"https://abs.twimg.com/responsive-web/client-web/ondemand.s.{on_demand_file.group(1)}a.js"
+        on_demand_hash = self._get_ondemand_hash(response)
+        if on_demand_hash:
+            on_demand_file_url = f"https://abs.twimg.com/responsive-web/client-web/ondemand.s.{on_demand_hash}a.js"
             on_demand_file_response = await session.request(method="GET", url=on_demand_file_url, headers=headers)
             key_byte_indices_match = INDICES_REGEX.finditer(str(on_demand_file_response.text))
             for item in key_byte_indices_match:
@@ -200,7 +318,7 @@ class ClientTransaction:
     def generate_transaction_id(self, method, path):
         time_now = math.floor((time.time() * 1000 - 1682924400 * 1000) / 1000)
         time_now_bytes = [(time_now >> (i * 8)) & 0xFF for i in range(4)]
-        key_bytes = self._get_key_bytes(self.key)
+        key_bytes = self.key_bytes
         hash_val = hashlib.sha256(
             f"{method}!{path}!{time_now}{self.DEFAULT_KEYWORD}{self.animation_key}".encode()).digest()
         hash_bytes = list(hash_val)
@@ -1,8 +1,7 @@
-import os
 from typing import Optional
-from playwright.sync_api import sync_playwright
 
-DEFAULT_TIMEOUT = 30_000
+from .browser_pool import run_with_page
+from .x_ready import OP_DELETE_TWEET, expect_api, wait_any, wait_tweet_ready
 
 
 def build_tweet_url_by_id(tweet_id: str) -> str:
@@ -36,31 +35,19 @@ def delete_tweet(storage_state_path: str, tweet_url: str, headless: bool = True,
         storage_state_path: مسار ملف الكوكيز
         tweet_url: رابط التغريدة المراد حذفها
         headless: تشغيل بدون واجهة
-        wait_after_ms: وقت الانتظار بعد الحذف
+        wait_after_ms: غير مستخدم (للتوافق)؛ النجاح يُؤكد من رد DeleteTweet
     
     Returns:
         True إذا تم الحذف بنجاح، False إذا فشل
     """
-    chrome_channel = os.getenv("XSUITE_CHROME_CHANNEL", "").strip() or "chrome"
-    
-    with sync_playwright() as p:
-        try:
-            browser = p.chromium.launch(channel=chrome_channel, headless=headless)
-        except Exception:
-            browser = p.chromium.launch(headless=headless)
-        
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        
+    def _run(page) -> bool:
         try:
             # الذهاب إلى صفحة التغريدة
             page.goto(tweet_url, wait_until="domcontentloaded")
-            page.wait_for_timeout(3000)
             
             # انتظار ظهور التغريدة
+            wait_tweet_ready(page, timeout_ms=30_000)
             tweet = page.get_by_test_id("tweet")
-            tweet.first.wait_for(state="visible", timeout=30_000)
             
             # الضغط على زر القائمة (caret)
             caret = tweet.get_by_test_id("caret")
@@ -72,7 +59,7 @@ def delete_tweet(storage_state_path: str, tweet_url: str, headless: bool = True,
             
             caret.first.wait_for(state="visible", timeout=15_000)
             caret.first.click()
-            page.wait_for_timeout(800)
+            wait_any(page, ["div[role='menu']", "div[role='menuitem']"], timeout_ms=10_000)
             
             # الضغط على Delete
             delete_btn = page.get_by_text("Delete")
@@ -86,14 +73,12 @@ def delete_tweet(storage_state_path: str, tweet_url: str, headless: bool = True,
             
             delete_btn.first.wait_for(state="visible", timeout=10_000)
             delete_btn.first.click()
-            page.wait_for_timeout(800)
             
             # تأكيد الحذف
             confirm = page.get_by_test_id("confirmationSheetConfirm")
             confirm.wait_for(state="visible", timeout=10_000)
-            confirm.click()
-            
-            page.wait_for_timeout(wait_after_ms)
+            with expect_api(page, OP_DELETE_TWEET):
+                confirm.click()
             return True
             
         except Exception as e:
@@ -102,6 +87,5 @@ def delete_tweet(storage_state_path: str, tweet_url: str, headless: bool = True,
             except Exception:
                 pass
             raise RuntimeError(f"فشل حذف التغريدة: {e}")
-        finally:
-            context.close()
-            browser.close()
+
+    return run_with_page(storage_state_path, headless, _run)
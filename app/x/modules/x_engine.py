@@ -0,0 +1,224 @@
+"""
+محرك تنفيذ عمليات X: HTTP مباشر أولاً ثم Playwright كاحتياط
+
+نفس أسماء وتواقيع دوال المتصفح (like_tweet / post_to_x / follow_user ...)
+لكن كل عملية تُنفذ بطلب HTTP واحد عبر x_auth.actions بكوكيز الحساب،
+وإذا فشل المسار المباشر (queryId قديم، كوكيز ناقصة، رفض من X ...)
+نعيد تنفيذ العملية عبر المتصفح.
+
+عمليات الإنشاء (نشر / رد / اقتباس) لا تُعاد عبر المتصفح إذا انقطع الاتصال
+بعد إرسال الطلب أو رد X بخطأ 5xx، لأننا لا نعرف هل نُشرت التغريدة فعلاً (تجنباً للتكرار).
+النشر مع ميديا يذهب مباشرة للمتصفح.
+
+post_to_x_async للاستدعاء من داخل event loop (FastAPI): ينتظر طلب HTTP مباشرة
+ويشغّل احتياط المتصفح في thread، بدل _run_coro الذي يحجب الـ loop حتى ينتهي.
+
+الإعدادات (متغيرات بيئة):
+    XSUITE_ACTION_ENGINE    http (افتراضي) أو browser لتعطيل المسار المباشر
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from . import x_actions, x_bookmark, x_delete, x_follow, x_post, x_unfollow
+from .x_ready import created_tweet_url
+
+
+def engine_name() -> str:
+    return (os.getenv("XSUITE_ACTION_ENGINE") or "http").strip().lower()
+
+
+def _run_coro(coro):
+    """تشغيل coroutine من كود متزامن (Flask) أو من داخل event loop قائم (FastAPI)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def _target():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    t = threading.Thread(target=_target, name="x-engine", daemon=True)
+    t.start()
+    t.join()
+    if "error" in result:
+        raise result["error"]
+    return result.get("value")
+
+
+async def _via_http_async(storage_state_path: str, method: str, *args, **kwargs):
+    from .x_auth.actions import XActionClient
+
+    async with XActionClient(storage_state_path) as client:
+        return await getattr(client, method)(*args, **kwargs)
+
+
+def _via_http(storage_state_path: str, method: str, *args, **kwargs):
+    return _run_coro(_via_http_async(storage_state_path, method, *args, **kwargs))
+
+
+def _fall_back(name: str, e: Exception, creates: bool):
+    """فشل المسار المباشر: يرفع الخطأ إذا كانت إعادة التنفيذ عبر المتصفح غير آمنة."""
+    if creates and getattr(e, "sent", False):
+        # الطلب وصل غالباً — إعادة التنفيذ قد تنشر التغريدة مرتين
+        raise e
+    print(f"[x_engine] {name} عبر HTTP فشل ({type(e).__name__}: {e}) — التحويل إلى المتصفح")
+
+
+def _execute(name: str, http_call: Callable[[], Any], browser_call: Callable[[], Any], creates: bool = False):
+    if engine_name() != "http":
+        return browser_call()
+    try:
+        return http_call()
+    except Exception as e:
+        _fall_back(name, e, creates)
+    return browser_call()
+
+
+# ============ Tweets ============
+def post_to_x(storage_state_path: str, text: str, media_path: Optional[str], headless: bool) -> Optional[str]:
+    def _browser():
+        return x_post.post_to_x(storage_state_path, text, media_path, headless)
+
+    if media_path and str(media_path).strip():
+        return _browser()
+    return _execute(
+        "post",
+        lambda: created_tweet_url(_via_http(storage_state_path, "create_tweet", text)),
+        _browser, creates=True,
+    )
+
+
+async def post_to_x_async(storage_state_path: str, text: str, media_path: Optional[str],
+                          headless: bool) -> Optional[str]:
+    """post_to_x بدون حجب الـ event loop."""
+    def _browser():
+        return x_post.post_to_x(storage_state_path, text, media_path, headless)
+
+    if engine_name() != "http" or (media_path and str(media_path).strip()):
+        return await asyncio.to_thread(_browser)
+    try:
+        return created_tweet_url(await _via_http_async(storage_state_path, "create_tweet", text))
+    except Exception as e:
+        _fall_back("post", e, creates=True)
+    return await asyncio.to_thread(_browser)
+
+
+def reply_to_tweet(storage_state_path: str, tweet_url: str, reply_text: str, headless: bool,
+                   media_path: Optional[str] = None, media_timeout_ms: int = 180_000, wait_after_ms: int = 5_000):
+    def _browser():
+        return x_actions.reply_to_tweet(storage_state_path, tweet_url, reply_text, headless,
+                                        media_path=media_path, media_timeout_ms=media_timeout_ms,
+                                        wait_after_ms=wait_after_ms)
+
+    reply_text = (reply_text or "").strip()
+    if not reply_text or (media_path and str(media_path).strip()):
+        return _browser()
+    return _execute(
+        "reply",
+        lambda: created_tweet_url(_via_http(storage_state_path, "create_tweet", reply_text, reply_to=tweet_url)),
+        _browser, creates=True,
+    )
+
+
+def quote_tweet(storage_state_path: str, tweet_url: str, text: str, headless: bool,
+                media_path: Optional[str] = None, media_timeout_ms: int = 180_000, wait_after_ms: int = 5_000):
+    def _browser():
+        return x_actions.quote_tweet(storage_state_path, tweet_url, text, headless,
+                                     media_path=media_path, media_timeout_ms=media_timeout_ms,
+                                     wait_after_ms=wait_after_ms)
+
+    text = (text or "").strip()
+    if not text or (media_path and str(media_path).strip()):
+        return _browser()
+    return _execute(
+        "quote",
+        lambda: created_tweet_url(_via_http(storage_state_path, "create_tweet", text, quote=tweet_url)),
+        _browser, creates=True,
+    )
+
+
+def like_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
+    return _execute(
+        "like",
+        lambda: _via_http(storage_state_path, "like", tweet_url),
+        lambda: x_actions.like_tweet(storage_state_path, tweet_url, headless, wait_after_ms),
+    )
+
+
+def undo_like_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
+    return _execute(
+        "unlike",
+        lambda: _via_http(storage_state_path, "unlike", tweet_url),
+        lambda: x_actions.undo_like_tweet(storage_state_path, tweet_url, headless, wait_after_ms),
+    )
+
+
+def repost_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
+    return _execute(
+        "repost",
+        lambda: _via_http(storage_state_path, "repost", tweet_url),
+        lambda: x_actions.repost_tweet(storage_state_path, tweet_url, headless, wait_after_ms),
+    )
+
+
+def undo_repost_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 2_000):
+    return _execute(
+        "undo_repost",
+        lambda: _via_http(storage_state_path, "undo_repost", tweet_url),
+        lambda: x_actions.undo_repost_tweet(storage_state_path, tweet_url, headless, wait_after_ms),
+    )
+
+
+def bookmark_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 3000):
+    return _execute(
+        "bookmark",
+        lambda: _via_http(storage_state_path, "bookmark", tweet_url),
+        lambda: x_bookmark.bookmark_tweet(storage_state_path, tweet_url, headless, wait_after_ms),
+    )
+
+
+def undo_bookmark_tweet(storage_state_path: str, tweet_url: str, headless: bool, wait_after_ms: int = 3000):
+    return _execute(
+        "undo_bookmark",
+        lambda: _via_http(storage_state_path, "undo_bookmark", tweet_url),
+        lambda: x_bookmark.undo_bookmark_tweet(storage_state_path, tweet_url, headless, wait_after_ms),
+    )
+
+
+def delete_tweet(storage_state_path: str, tweet_url: str, headless: bool = True, wait_after_ms: int = 3000) -> bool:
+    def _http():
+        _via_http(storage_state_path, "delete_tweet", tweet_url)
+        return True
+
+    return _execute(
+        "delete", _http,
+        lambda: x_delete.delete_tweet(storage_state_path, tweet_url, headless, wait_after_ms),
+    )
+
+
+def delete_tweet_by_id(storage_state_path: str, tweet_id: str, headless: bool = True, wait_after_ms: int = 3000) -> bool:
+    return delete_tweet(storage_state_path, x_delete.build_tweet_url_by_id(tweet_id), headless, wait_after_ms)
+
+
+# ============ Users ============
+def follow_user(storage_state_path: str, profile_url: str, headless: bool, wait_after_ms: int = 3000):
+    return _execute(
+        "follow",
+        lambda: _via_http(storage_state_path, "follow", profile_url),
+        lambda: x_follow.follow_user(storage_state_path, profile_url, headless, wait_after_ms),
+    )
+
+
+def unfollow_user(storage_state_path: str, profile_url: str, headless: bool, wait_after_ms: int = 3000):
+    return _execute(
+        "unfollow",
+        lambda: _via_http(storage_state_path, "unfollow", profile_url),
+        lambda: x_unfollow.unfollow_user(storage_state_path, profile_url, headless, wait_after_ms),
+    )
@@ -1,7 +1,9 @@
 import time
 from typing import Optional
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+
+from .browser_pool import DEFAULT_TIMEOUT, run_with_page
+from .x_ready import OP_CREATE_TWEET, expect_api
 
 
 # =================
@@ -9,11 +11,19 @@ from playwright.sync_api import sync_playwright
 # =================
 MEDIA_TIMEOUT_MS = 240_000        # للفيديو نحتاج أطول
 POST_DONE_TIMEOUT_MS = 60_000
-DEFAULT_TIMEOUT = 30_000
 
 POST_CLICK_DELAY_MS = 5000        # 5 ثواني بعد الضغط كما طلبت
 
 
+class PublishUnconfirmedError(RuntimeError):
+    """
+    ضُغط زر النشر ولم نتأكد من النتيجة (انتهت مهلة CreateTweet / أُغلقت الصفحة ...).
+    sent=True مثل XRequestError: التغريدة ربما نُشرت، وإعادة التنفيذ قد تنشرها مرتين.
+    """
+
+    sent = True
+
+
 def _get_scope(page):
     dlg = page.locator("div[role='dialog']")
     return dlg.first if dlg.count() else page
@@ -148,7 +158,6 @@ def _wait_media_uploaded_or_ready(page, timeout_ms: int = MEDIA_TIMEOUT_MS):
             continue
 
         if not _media_uploading_indicator_visible(page):
-            page.wait_for_timeout(700)
             return True
 
         page.wait_for_timeout(400)
@@ -175,8 +184,6 @@ def _wait_media_processed_video(page, timeout_ms: int = MEDIA_TIMEOUT_MS):
         # لا يوجد مؤشر => نزيد العد
         stable_hits += 1
         if stable_hits >= stable_needed:
-            # تهدئة إضافية للفيديو
-            page.wait_for_timeout(1200)
             return True
 
         page.wait_for_timeout(500)
@@ -277,25 +284,20 @@ def _copy_tweet_link(page, timeout_ms: int = 30_000) -> Optional[str]:
     import re
     try:
         # انتظر ظهور الـ toast ثم اضغط على رابط التغريدة
-        page.wait_for_timeout(2000)
-        
-        # اضغط على رابط التغريدة في الـ toast
         toast_link = page.get_by_test_id("toast").locator("a")
         toast_link.wait_for(state="visible", timeout=timeout_ms)
         toast_link.click()
-        page.wait_for_timeout(2500)
+        page.wait_for_url(re.compile(r".*/status/\d+"), timeout=15_000)
         
         # اضغط على زر المشاركة
         share_btn = page.get_by_role("button", name="Share post")
         share_btn.wait_for(state="visible", timeout=15_000)
         share_btn.click()
-        page.wait_for_timeout(1000)
         
         # اضغط على نسخ الرابط
         copy_link = page.locator("div").filter(has_text=re.compile(r"^Copy link$")).nth(2)
         copy_link.wait_for(state="visible", timeout=10_000)
         copy_link.click()
-        page.wait_for_timeout(500)
         
         # الحصول على الرابط من URL الحالي
         current_url = page.url
@@ -309,18 +311,13 @@ def _copy_tweet_link(page, timeout_ms: int = 30_000) -> Optional[str]:
 
 
 def post_to_x(storage_state_path: str, text: str, media_path: Optional[str], headless: bool) -> Optional[str]:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(channel="chrome", headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-
+    def _run(page) -> Optional[str]:
+        clicked = False
         try:
             page.goto("https://x.com/home", wait_until="domcontentloaded")
-            page.wait_for_timeout(1500)
 
+            # click() ينتظر ظهور الزر، و _get_textbox ينتظر ظهور محرر التغريدة
             page.get_by_test_id("SideNav_NewTweet_Button").click(timeout=DEFAULT_TIMEOUT)
-            page.wait_for_timeout(900)
 
             textbox = _get_textbox(page)
             textbox.click()
@@ -349,17 +346,24 @@ def post_to_x(storage_state_path: str, text: str, media_path: Optional[str], hea
                 # 3) الشرط الأهم: انتظر زر النشر يصبح متاح
                 _wait_publish_button_enabled(page, timeout_ms=MEDIA_TIMEOUT_MS)
 
-            # انشر
-            _click_publish(page)
-
-            # انتظر ثانيتين بعد النشر
-            page.wait_for_timeout(2000)
-
-            # نسخ رابط التغريدة بعد النشر
+            # انشر وانتظر رد CreateTweet (رابط التغريدة من الرد مباشرة)
+            try:
+                with expect_api(page, OP_CREATE_TWEET, timeout_ms=POST_DONE_TIMEOUT_MS) as confirmation:
+                    clicked = True
+                    _click_publish(page)
+            except Exception:
+                # رفض صريح من X (رد بخطأ): التغريدة لم تُنشر
+                if clicked and confirmation.status is not None and confirmation.tweet_id is None:
+                    clicked = False
+                raise
+            if confirmation.tweet_url:
+                return confirmation.tweet_url
+
+            # احتياط: نسخ رابط التغريدة من الواجهة
             tweet_url = _copy_tweet_link(page, timeout_ms=30_000)
             return tweet_url
 
-        except Exception:
+        except Exception as e:
             try:
                 page.screenshot(path="debug_post.png", full_page=True)
             except Exception:
@@ -369,9 +373,8 @@ def post_to_x(storage_state_path: str, text: str, media_path: Optional[str], hea
                     f.write(page.content())
             except Exception:
                 pass
+            if clicked:
+                raise PublishUnconfirmedError(f"لم يتأكد نشر التغريدة بعد الضغط على زر النشر: {e}") from e
             raise
-        finally:
-            context.close()
-            browser.close()
-    
-    return None
+
+    return run_with_page(storage_state_path, headless, _run)
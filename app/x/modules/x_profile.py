@@ -1,8 +1,10 @@
-import os
 import re
 from typing import List, Optional, Tuple
 
-from playwright.sync_api import sync_playwright
+from .browser_pool import run_with_page
+from .x_ready import OP_UPDATE_PROFILE, expect_api, wait_any
+
+_CROP_BUTTONS = ["[data-testid='applyButton']", "[data-testid='ocfApplyButton']"]
 
 
 def _file_inputs_in_edit_dialog(page):
@@ -42,6 +44,21 @@ def _try_click_avatar_button(page) -> bool:
     return _try_click_by_patterns(page, patterns)
 
 
+def _wait_hidden(loc, timeout_ms: int = 6000):
+    try:
+        loc.wait_for(state="hidden", timeout=timeout_ms)
+    except Exception:
+        pass
+
+
+def _wait_crop_dialog(page, timeout_ms: int = 5000):
+    """نافذة القص تظهر بعد اختيار الصورة؛ ننتظرها بحد أقصى بدل الانتظار الثابت."""
+    try:
+        wait_any(page, _CROP_BUTTONS, timeout_ms=timeout_ms)
+    except TimeoutError:
+        pass
+
+
 def _handle_crop_if_any(page):
     names = ["Apply","Save","Done","Next","تطبيق","حفظ","تم","التالي","إنهاء","قص","تأكيد"]
     for n in names:
@@ -49,16 +66,16 @@ def _handle_crop_if_any(page):
             b = page.get_by_role("button", name=re.compile(rf"^{re.escape(n)}$", re.I))
             if b.count() > 0 and b.first.is_visible():
                 b.first.click(timeout=6000)
-                page.wait_for_timeout(600)
+                _wait_hidden(b.first)
                 return True
         except Exception:
             pass
-    for sel in ["[data-testid='applyButton']", "[data-testid='ocfApplyButton']"]:
+    for sel in _CROP_BUTTONS:
         try:
             el = page.locator(sel)
             if el.count() > 0 and el.first.is_visible():
                 el.first.click(timeout=6000)
-                page.wait_for_timeout(600)
+                _wait_hidden(el.first)
                 return True
         except Exception:
             pass
@@ -81,7 +98,6 @@ def _fill_first_match(page, candidates: List[Tuple[str, str]], value: str):
 
 
 def _ensure_logged_in_or_raise(page):
-    page.wait_for_timeout(1000)
     for txt in ["Log in", "تسجيل الدخول", "Login"]:
         try:
             if page.get_by_role("link", name=re.compile(txt, re.I)).count() > 0:
@@ -100,41 +116,36 @@ def update_profile_on_x(
     banner_path: Optional[str] = None,
     headless: bool = True,
 ):
-    chrome_channel = os.getenv('XSUITE_CHROME_CHANNEL', '').strip() or None
-    with sync_playwright() as p:
-        if chrome_channel:
-            browser = p.chromium.launch(channel=chrome_channel, headless=headless)
-        else:
-            browser = p.chromium.launch(headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-
+    def _run(page):
         page.goto("https://x.com/settings/profile", wait_until="domcontentloaded")
-        page.wait_for_timeout(2500)
+        # نافذة تعديل الملف جاهزة (أو صفحة تسجيل الدخول إن كانت الكوكيز منتهية)
+        wait_any(page, [
+            "[data-testid='Profile_Save_Button']",
+            "input[name='displayName']",
+            "a[href='/login']",
+        ], timeout_ms=30_000)
         _ensure_logged_in_or_raise(page)
 
         inputs = _file_inputs_in_edit_dialog(page)
 
         if banner_path:
             _try_click_banner_button(page)
-            page.wait_for_timeout(400)
             if inputs.count() >= 1:
                 inputs.nth(0).set_input_files(banner_path)
             else:
                 page.locator("input[type='file']").first.set_input_files(banner_path)
-            page.wait_for_timeout(1200)
+            _wait_crop_dialog(page)
             _handle_crop_if_any(page)
 
         if avatar_path:
             _try_click_avatar_button(page)
-            page.wait_for_timeout(400)
             if inputs.count() >= 2:
                 inputs.nth(1).set_input_files(avatar_path)
             elif inputs.count() == 1:
                 inputs.first.set_input_files(avatar_path)
             else:
                 page.locator("input[type='file']").first.set_input_files(avatar_path)
-            page.wait_for_timeout(1200)
+            _wait_crop_dialog(page)
             _handle_crop_if_any(page)
 
         if name:
@@ -168,8 +179,8 @@ def update_profile_on_x(
                 ("role", r"(Website|URL|Link)\\b"),
             ], website)
 
-        page.get_by_test_id("Profile_Save_Button").click(timeout=30_000)
-        page.wait_for_timeout(2500)
+        with expect_api(page, OP_UPDATE_PROFILE) as confirmation:
+            page.get_by_test_id("Profile_Save_Button").click(timeout=30_000)
+        return confirmation.payload
 
-        context.close()
-        browser.close()
+    return run_with_page(storage_state_path, headless, _run)
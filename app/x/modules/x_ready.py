@@ -0,0 +1,172 @@
+"""
+طبقة الجاهزية (Readiness) لعمليات X
+
+بدل الانتظار الثابت (wait_for_timeout) ننتظر إشارات حقيقية:
+- استجابة الـ API التي ينفذها X عند الضغط (GraphQL مثل FavoriteTweet / CreateTweet
+  أو REST مثل friendships/create.json) ونتأكد من نجاح العملية من محتواها.
+- ظهور عناصر DOM عبر data-testid، مع حد أقصى للمدة.
+"""
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional, Union
+from urllib.parse import urlparse
+
+from playwright.sync_api import Locator, Page, Response
+
+
+API_TIMEOUT_MS = 30_000
+TWEET_READY_TIMEOUT_MS = 60_000
+
+# GraphQL operations / REST endpoints لكل عملية
+OP_LIKE = "FavoriteTweet"
+OP_UNLIKE = "UnfavoriteTweet"
+OP_REPOST = "CreateRetweet"
+OP_UNDO_REPOST = "DeleteRetweet"
+OP_BOOKMARK = "CreateBookmark"
+OP_UNDO_BOOKMARK = "DeleteBookmark"
+OP_DELETE_TWEET = "DeleteTweet"
+OP_CREATE_TWEET = ("CreateTweet", "CreateNoteTweet")
+OP_FOLLOW = "friendships/create.json"
+OP_UNFOLLOW = "friendships/destroy.json"
+OP_UPDATE_PROFILE = "account/update_profile.json"
+
+
+def _matches(response: Response, endpoints: Iterable[str]) -> bool:
+    path = urlparse(response.url).path
+    if "/i/api/" not in path and "/graphql/" not in path:
+        return False
+    if response.request.method != "POST":
+        return False
+    return any(path.endswith("/" + ep) for ep in endpoints)
+
+
+class ApiConfirmation:
+    """نتيجة انتظار استجابة الـ API: الحالة والمحتوى بعد التحقق."""
+
+    def __init__(self, endpoints: Iterable[str]):
+        self.endpoints = tuple(endpoints)
+        self.status: Optional[int] = None
+        self.payload: Optional[Dict[str, Any]] = None
+
+    def resolve(self, response: Response):
+        self.status = response.status
+        try:
+            self.payload = response.json()
+        except Exception:
+            self.payload = None
+
+        name = "/".join(self.endpoints)
+        if not response.ok:
+            raise RuntimeError(f"فشل تنفيذ {name} على X (HTTP {response.status}): {api_error_message(self.payload)}")
+        if isinstance(self.payload, dict) and self.payload.get("errors") and not self.payload.get("data"):
+            raise RuntimeError(f"رفض X تنفيذ {name}: {api_error_message(self.payload)}")
+
+    @property
+    def tweet_id(self) -> Optional[str]:
+        return created_tweet_id(self.payload)
+
+    @property
+    def tweet_url(self) -> Optional[str]:
+        return created_tweet_url(self.payload)
+
+
+@contextmanager
+def expect_api(page: Page, endpoints: Union[str, Iterable[str]], timeout_ms: int = API_TIMEOUT_MS):
+    """
+    انتظار استجابة endpoint محدد تُطلق أثناء تنفيذ الكتلة، ثم التحقق من نجاحها:
+
+        with expect_api(page, OP_LIKE) as confirmation:
+            _click_first_visible(page, selectors)
+        confirmation.payload  # محتوى رد X
+    """
+    if isinstance(endpoints, str):
+        endpoints = (endpoints,)
+    confirmation = ApiConfirmation(endpoints)
+    with page.expect_response(lambda r: _matches(r, confirmation.endpoints), timeout=timeout_ms) as info:
+        yield confirmation
+    confirmation.resolve(info.value)
+
+
+def api_error_message(payload: Any) -> str:
+    if isinstance(payload, dict):
+        errors = payload.get("errors") or []
+        if errors and isinstance(errors[0], dict):
+            return str(errors[0].get("message") or errors[0])
+    return "unknown error"
+
+
+def created_tweet_result(payload: Any) -> Optional[dict]:
+    if not isinstance(payload, dict):
+        return None
+    data = payload.get("data") or {}
+    created = data.get("create_tweet") or data.get("notetweet_create") or {}
+    result = (created.get("tweet_results") or {}).get("result") or {}
+    # التغريدات المقيدة تأتي داخل tweet
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet") or {}
+    return result or None
+
+
+def created_tweet_id(payload: Any) -> Optional[str]:
+    result = created_tweet_result(payload)
+    if not result:
+        return None
+    return result.get("rest_id") or (result.get("legacy") or {}).get("id_str")
+
+
+def created_tweet_url(payload: Any) -> Optional[str]:
+    tweet_id = created_tweet_id(payload)
+    if not tweet_id:
+        return None
+    result = created_tweet_result(payload) or {}
+    user = ((result.get("core") or {}).get("user_results") or {}).get("result") or {}
+    screen_name = (user.get("legacy") or {}).get("screen_name") or (user.get("core") or {}).get("screen_name")
+    if screen_name:
+        return f"https://x.com/{screen_name}/status/{tweet_id}"
+    return f"https://x.com/i/status/{tweet_id}"
+
+
+def status_id_from(tweet_url: str) -> Optional[str]:
+    match = re.search(r"/status(?:es)?/(\d+)", tweet_url or "")
+    return match.group(1) if match else None
+
+
+def target_tweet(page: Page, tweet_url: str) -> Union[Page, Locator]:
+    """
+    article التغريدة المستهدفة في صفحة الحالة: الذي يحتوي رابطاً لـ /status/<id>.
+    الردود والتغريدة الأصلية في نفس الصفحة لها أزرار like / retweet / bookmark خاصة بها،
+    فالفحص والضغط يكونان داخل هذا الـ article. بدون معرف (أو إذا لم يُعثر عليه) تُرجع الصفحة.
+    """
+    status_id = status_id_from(tweet_url)
+    if not status_id:
+        return page
+    article = page.locator("article[data-testid='tweet']").filter(
+        has=page.locator(f"a[href$='/status/{status_id}']")
+    )
+    return article.first if article.count() else page
+
+
+def wait_tweet_ready(page: Page, timeout_ms: int = TWEET_READY_TIMEOUT_MS):
+    """انتظار ظهور التغريدة نفسها (بدل الانتظار الثابت بعد فتح الرابط)."""
+    page.locator("article[data-testid='tweet']").first.wait_for(state="visible", timeout=timeout_ms)
+
+
+def wait_any(page: Page, selectors: Iterable[str], timeout_ms: int = 30_000) -> str:
+    """انتظار ظهور أي عنصر من القائمة، ويُرجع الـ selector الذي ظهر."""
+    deadline = time.time() + (timeout_ms / 1000.0)
+    while time.time() < deadline:
+        for sel in selectors:
+            if is_visible(page, sel):
+                return sel
+        page.wait_for_timeout(200)
+    raise TimeoutError("Timeout waiting for expected UI")
+
+
+def is_visible(page: Union[Page, Locator], selector: str) -> bool:
+    try:
+        loc = page.locator(selector)
+        return bool(loc.count() and loc.first.is_visible())
+    except Exception:
+        return False
+
@@ -1,43 +1,47 @@
-import os
-from playwright.sync_api import sync_playwright
+from .browser_pool import run_with_page
+from .x_ready import OP_UNFOLLOW, expect_api, is_visible, wait_any
 
-DEFAULT_TIMEOUT = 30_000
+# Any of these means the profile header (and its follow button) has rendered
+_FOLLOW_STATE = [
+    '[data-testid$="-follow"]',
+    '[data-testid$="-unfollow"]',
+    'button:has-text("إلغاء المتابعة")',
+    'button:has-text("Unfollow")',
+    'button:has-text("Following")',
+]
 
 def unfollow_user(storage_state_path: str, profile_url: str, headless: bool, wait_after_ms: int = 3000):
-    """Unfollow a user profile then confirm (confirmationSheetConfirm)."""
-    chrome_channel = os.getenv("XSUITE_CHROME_CHANNEL", "").strip() or "chrome"
+    """Unfollow a user profile then confirm (confirmationSheetConfirm). Confirmed from friendships/destroy."""
+    def _run(page):
+        page.goto(profile_url, wait_until="domcontentloaded")
+        wait_any(page, _FOLLOW_STATE, timeout_ms=30_000)
+        if is_visible(page, '[data-testid$="-follow"]') and not is_visible(page, '[data-testid$="-unfollow"]'):
+            return {"already": True}
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(channel=chrome_channel, headless=headless)
-        context = browser.new_context(storage_state=storage_state_path)
-        page = context.new_page()
-        page.set_default_timeout(DEFAULT_TIMEOUT)
-        try:
-            page.goto(profile_url, wait_until="domcontentloaded")
-            page.wait_for_timeout(1200)
+        btn = page.locator('[data-testid$="-unfollow"]')
+        if not (btn.count() and btn.first.is_visible()):
+            btn = page.locator(
+                'button:has-text("إلغاء المتابعة"), button:has-text("Unfollow"), button:has-text("Following")'
+            )
 
-            btn = page.locator('[data-testid$="-unfollow"]')
-            if not (btn.count() and btn.first.is_visible()):
-                btn = page.locator(
-                    'button:has-text("إلغاء المتابعة"), button:has-text("Unfollow"), button:has-text("Following")'
-                )
-
-            btn.first.wait_for(state="visible", timeout=30_000)
-            btn.first.scroll_into_view_if_needed()
+        btn.first.wait_for(state="visible", timeout=30_000)
+        btn.first.scroll_into_view_if_needed()
+        with expect_api(page, OP_UNFOLLOW) as confirmation:
             try:
                 btn.first.click(timeout=8000)
             except Exception:
                 btn.first.click(timeout=8000, force=True)
 
             confirm = page.locator('[data-testid="confirmationSheetConfirm"]')
-            if confirm.count():
+            try:
                 confirm.first.wait_for(state="visible", timeout=15_000)
                 try:
                     confirm.first.click(timeout=8000)
                 except Exception:
                     confirm.first.click(timeout=8000, force=True)
+            except Exception:
+                # بعض الحسابات تُلغى متابعتها بدون نافذة تأكيد
+                pass
+        return confirmation.payload
 
-            page.wait_for_timeout(wait_after_ms)
-        finally:
-            context.close()
-            browser.close()
+    return run_with_page(storage_state_path, headless, _run)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Stat Rollups Backfill
+إعادة حساب عدادات stat_rollups من الجداول
+
+شغّله مرة واحدة بعد التحديث (أو بعد أي تعديل مباشر على قاعدة البيانات)؛
+بعدها تُحدَّث العدادات تلقائياً مع كل كتابة.
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db.database import init_db, SessionLocal, DB_PATH
+from app.services.rollup_service import rollup_service
+
+
+def main():
+    print("=" * 60)
+    print("📊 Stat Rollups Backfill - إعادة حساب الإحصائيات")
+    print("=" * 60)
+    print(f"Database path: {DB_PATH}")
+    print()
+
+    db = SessionLocal()
+    try:
+        # إنشاء جدول stat_rollups إذا لم يكن موجوداً
+        init_db()
+        written = rollup_service.backfill(db)
+        totals = rollup_service.get(db)
+        print()
+        print(f"✅ تم حساب {written} عداد")
+        for metric in sorted(totals):
+            if "." in metric and ":" not in metric:
+                print(f"  - {metric}: {totals[metric]}")
+        print("=" * 60)
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error backfilling rollups: {str(e)}")
+        print(f"❌ خطأ في إعادة حساب الإحصائيات: {str(e)}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
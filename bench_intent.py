@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Intent Matcher Benchmark
+مقارنة أداء IntentService.detect_intent مع الطريقة القديمة (re.search لكل نمط)
+
+يقرأ رسائل من ملفات JSONL (كل سطر JSON فيه text / message / title / body)
+أو من ملفات نصية (رسالة في كل سطر)، ويتأكد أن النتائج مطابقة للطريقة القديمة
+(النية + الثقة، على النص بعد normalize_arabic) قبل عرض زمن كل رسالة.
+التخزين المؤقت (intent_cache) يُعطَّل أثناء القياس.
+
+الاستخدام:
+  python bench_intent.py                       # أمثلة مدمجة
+  python bench_intent.py requests.jsonl        # رسائل من ملف
+  python bench_intent.py data.jsonl --repeat 20
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from app.services.intent_cache import intent_cache
+from app.services.intent_service import IntentService, IntentType
+from app.utils.arabic_normalizer import normalize_arabic
+
+TEXT_KEYS = ("text", "message", "content", "title", "body")
+
+SAMPLE_MESSAGES = [
+    "مرحبا",
+    "السلام عليكم، كيف حالك؟",
+    "ابي اسوي تسجيل دخول لحسابي في تويتر",
+    "أضف حساب جديد على instagram",
+    "اعرض حساباتي",
+    "كم حساب عندي؟",
+    "احذف حساب moj_test",
+    "غرد \"صباح الخير يا عالم\" من حساب moj",
+    "انشر بعد 3 ساعة في حساب news_acc",
+    "جدول منشور غداً الساعة 10:30",
+    "ابغى احذف التغريدة الأخيرة",
+    "show my accounts",
+    "please tweet: hello world from @moj_ai",
+    "schedule post for tomorrow at 09:15",
+    "what are my analytics for last week?",
+    "reply to the latest comment",
+    "retweet this please",
+    "how to connect linkedin",
+    "وش اخبارك اليوم",
+    "عندي سؤال عن الإحصائيات والتفاعل",
+    "a message that matches nothing at all",
+    "١٢٣ رقم فقط",
+]
+
+
+def normalized_patterns(service: IntentService):
+    return [
+        (intent_type, [normalize_arabic(p) for p in patterns])
+        for intent_type, patterns in service.intent_patterns.items()
+    ]
+
+
+def legacy_detect(patterns_by_intent, text: str):
+    """الطريقة القديمة كما كانت: re.search لكل نمط ثم إعادة الترجمة لحساب الثقة."""
+    text_lower = normalize_arabic(text.lower())
+    detected_intent = IntentType.UNKNOWN
+    max_confidence = 0.0
+    for intent_type, patterns in patterns_by_intent:
+        for pattern in patterns:
+            if re.search(pattern, text_lower, re.IGNORECASE):
+                if re.search(f"\\b{pattern}\\b", text_lower, re.IGNORECASE):
+                    confidence = 0.95
+                elif re.search(pattern, text_lower, re.IGNORECASE):
+                    confidence = 0.75
+                else:
+                    confidence = 0.5
+                if confidence > max_confidence:
+                    max_confidence = confidence
+                    detected_intent = intent_type
+    return detected_intent, max_confidence
+
+
+def load_messages(paths):
+    messages = []
+    for path in paths:
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                messages.append(line)
+                continue
+            if isinstance(record, str):
+                messages.append(record)
+            elif isinstance(record, dict):
+                messages.extend(str(record[k]) for k in TEXT_KEYS if record.get(k))
+    return messages
+
+
+def timed(fn, messages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in messages:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(messages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent matcher benchmark")
+    parser.add_argument("files", nargs="*", help="ملفات JSONL أو نصية")
+    parser.add_argument("--repeat", type=int, default=10, help="عدد مرات تكرار الرسائل")
+    args = parser.parse_args()
+
+    messages = load_messages(args.files) if args.files else list(SAMPLE_MESSAGES)
+    if not messages:
+        print("❌ لا توجد رسائل")
+        return 1
+
+    service = IntentService()
+    intent_cache.enabled = False
+    patterns = normalized_patterns(service)
+
+    # 1) التطابق مع الطريقة القديمة
+    mismatches = 0
+    for text in messages:
+        old = legacy_detect(patterns, text)
+        new = service._match_intent(normalize_arabic(text.lower()))
+        if old != new:
+            mismatches += 1
+            print(f"❌ اختلاف: {text[:60]!r} قديم={old} جديد={new}")
+
+    # 2) الزمن
+    legacy_time = timed(lambda t: legacy_detect(patterns, t), messages, args.repeat)
+    new_time = timed(lambda t: service._match_intent(normalize_arabic(t.lower())), messages, args.repeat)
+    full_time = timed(service.detect_intent, messages, args.repeat)
+
+    print("=" * 60)
+    print(f"الرسائل: {len(messages)} × {args.repeat}")
+    print(f"مطابقة النتائج: {'✅' if not mismatches else f'❌ {mismatches} اختلاف'}")
+    print(f"الطريقة القديمة:   {legacy_time * 1e6:9.1f} µs/رسالة")
+    print(f"المطابق المترجم:   {new_time * 1e6:9.1f} µs/رسالة  (×{legacy_time / new_time:.1f})")
+    print(f"detect_intent كامل: {full_time * 1e6:9.1f} µs/رسالة")
+    print("=" * 60)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Query Plan Check
+التأكد أن الاستعلامات الأكثر تكراراً تستخدم الفهارس ولا تمسح الجدول كاملاً (SQLite)
+
+يشغّل دوال الخدمات نفسها ويلتقط الـ SELECT الذي تنفذه، ثم يعرض EXPLAIN QUERY PLAN
+لكل استعلام ويفشل (exit 1) إذا ظهر SCAN لأي جدول:
+  - get_conversation_history           → messages(conversation_id, created_at)
+  - get_or_create_conversation         → conversations(user_id, updated_at)
+  - get_due_events                     → schedule_events(status, run_at)
+  - AccountService.get_user_accounts   → social_accounts(user_id, platform, status)
+
+الاستخدام:
+  python check_query_plans.py                          # مخطط الموديلات (قاعدة في الذاكرة)
+  python check_query_plans.py --db sqlite:///data/app.db   # قاعدة موجودة (بعد alembic upgrade head)
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db.database import Base
+from app.db.models import User
+from app.services.account_service import account_service
+from app.services.memory_service import memory_service
+from app.services.schedule_service import get_due_events
+
+
+def hot_queries(db, user_id: int):
+    """(الاسم، دالة) لكل استعلام يُفحص"""
+    return [
+        ("get_conversation_history", lambda: memory_service.get_conversation_history(db, 1, 50)),
+        ("get_or_create_conversation", lambda: memory_service.get_or_create_conversation(db, user_id=user_id)),
+        ("get_due_events", lambda: get_due_events(db)),
+        ("get_user_accounts", lambda: account_service.get_user_accounts(db, user_id)),
+        ("get_user_accounts(platform, status)", lambda: account_service.get_user_accounts(db, user_id, "x", "active")),
+    ]
+
+
+def capture_selects(engine, fn):
+    """تنفيذ fn وإرجاع الـ SELECT التي نفذتها [(sql, params)]"""
+    captured = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+    return captured
+
+
+def full_scans(plan_rows):
+    """أسطر المخطط التي تمسح جدولاً كاملاً"""
+    return [
+        row[-1] for row in plan_rows
+        if row[-1].startswith("SCAN") and "CONSTANT ROW" not in row[-1]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query plans of hot paths")
+    parser.add_argument("--db", help="رابط SQLite لقاعدة موجودة (افتراضياً: الموديلات في الذاكرة)")
+    args = parser.parse_args()
+
+    # الاستعلامات تُنفذ على قاعدة مؤقتة في الذاكرة (get_or_create_conversation يكتب)،
+    # و EXPLAIN يُنفذ على القاعدة المطلوبة
+    scratch = create_engine("sqlite://")
+    Base.metadata.create_all(bind=scratch)
+    target = create_engine(args.db) if args.db else scratch
+
+    db = sessionmaker(autocommit=False, autoflush=False, bind=scratch)()
+    user = User(email="plan-check@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+
+    failures = 0
+    print("=" * 60)
+    try:
+        with target.connect() as conn:
+            for name, fn in hot_queries(db, user.id):
+                for statement, parameters in capture_selects(scratch, fn):
+                    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                    scans = full_scans(plan)
+                    failures += bool(scans)
+                    print(f"{'❌' if scans else '✅'} {name}")
+                    for row in plan:
+                        print(f"     {row[-1]}")
+    finally:
+        db.close()
+
+    print("=" * 60)
+    print("✅ كل الاستعلامات تستخدم الفهارس" if not failures else f"❌ {failures} استعلام يمسح الجدول كاملاً")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Database Load Test
+محاكاة ضغط الشات المتزامن على SQLite ومقارنة الإعداد القديم مع create_db_engine
+
+كل thread "محادثة": ينشئ محادثته ثم يكرر أدوار (رسالة مستخدم + قراءة السجل + رد)
+بـ memory_service وبكتابة فورية (durable=True)، بينما threads أخرى تقرأ إحصائيات
+المستخدمين باستمرار (مثل لوحة التحكم). يعرض لكل إعداد عدد أخطاء "database is locked"
+والأدوار في الثانية وزمن الدور (p50 / p95).
+
+يعمل على ملف مؤقت — لا يلمس data/app.db.
+
+الاستخدام:
+  python db_load_test.py
+  python db_load_test.py --threads 32 --turns 50 --readers 4
+  python db_load_test.py --profile tuned
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db.database import Base, create_db_engine
+from app.db.models import User
+from app.services.memory_service import memory_service
+from app.services.message_buffer import message_buffer
+
+
+def legacy_engine(url: str):
+    """الإعداد القبلي: journal افتراضي وبدون PRAGMAs"""
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+PROFILES = {
+    "legacy": legacy_engine,
+    "tuned": create_db_engine,
+}
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locked_errors = 0
+        self.other_errors = 0
+        self.turns = 0
+        self.reads = 0
+        self.latencies = []
+
+    def error(self, e: Exception):
+        with self.lock:
+            if "locked" in str(e):
+                self.locked_errors += 1
+            else:
+                self.other_errors += 1
+
+
+def chat_worker(Session, user_id: int, index: int, turns: int, counters: Counters):
+    db = Session()
+    try:
+        conversation = memory_service.get_or_create_conversation(
+            db=db, user_id=user_id, session_id=f"load-{index}"
+        )
+        for turn in range(turns):
+            start = time.perf_counter()
+            try:
+                memory_service.add_message(
+                    db, conversation.id, "user", f"رسالة {turn} من المحادثة {index}",
+                    intent="general_question", durable=True
+                )
+                memory_service.get_chat_messages(db, conversation.id, 20)
+                memory_service.add_message(
+                    db, conversation.id, "assistant", f"رد {turn} " + "نص " * 40,
+                    agent="AI_Service", durable=True
+                )
+            except OperationalError as e:
+                db.rollback()
+                counters.error(e)
+                continue
+            with counters.lock:
+                counters.turns += 1
+                counters.latencies.append(time.perf_counter() - start)
+    except OperationalError as e:
+        counters.error(e)
+    finally:
+        db.close()
+
+
+def reader_worker(Session, user_ids, stop: threading.Event, counters: Counters):
+    db = Session()
+    try:
+        while not stop.is_set():
+            for user_id in user_ids:
+                try:
+                    memory_service.get_conversation_stats(db, user_id, limit=100)
+                    memory_service.get_user_preferences(db, user_id)
+                    db.commit()
+                except OperationalError as e:
+                    db.rollback()
+                    counters.error(e)
+                    continue
+                with counters.lock:
+                    counters.reads += 1
+    finally:
+        db.close()
+
+
+def run_profile(name: str, threads: int, turns: int, readers: int, users: int) -> Counters:
+    workdir = Path(tempfile.mkdtemp(prefix="db_load_"))
+    engine = PROFILES[name](f"sqlite:///{workdir / 'load.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    user_ids = []
+    for i in range(users):
+        user = User(email=f"load{i}@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_ids.append(user.id)
+    db.close()
+
+    counters = Counters()
+    stop = threading.Event()
+    reader_threads = [
+        threading.Thread(target=reader_worker, args=(Session, user_ids, stop, counters))
+        for _ in range(readers)
+    ]
+    chat_threads = [
+        threading.Thread(target=chat_worker, args=(Session, user_ids[i % users], i, turns, counters))
+        for i in range(threads)
+    ]
+
+    start = time.perf_counter()
+    for thread in reader_threads + chat_threads:
+        thread.start()
+    for thread in chat_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in reader_threads:
+        thread.join()
+
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = sorted(counters.latencies) or [0.0]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"[{name}]")
+    print(f"  أدوار ناجحة:          {counters.turns}/{threads * turns}")
+    print(f"  database is locked:   {counters.locked_errors}")
+    print(f"  أخطاء أخرى:           {counters.other_errors}")
+    print(f"  قراءات الإحصائيات:     {counters.reads}")
+    print(f"  أدوار/ثانية:          {counters.turns / elapsed:.1f}")
+    print(f"  زمن الدور p50 / p95:  {statistics.median(latencies) * 1000:.1f} / {p95 * 1000:.1f} ms")
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite concurrent chat load test")
+    parser.add_argument("--threads", type=int, default=16, help="محادثات متزامنة")
+    parser.add_argument("--turns", type=int, default=30, help="أدوار لكل محادثة")
+    parser.add_argument("--readers", type=int, default=2, help="threads قراءة الإحصائيات")
+    parser.add_argument("--users", type=int, default=4, help="عدد المستخدمين")
+    parser.add_argument("--profile", choices=["both", *PROFILES], default="both")
+    args = parser.parse_args()
+
+    # الكتابة فورية في هذا الاختبار (طابور message_buffer مرتبط بقاعدة التطبيق)
+    message_buffer.enabled = False
+
+    print("=" * 60)
+    print(f"محادثات: {args.threads} × {args.turns} دور، قراءات: {args.readers}")
+    print("=" * 60)
+    names = list(PROFILES) if args.profile == "both" else [args.profile]
+    results = {name: run_profile(name, args.threads, args.turns, args.readers, args.users) for name in names}
+    print("=" * 60)
+
+    tuned = results.get("tuned")
+    return 1 if tuned and (tuned.locked_errors or tuned.other_errors) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -107,9 +107,46 @@ const ChatInterface = ({ darkMode, setDarkMode, user }) => {
   const handleWebSocketMessage = (data) => {
     if (data.type === 'typing') {
       setIsTyping(data.status)
+    } else if (data.type === 'progress') {
+      setIsTyping(true)
+    } else if (data.type === 'assistant_delta') {
+      // جزء من رد يُبث — يُضاف لنفس الرسالة حسب stream_id
+      setIsTyping(false)
+      setMessages(prev => {
+        const index = prev.findIndex(m => m.streamId === data.stream_id)
+        if (index === -1) {
+          return [...prev, {
+            id: Date.now(),
+            type: 'assistant',
+            content: data.delta,
+            streamId: data.stream_id,
+            timestamp: new Date().toISOString()
+          }]
+        }
+        const next = [...prev]
+        next[index] = { ...next[index], content: next[index].content + data.delta }
+        return next
+      })
     } else if (data.type === 'assistant_message') {
       // تجاهل الرسائل الفارغة أو null
-      if (data.message && data.message !== null) {
+      if (data.message && data.stream_id) {
+        // نهاية البث: الرسالة الكاملة تستبدل الأجزاء
+        setMessages(prev => {
+          const index = prev.findIndex(m => m.streamId === data.stream_id)
+          const message = {
+            id: index === -1 ? Date.now() : prev[index].id,
+            type: 'assistant',
+            content: data.message,
+            attachment: data.attachment || null,
+            timestamp: data.timestamp
+          }
+          if (index === -1) return [...prev, message]
+          const next = [...prev]
+          next[index] = message
+          return next
+        })
+        refreshSidebarConversations()
+      } else if (data.message && data.message !== null) {
         setMessages(prev => [...prev, {
           id: Date.now(),
           type: 'assistant',